@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from NetExplorer.models import AUTOCOMPLETE_INDEX, AutocompleteIndex
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the autocomplete index file from Neo4j and the Reactome table.
+    Running workers pick up the new file on their next autocomplete request.
+
+    Usage::
+
+        python manage.py build_autocomplete_index
+    """
+    help = "Rebuilds the autocomplete prefix index (PLANNET_INDEX_DIR/autocomplete.json)."
+
+    def handle(self, *args, **options):
+        indexes = AutocompleteIndex.build()
+        AUTOCOMPLETE_INDEX.save(indexes)
+        for database in sorted(indexes):
+            self.stdout.write("%s: %s symbols" % (database, len(indexes[database])))
+        self.stdout.write(self.style.SUCCESS("Index written to %s" % AUTOCOMPLETE_INDEX.path))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from NetExplorer.models.experiment_catalog import get_experiment_catalog, catalog_key
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the cached catalog of the Neo4j expression experiments used by
+    the Network Viewer. Run it after loading or deleting experiments in Neo4j
+    (or change PLANNET_DATA_VERSION).
+
+    Usage::
+
+        python manage.py build_experiment_catalog
+    """
+    help = "Rebuilds the cached catalog of the Neo4j expression experiments."
+
+    def handle(self, *args, **options):
+        catalog = get_experiment_catalog(rebuild=True)
+        for entry in catalog:
+            self.stdout.write("%s: %s samples, %s datasets%s" % (
+                entry['identifier'], len(entry['samples']), len(entry['datasets']),
+                " (private)" if entry['private'] else ""
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            "%s experiments cached as %s" % (len(catalog), catalog_key())
+        ))
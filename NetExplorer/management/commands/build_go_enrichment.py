@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from NetExplorer.models.go_enrichment_engine import GO_ENRICHMENT, GOEnrichmentEngine
+
+
+class Command(BaseCommand):
+    """
+    Builds the population table of the GO enrichment (human genes x GO terms)
+    from gene_ontology_data and go-basic.obo. Workers started afterwards load
+    the file instead of building the table themselves. Run it again after
+    updating any of them.
+
+    Usage::
+
+        python manage.py build_go_enrichment
+    """
+    help = "Builds the GO enrichment population table (PLANNET_INDEX_DIR/go_enrichment.npz)."
+
+    def handle(self, *args, **options):
+        table = GOEnrichmentEngine.build(GO_ENRICHMENT.dag)
+        table.save(GO_ENRICHMENT.path)
+        self.stdout.write("%s genes, %s GO terms, %s annotations" % (
+            table.pop_n, len(table.term_ids), table.matrix.nnz
+        ))
+        self.stdout.write(self.style.SUCCESS("Table written to %s" % GO_ENRICHMENT.path))
@@ -0,0 +1,34 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from NetExplorer.models import DATABASES, INTERACTOMES, InteractomeCSR
+
+
+class Command(BaseCommand):
+    """
+    Dumps the INTERACT_WITH edges of each dataset to a CSR .npz file used by
+    the Pathway Finder. Running workers pick up the new files on their next
+    path search.
+
+    Usage::
+
+        python manage.py build_interactome [Dresden Smest ...]
+    """
+    help = "Writes PLANNET_INDEX_DIR/interactome_<database>.npz for the given datasets (default: all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('databases', nargs='*', help="Datasets to dump. Defaults to all of them.")
+
+    def handle(self, *args, **options):
+        databases = options['databases'] or sorted(DATABASES)
+        if not os.path.isdir(settings.PLANNET_INDEX_DIR):
+            os.makedirs(settings.PLANNET_INDEX_DIR)
+        for database in databases:
+            interactome = InteractomeCSR.from_graph(database)
+            path = INTERACTOMES.path(database)
+            tmp_path = path + ".tmp.npz"
+            interactome.save(tmp_path)
+            os.replace(tmp_path, path)
+            self.stdout.write("%s: %s nodes, %s interactions -> %s" % (
+                database, len(interactome.symbols), len(interactome.indices) // 2, path
+            ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from NetExplorer.models import NGRAM_INDEX, NgramIndexStore
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the n-gram index used by wildcard searches (human symbols,
+    planarian gene names and Pfam accessions) from Neo4j. Running workers
+    pick up the new file on their next wildcard search.
+
+    Usage::
+
+        python manage.py build_ngram_index
+    """
+    help = "Rebuilds the wildcard search n-gram index (PLANNET_INDEX_DIR/ngram.json)."
+
+    def handle(self, *args, **options):
+        indexes = NgramIndexStore.build()
+        NGRAM_INDEX.save(indexes)
+        for field in sorted(indexes):
+            self.stdout.write("%s: %s values" % (field, len(indexes[field])))
+        self.stdout.write(self.style.SUCCESS("Index written to %s" % NGRAM_INDEX.path))
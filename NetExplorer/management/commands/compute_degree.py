@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from NetExplorer.models import DATABASES, run_query, neoquery
+
+
+class Command(BaseCommand):
+    """
+    Stores the degree (number of INTERACT_WITH relationships) of every contig
+    as the `degree` property of the node, read by the shallow neighbour
+    queries. Should be run after uploading an interactome.
+
+    With --check nothing is written: nodes whose stored degree is missing or
+    does not match their interactions are reported, and the command fails if
+    there are any.
+
+    Usage::
+
+        python manage.py compute_degree [--check] [Dresden Smest ...]
+    """
+    help = "Stores the degree of every node of the given datasets (default: all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('databases', nargs='*', help="Datasets to update. Defaults to all of them.")
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report nodes with a missing or stale degree."
+        )
+
+    def handle(self, *args, **options):
+        databases = options['databases'] or sorted(DATABASES)
+        if options['check']:
+            self.check(databases)
+            return
+        for database in databases:
+            results = run_query(neoquery.SET_DEGREE_QUERY, database).data()
+            self.stdout.write("%s: degree stored for %s nodes" % (database, results[0]['nodes']))
+
+    def check(self, databases):
+        stale_databases = []
+        for database in databases:
+            row = run_query(neoquery.STALE_DEGREE_QUERY, database).data()[0]
+            if row['stale']:
+                stale_databases.append(database)
+                self.stdout.write(self.style.WARNING("%s: %s nodes with stale degree (%s...)" % (
+                    database, row['stale'], ", ".join(row['examples'])
+                )))
+            else:
+                self.stdout.write("%s: ok" % database)
+        if stale_databases:
+            raise CommandError(
+                "Stale degrees in %s. Run: python manage.py compute_degree %s" % (
+                    ", ".join(stale_databases), " ".join(stale_databases)
+                )
+            )
@@ -0,0 +1,62 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from NetExplorer.models import KEGG_STORE
+
+
+class Command(BaseCommand):
+    """
+    Manages the local store of KEGG pathway gene lists used by the Network
+    Viewer (PLANNET_INDEX_DIR/kegg). Pathways can be loaded from a bundle
+    (e.g. on servers without access to KEGG), exported to a bundle, or
+    fetched again from KEGG.
+
+    Usage::
+
+        python manage.py kegg_store --load kegg_bundle.json.gz
+        python manage.py kegg_store --export kegg_bundle.json.gz
+        python manage.py kegg_store --refresh hsa04310 hsa04350
+    """
+    help = "Loads, exports or refreshes the stored KEGG pathway gene lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--load', metavar='BUNDLE',
+            help="Store the pathways of a bundle file (JSON, .gz allowed)."
+        )
+        parser.add_argument(
+            '--export', metavar='BUNDLE',
+            help="Write the stored pathways to a bundle file."
+        )
+        parser.add_argument(
+            '--refresh', nargs='+', metavar='PATHWAY',
+            help="Fetch these pathways from KEGG again."
+        )
+
+    def handle(self, *args, **options):
+        if not (options['load'] or options['export'] or options['refresh']):
+            raise CommandError("Use --load, --export or --refresh")
+        if options['load']:
+            stored = KEGG_STORE.load_bundle(options['load'])
+            self.stdout.write(self.style.SUCCESS(
+                "%s pathways stored in %s" % (stored, KEGG_STORE.directory)
+            ))
+        if options['refresh']:
+            failed = []
+            for symbol in options['refresh']:
+                symbol = KEGG_STORE.normalize(symbol)
+                if not KEGG_STORE.is_pathway(symbol):
+                    failed.append(symbol)
+                    continue
+                try:
+                    entry = KEGG_STORE.save(symbol, KEGG_STORE.fetch(symbol))
+                    self.stdout.write("%s: %s genes" % (symbol, len(entry['genes'])))
+                except (requests.RequestException, ValueError) as err:
+                    self.stdout.write(self.style.WARNING("%s: %s" % (symbol, err)))
+                    failed.append(symbol)
+            if failed:
+                raise CommandError("Pathways not refreshed: %s" % ", ".join(failed))
+        if options['export']:
+            exported = KEGG_STORE.export_bundle(options['export'])
+            self.stdout.write(self.style.SUCCESS(
+                "%s pathways written to %s" % (exported, options['export'])
+            ))
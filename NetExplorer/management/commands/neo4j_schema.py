@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from NetExplorer.models import neo4j_schema
+
+
+class Command(BaseCommand):
+    """
+    Creates the Neo4j indexes declared in NetExplorer.models.neo4j_schema.
+    Existing indexes are left alone, so it can be run on every deploy.
+
+    With --cypher no index is created: the statements for all of them are
+    written to share/neo4j_indexes.cypher (or the given file).
+
+    With --audit no index is created: every Cypher template is planned with
+    EXPLAIN and the plans with label or full graph scans are reported. The
+    command fails if a template not listed in EXPECTED_SCANS scans.
+
+    Usage::
+
+        python manage.py neo4j_schema [--dry-run]
+        python manage.py neo4j_schema --cypher [FILE]
+        python manage.py neo4j_schema --audit [--dataset Smest]
+    """
+    help = "Creates the missing Neo4j indexes, or audits the query plans with --audit."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--audit', action='store_true',
+            help="EXPLAIN every query template and report label/full graph scans."
+        )
+        parser.add_argument(
+            '--dataset', default="Dresden",
+            help="Dataset label used to plan the templates (default: Dresden)."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Print the statements for the missing indexes without running them."
+        )
+        parser.add_argument(
+            '--cypher', nargs='?', const=neo4j_schema.INDEXES_CYPHER, metavar='FILE',
+            help="Write the statements for all the indexes to FILE (default: share/neo4j_indexes.cypher)."
+        )
+
+    def handle(self, *args, **options):
+        if options['audit']:
+            self.audit(options['dataset'])
+        elif options['cypher']:
+            with open(options['cypher'], "w") as fh:
+                fh.write(neo4j_schema.cypher_script())
+            self.stdout.write(self.style.SUCCESS(
+                "%s indexes written to %s" % (len(neo4j_schema.INDEXES), options['cypher'])
+            ))
+        elif options['dry_run']:
+            for label, prop in neo4j_schema.missing_indexes():
+                self.stdout.write(neo4j_schema.index_statement(label, prop))
+        else:
+            created = neo4j_schema.apply_indexes()
+            for label, prop in created:
+                self.stdout.write("Created index on :%s(%s)" % (label, prop))
+            self.stdout.write(self.style.SUCCESS(
+                "%s indexes created, %s declared" % (len(created), len(neo4j_schema.INDEXES))
+            ))
+
+    def audit(self, dataset):
+        unexpected = []
+        for name, scans, expected in neo4j_schema.audit_queries(dataset):
+            message = "%s: %s" % (name, ", ".join(scans))
+            if expected:
+                self.stdout.write("%s (expected)" % message)
+            else:
+                unexpected.append(name)
+                self.stdout.write(self.style.WARNING(message))
+        if unexpected:
+            raise CommandError("Label scans in %s" % ", ".join(unexpected))
+        self.stdout.write(self.style.SUCCESS("No unexpected scans"))
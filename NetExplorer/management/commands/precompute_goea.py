@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from NetExplorer.models.mysql_models import Experiment
+from NetExplorer.models.goea_cache import get_goea_comparisons, precompute_goea
+
+
+class Command(BaseCommand):
+    """
+    Computes the GO enrichment of every comparison of a PlanExp experiment
+    (both conditions of each pair) and stores the results in the cache used
+    by get_goea. Run it after uploading an experiment.
+
+    Usage::
+
+        python manage.py precompute_goea <experiment> [--dataset <dataset>] [--processes 4] [--rebuild]
+    """
+    help = "Fills the GO enrichment cache for all the comparisons of an experiment."
+
+    def add_arguments(self, parser):
+        parser.add_argument('experiment', help="Experiment name.")
+        parser.add_argument('--dataset', help="Only the comparisons of this dataset.")
+        parser.add_argument('--processes', type=int, default=None, help="Number of processes (default: number of CPUs).")
+        parser.add_argument('--rebuild', action='store_true', help="Compute the comparisons that are already cached again.")
+
+    def handle(self, *args, **options):
+        if not Experiment.objects.filter(name=options['experiment']).exists():
+            raise CommandError("Experiment %s does not exist" % options['experiment'])
+        comparisons = get_goea_comparisons(options['experiment'], options['dataset'])
+        if not comparisons:
+            raise CommandError("Experiment %s has no comparisons" % options['experiment'])
+        failed = 0
+        for comparison, significant, error in precompute_goea(comparisons, options['processes'], options['rebuild']):
+            experiment, dataset, condition1, condition2, focus = comparison
+            name = "%s %s vs %s (%s)" % (dataset, condition1, condition2, focus)
+            if error is not None:
+                failed += 1
+                self.stdout.write(self.style.WARNING("%s: %s" % (name, error)))
+            else:
+                self.stdout.write("%s: %s significant GO" % (name, significant or 0))
+        self.stdout.write(self.style.SUCCESS(
+            "%s of %s comparisons cached" % (len(comparisons) - failed, len(comparisons))
+        ))
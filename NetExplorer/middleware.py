@@ -0,0 +1,47 @@
+from NetExplorer.models import QueryCounter, QUERY_METRICS
+
+
+class QueryMetricsMiddleware(object):
+    """
+    Counts the Neo4j queries done while handling each request, records the
+    count in QUERY_METRICS and returns it in the X-Neo4j-Queries header.
+
+    The body of a StreamingHttpResponse is produced after the view returns,
+    so its queries are counted while it is iterated, and the request is
+    recorded once the stream is exhausted (or closed). The header, sent
+    before the body, only has the queries done by the view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter(request.path) as counter:
+            response = self.get_response(request)
+        response['X-Neo4j-Queries'] = str(counter.count)
+        if response.streaming:
+            response.streaming_content = self.count_stream(counter, response.streaming_content)
+        else:
+            QUERY_METRICS.record_request(counter.count)
+        return response
+
+    @staticmethod
+    def count_stream(counter, content):
+        """
+        Args:
+            counter (:obj:`QueryCounter`): Counter of the request.
+            content (iterator): Body of the streaming response.
+
+        Yields:
+            Chunks of content, counting the queries run to produce each one.
+        """
+        content = iter(content)
+        try:
+            while True:
+                with counter:
+                    try:
+                        chunk = next(content)
+                    except StopIteration:
+                        break
+                yield chunk
+        finally:
+            QUERY_METRICS.record_request(counter.count)
@@ -6,4 +6,12 @@ from NetExplorer.models.mysql_models import *
 from NetExplorer.models.neo4j_models import *
 from NetExplorer.models.plots import *
 from NetExplorer.models.gene_ontology import *
-from NetExplorer.models.id_converter import *
\ No newline at end of file
+from NetExplorer.models.go_enrichment_engine import *
+from NetExplorer.models.id_converter import *
+from NetExplorer.models.autocomplete_index import *
+from NetExplorer.models.path_engine import *
+from NetExplorer.models.ngram_index import *
+from NetExplorer.models.concurrent_queries import *
+from NetExplorer.models.kegg_store import *
+from NetExplorer.models.dataset_classifier import *
+from NetExplorer.models.goea_cache import *
@@ -0,0 +1,195 @@
+from .common import *
+import bisect
+from django.conf import settings
+
+
+# ------------------------------------------------------------------------------
+class PrefixIndex(object):
+    """
+    Prefix index over a set of search keys. Keys are grouped by length and kept
+    sorted inside each group, so matches come out directly in (len, key) order:
+    for each length, a binary search finds the first key with the prefix and
+    the following keys are read until the prefix no longer matches or `limit`
+    results have been collected.
+
+    Attributes:
+        lengths (`list` of `int`): Sorted key lengths.
+        keys (`dict`): Sorted list of keys for each length.
+        values (`dict`): Value returned for each key (same positions as `keys`).
+
+    Args:
+        pairs (iterable of `tuple`): (key, value) tuples. Value is what the
+            search returns, e.g.: the Reactome name for its upper case key.
+    """
+    def __init__(self, pairs):
+        buckets = defaultdict(set)
+        for key, value in pairs:
+            if key:
+                buckets[len(key)].add((key, value))
+        self.lengths = sorted(buckets)
+        self.keys    = {}
+        self.values  = {}
+        for length in self.lengths:
+            items = sorted(buckets[length])
+            self.keys[length]   = [ key for key, value in items ]
+            self.values[length] = [ value for key, value in items ]
+
+    def search(self, prefix, limit=None):
+        """
+        Returns the values of the keys starting with prefix.
+
+        Args:
+            prefix (str): Prefix to search.
+            limit (int, optional): Maximum number of results. Defaults to all.
+
+        Returns:
+            `list` of `str`: Unique values, in (len, key) order.
+        """
+        matches = []
+        seen    = set()
+        first   = bisect.bisect_left(self.lengths, len(prefix))
+        for length in self.lengths[first:]:
+            keys   = self.keys[length]
+            values = self.values[length]
+            idx    = bisect.bisect_left(keys, prefix)
+            while idx < len(keys) and keys[idx].startswith(prefix):
+                if values[idx] not in seen:
+                    seen.add(values[idx])
+                    matches.append(values[idx])
+                    if limit is not None and len(matches) >= limit:
+                        return matches
+                idx += 1
+        return matches
+
+    def to_pairs(self):
+        """
+        Returns:
+            `list` of `list`: [key, value] pairs in (len, key) order.
+        """
+        return [
+            [ key, value ]
+            for length in self.lengths
+            for key, value in zip(self.keys[length], self.values[length])
+        ]
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.keys.values())
+
+
+# ------------------------------------------------------------------------------
+class AutocompleteIndex(object):
+    """
+    Autocomplete service. Holds one :obj:`PrefixIndex` per database (dataset
+    labels, Human, Pfam, Go, ReactomeId and ReactomeName), loaded from the
+    file written by the `build_autocomplete_index` management command.
+
+    The file is read when the worker starts (see `PlanNET.wsgi.init_worker`),
+    or on first use, and again whenever its modification time changes, so
+    rebuilding it refreshes every worker. Databases that are not
+    in the file return None, and the view falls back to Neo4j.
+
+    Attributes:
+        path (str): Path of the index file.
+        indexes (`dict` of `str`: :obj:`PrefixIndex`): Index of each database.
+
+    Args:
+        path (str, optional): Path of the index file. Defaults to
+            autocomplete.json inside the PLANNET_INDEX_DIR setting.
+    """
+    filename = "autocomplete.json"
+
+    def __init__(self, path=None):
+        self._path   = path
+        self.indexes = {}
+        self._mtime  = None
+        self._lock   = threading.Lock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = os.path.join(settings.PLANNET_INDEX_DIR, self.filename)
+        return self._path
+
+    def load(self):
+        """
+        Loads the index file if it changed since the last load. Called before
+        every search.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path) as fh:
+                content = json.load(fh)
+            self.indexes = dict(
+                (database, PrefixIndex(pairs)) for database, pairs in content.items()
+            )
+            self._mtime = mtime
+            logging.info("Autocomplete index loaded from %s" % self.path)
+
+    def search(self, database, prefix, limit=None):
+        """
+        Returns the symbols of database starting with prefix.
+
+        Args:
+            database (str): Database (Neo4j label, 'ReactomeId' or 'ReactomeName').
+            prefix (str): Prefix to search. For 'ReactomeName' it should be upper case.
+            limit (int, optional): Maximum number of results.
+
+        Returns:
+            Union([`list` of `str`, None]): Matches in (len, symbol) order, None if
+                database is not indexed.
+        """
+        self.load()
+        index = self.indexes.get(database)
+        if index is None:
+            return None
+        return index.search(prefix, limit)
+
+    @classmethod
+    def build(cls):
+        """
+        Reads all the symbols from Neo4j and the Reactome table.
+
+        Returns:
+            `dict` of `str`: :obj:`PrefixIndex`: Index of each database.
+        """
+        indexes = {}
+        for database in sorted(ALL_DATABASES | set(["Human"])):
+            results = run_query(neoquery.AUTOCOMPLETE_ALL_SYMBOLS, database)
+            indexes[database] = PrefixIndex(
+                (row['symbol'], row['symbol']) for row in results.data()
+            )
+        for database in ["Pfam", "Go"]:
+            results = run_query(neoquery.AUTOCOMPLETE_ALL_ACCESSIONS, database)
+            indexes[database] = PrefixIndex(
+                (row['symbol'], row['symbol']) for row in results.data()
+            )
+        reactome = Reactome.objects.values_list("reactome_id", "search_name", "name")
+        indexes["ReactomeId"]   = PrefixIndex((rid, rid) for rid, search_name, name in reactome)
+        indexes["ReactomeName"] = PrefixIndex((search_name, name) for rid, search_name, name in reactome)
+        return indexes
+
+    def save(self, indexes):
+        """
+        Writes the indexes to the index file. The file is replaced atomically,
+        so workers never read a half written index.
+
+        Args:
+            indexes (`dict` of `str`: :obj:`PrefixIndex`): Index of each database.
+        """
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        content = dict((database, index.to_pairs()) for database, index in indexes.items())
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as fh:
+            json.dump(content, fh)
+        os.replace(fh.name, self.path)
+
+
+AUTOCOMPLETE_INDEX = AutocompleteIndex()
@@ -1,6 +1,11 @@
 from __future__ import unicode_literals
 from django.db import models
-from py2neo import Graph
+from django.conf import settings
+from NetExplorer.models.graph_backends import GraphProxy
+from NetExplorer.models.node_cache import NodeCache
+from NetExplorer.models.kegg_store import KEGG_STORE
+from NetExplorer.models.cytoscape_json import iter_graph_json
+from NetExplorer.models.query_metrics import QUERY_METRICS
 from  django.contrib.auth.models import User
 import json
 import logging
@@ -8,6 +13,7 @@ from colour import Color
 import math
 import re
 import time
+import threading
 from django.db import connection
 import requests
 from wsgiref.util import FileWrapper
@@ -38,7 +44,10 @@ from matplotlib.figure import Figure
 from io import BytesIO
 
 
-GRAPH     = Graph("http://127.0.0.1:7474/db/data/")
+# Neo4j access. Backend and pool are configured with the NEO4J setting.
+GRAPH     = GraphProxy()
+# Rows of node lookups, see NODE_CACHE setting.
+NODE_CACHE = NodeCache.from_settings()
 DATABASES = set([
     "Dresden",
     "Consolidated",
@@ -70,8 +79,185 @@ ALL_DATABASES = set([
     "Gbrna",
 ])
 
+# Labels that can be interpolated in a Cypher template. Labels can't be sent as
+# query parameters, so anything that ends up in a label slot must come from here.
+GRAPH_LABELS = dict((label, label) for label in ALL_DATABASES)
+GRAPH_LABELS.update(
+    (label, label) for label in ["Human", "Smesgene", "Pfam", "Go", "Experiment", "Tf_motif"]
+)
+
 
 # UTILITIES
+def graph_label(label):
+    """
+    Returns the Neo4j label for `label` if it is whitelisted in GRAPH_LABELS.
+
+    Args:
+        label (str): Label (database) name.
+
+    Returns:
+        str: Label that can be interpolated in a Cypher template.
+
+    Raises:
+        IncorrectDatabase: If label is not a Neo4j label used by PlanNET.
+    """
+    try:
+        return GRAPH_LABELS[label]
+    except (KeyError, TypeError):
+        raise exceptions.IncorrectDatabase(label)
+
+
+def format_query(template, *labels):
+    """
+    Fills the label slots of one of the Cypher templates in neo4j_queries.
+
+    Args:
+        template (str): Cypher template with a %s slot for each label.
+        *labels: Values for the label slots of the template, checked
+            against GRAPH_LABELS.
+
+    Returns:
+        str: Cypher query.
+
+    Raises:
+        IncorrectDatabase: If any label is not a Neo4j label used by PlanNET.
+    """
+    if not labels:
+        return template
+    return template % tuple(graph_label(label) for label in labels)
+
+
+def run_query(template, *labels, **params):
+    """
+    Runs one of the Cypher templates in neo4j_queries. Every call to Neo4j
+    should go through here: the call is counted by the active QueryCounters
+    and its latency and rows are recorded in QUERY_METRICS.
+
+    Args:
+        template (str): Cypher template with a %s slot for each label.
+        *labels: Values for the label slots of the template, checked
+            against GRAPH_LABELS.
+        **params: Values for the $parameters of the template.
+
+    Returns:
+        Cursor: Cursor with the results of the query.
+
+    Raises:
+        IncorrectDatabase: If any label is not a Neo4j label used by PlanNET.
+    """
+    query = format_query(template, *labels)
+    for counter in QueryCounter.active():
+        counter.add()
+    start   = time.time()
+    results = GRAPH.run(query, **params)
+    QUERY_METRICS.record(template, time.time() - start, len(results), params)
+    return results
+
+
+def cached_query(key, template, *labels, **params):
+    """
+    Same as run_query, but the rows are kept in NODE_CACHE. Only for queries
+    that build a node from its label and symbol.
+
+    Args:
+        key (tuple): Cache key, (label, symbol, query name).
+        template (str): Cypher template with a %s slot for each label.
+        *labels: Values for the label slots of the template.
+        **params: Values for the $parameters of the template.
+
+    Returns:
+        `list` of `dict`: Rows returned by the query. Don't modify them.
+    """
+    rows = NODE_CACHE.get(key)
+    if rows is None:
+        rows = run_query(template, *labels, **params).data()
+        NODE_CACHE.set(key, rows)
+    return rows
+
+
+class QueryCounter(object):
+    """
+    Context manager that counts the Neo4j round-trips done by the current
+    thread through run_query. Counters can be nested, every active counter
+    sees every query. Functions sent to other threads are counted too if
+    they are wrapped with `QueryCounter.bind`.
+
+    Used to make sure that methods building many objects (e.g. neighbours of
+    a hub contig) keep a constant number of queries. If `limit` is exceeded a
+    warning is logged.
+
+    Args:
+        name (str): Name used in the warning message.
+        limit (int, optional): Maximum number of queries expected.
+
+    Attributes:
+        count (int): Number of queries run inside the block.
+
+    Example::
+
+        with QueryCounter("get_card", limit=10) as counter:
+            node.get_neighbours()
+        print(counter.count)
+    """
+    _local = threading.local()
+
+    def __init__(self, name="", limit=None):
+        self.name  = name
+        self.limit = limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, queries=1):
+        with self._lock:
+            self.count += queries
+
+    @classmethod
+    def active(cls):
+        """
+        Returns:
+            `list` of `QueryCounter`: Counters open in the current thread.
+        """
+        if not hasattr(cls._local, "stack"):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def bind(cls, function):
+        """
+        Wraps function so that the queries it runs in another thread are seen
+        by the counters active now in this thread.
+
+        Args:
+            function (function): Callable without arguments.
+
+        Returns:
+            function: Callable to run in the other thread.
+        """
+        counters = list(cls.active())
+        def bound():
+            stack = cls.active()
+            saved = list(stack)
+            stack[:] = counters + saved
+            try:
+                return function()
+            finally:
+                stack[:] = saved
+        return bound
+
+    def __enter__(self):
+        self.active().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.active().remove(self)
+        if self.limit is not None and self.count > self.limit:
+            logging.warning(
+                "%s ran %s Neo4j queries (expected at most %s)" % (self.name, self.count, self.limit)
+            )
+        return False
+
+
+
 def query_node(symbol, database):
     """
     This simple function takes a symbol and a database and tries to get it from
@@ -100,4 +286,5 @@ def query_node(symbol, database):
         node.get_summary()
     return node
 
-from NetExplorer.models.neo4j_models import *
\ No newline at end of file
+from NetExplorer.models.neo4j_models import *
+from NetExplorer.models import exceptions
@@ -0,0 +1,135 @@
+"""
+Runs the independent Neo4j lookups of one request at the same time.
+
+Pages like the gene cards need several queries that don't depend on each
+other (contigs, motifs, neighbours, GO...). `run_branches` sends them to a
+thread pool shared by the worker process, waits for all of them and logs the
+time spent in each branch, so the request takes as long as its slowest branch
+instead of the sum of all of them.
+
+The pool is bounded by the QUERY_WORKERS setting, which should not be larger
+than the MAX_POOL_SIZE of the NEO4J setting. Branches must not call
+`run_branches` themselves: with all the threads busy waiting for their own
+branches the pool would never make progress.
+
+Settings example::
+
+    QUERY_WORKERS = 4   # Threads per worker process. 0 runs the branches in order.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from NetExplorer.models.common import QueryCounter
+
+
+DEFAULT_QUERY_WORKERS = 4
+
+
+# ------------------------------------------------------------------------------
+class BranchRunner(object):
+    """
+    Bounded thread pool for independent query branches. The pool is created
+    on first use.
+
+    Args:
+        max_workers (int, optional): Number of threads. Defaults to the
+            QUERY_WORKERS setting. 0 runs the branches in the calling thread.
+    """
+    def __init__(self, max_workers=None):
+        self._max_workers = max_workers
+        self._executor    = None
+        self._lock        = threading.Lock()
+
+    @property
+    def max_workers(self):
+        if self._max_workers is None:
+            return getattr(settings, 'QUERY_WORKERS', DEFAULT_QUERY_WORKERS)
+        return self._max_workers
+
+    def executor(self):
+        """
+        Returns:
+            ThreadPoolExecutor: Pool of the process, None if it is disabled.
+        """
+        if not self.max_workers:
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="plannet-query"
+                    )
+        return self._executor
+
+    @staticmethod
+    def timed(function):
+        """
+        Returns:
+            function: Calls function and returns (result, exception, seconds).
+                Exceptions are returned instead of raised, so every branch
+                finishes before the caller sees the first error.
+        """
+        def call():
+            start = time.time()
+            try:
+                return function(), None, time.time() - start
+            except Exception as err:
+                return None, err, time.time() - start
+        return call
+
+    def run(self, name, branches):
+        """
+        Runs the branches and waits for all of them.
+
+        Args:
+            name (str): Name used in the timing log, e.g.: 'get_card Smesgene'.
+            branches (`list` of `tuple`): (branch name, callable without
+                arguments) tuples.
+
+        Returns:
+            `OrderedDict`: Result of each branch, by branch name.
+
+        Raises:
+            Exception: The exception raised by the first failed branch (in
+                the order of `branches`), once all of them have finished.
+        """
+        start    = time.time()
+        executor = self.executor()
+        if executor is None:
+            outcomes = [ self.timed(function)() for branch, function in branches ]
+        else:
+            futures = [
+                executor.submit(QueryCounter.bind(self.timed(function)))
+                for branch, function in branches
+            ]
+            outcomes = [ future.result() for future in futures ]
+
+        logging.info("%s: %s (total %.0f ms)" % (
+            name,
+            ", ".join(
+                "%s %.0f ms" % (branch, seconds * 1000)
+                for (branch, function), (result, error, seconds) in zip(branches, outcomes)
+            ),
+            (time.time() - start) * 1000
+        ))
+
+        results = OrderedDict()
+        for (branch, function), (result, error, seconds) in zip(branches, outcomes):
+            if error is not None:
+                raise error
+            results[branch] = result
+        return results
+
+
+BRANCH_RUNNER = BranchRunner()
+
+
+def run_branches(name, branches):
+    """
+    Runs independent query branches on the process pool, see :obj:`BranchRunner.run`.
+    """
+    return BRANCH_RUNNER.run(name, branches)
@@ -0,0 +1,177 @@
+"""
+Serializer for the Cytoscape elements of a :obj:`GraphCytoscape`.
+
+Nodes and interactions are written straight from their attributes into JSON
+fragments, without building the intermediate dictionaries of `to_jsondict()`.
+The output is the same as `json.dumps` of those dictionaries. Elements of any
+other class fall back to `json.dumps` of `to_jsondict()`.
+
+Example::
+
+    response = StreamingHttpResponse(iter_graph_json(graph.nodes, graph.edges))
+
+"""
+import json
+import math
+from json.encoder import encode_basestring_ascii as _string
+
+
+CHUNK_SIZE = 500
+
+_WRITERS = {}
+
+
+def _value(value):
+    """
+    Args:
+        value: String, number, bool or None.
+
+    Returns:
+        str: JSON representation of value.
+    """
+    if isinstance(value, str):
+        return _string(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float) and math.isfinite(value):
+        return float.__repr__(value)
+    return json.dumps(value)
+
+
+# ------------------------------------------------------------------------------
+def contig_json(node):
+    """
+    Args:
+        node (:obj:`PlanarianContig`): Node to serialize.
+
+    Returns:
+        str: Same JSON as `PlanarianContig.to_jsondict()`.
+    """
+    parts = [
+        '{"data": {"id": ', _string(node.symbol),
+        ', "name": ', _string(node.symbol),
+        ', "database": ', _string(node.database)
+    ]
+    if node.homolog is not None:
+        parts.append(', "homolog": ')
+        parts.append(_value(node.homolog.human.symbol))
+    if node.degree is not None:
+        parts.append(', "degree": ')
+        parts.append(_value(node.degree))
+    if node.important:
+        parts.append(', "colorNODE": "#404040"}, "classes": "important"}')
+    else:
+        parts.append(', "colorNODE": "#404040"}}')
+    return "".join(parts)
+
+
+def human_json(node):
+    """
+    Args:
+        node (:obj:`HumanNode`): Node to serialize.
+
+    Returns:
+        str: Same JSON as `HumanNode.to_jsondict()`.
+    """
+    return '{"data": {"id": %s, "name": %s, "database": %s}}' % (
+        _string(node.symbol), _string(node.symbol), _string(node.database)
+    )
+
+
+def interaction_json(edge):
+    """
+    Args:
+        edge (:obj:`PredInteraction`): Interaction to serialize.
+
+    Returns:
+        str: Same JSON as `PredInteraction.to_jsondict()`.
+    """
+    source = edge.source_symbol
+    target = edge.target.symbol
+    parts  = [
+        '{"data": {"id": ', _string("-".join(sorted((source, target)))),
+        ', "source": ', _string(source),
+        ', "target": ', _string(target)
+    ]
+    parameters = edge.parameters
+    if parameters is not None:
+        parts.append(', "pathlength": ')
+        parts.append(_value(parameters['path_length']))
+        parts.append(', "probability": ')
+        parts.append(_value(parameters['int_prob']))
+        if parameters['path_length'] == 1:
+            parts.append(', "colorEDGE": "#72a555"}}')
+        else:
+            parts.append(', "colorEDGE": "#CA6347"}}')
+    else:
+        parts.append(', "colorEDGE": "#CA6347"}}')
+    return "".join(parts)
+
+
+def element_json(element):
+    """
+    Serializes a node or an interaction.
+
+    Args:
+        element (Union([:obj:`Node`, :obj:`PredInteraction`])): Element with a
+            `to_jsondict()` method.
+
+    Returns:
+        str: JSON string of the Cytoscape element.
+    """
+    if not _WRITERS:
+        from NetExplorer.models.neo4j_models import PlanarianContig, HumanNode, PredInteraction
+        _WRITERS[PlanarianContig] = contig_json
+        _WRITERS[HumanNode]       = human_json
+        _WRITERS[PredInteraction] = interaction_json
+    writer = _WRITERS.get(type(element))
+    if writer is None:
+        return json.dumps(element.to_jsondict())
+    return writer(element)
+
+
+# ------------------------------------------------------------------------------
+def iter_graph_json(nodes, edges, chunk_size=CHUNK_SIZE):
+    """
+    Writes the Cytoscape JSON of a graph in chunks, so it can be sent with
+    a StreamingHttpResponse.
+
+    Args:
+        nodes (iterable of :obj:`Node`): Nodes of the graph.
+        edges (iterable of :obj:`PredInteraction`): Edges of the graph.
+        chunk_size (int, optional): Elements written per chunk.
+
+    Yields:
+        str: Pieces of the JSON string ``{"nodes": [...], "edges": [...]}``.
+    """
+    buffer = []
+    for opening, elements in (('{"nodes": [', nodes), ('], "edges": [', edges)):
+        buffer.append(opening)
+        separator = ""
+        for element in elements:
+            buffer.append(separator)
+            buffer.append(element_json(element))
+            separator = ", "
+            if len(buffer) >= 2 * chunk_size:
+                yield "".join(buffer)
+                buffer = []
+    buffer.append("]}")
+    yield "".join(buffer)
+
+
+def graph_json(nodes, edges):
+    """
+    Args:
+        nodes (iterable of :obj:`Node`): Nodes of the graph.
+        edges (iterable of :obj:`PredInteraction`): Edges of the graph.
+
+    Returns:
+        str: Cytoscape JSON string of the graph.
+    """
+    return "".join(iter_graph_json(nodes, edges))
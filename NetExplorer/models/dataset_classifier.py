@@ -0,0 +1,168 @@
+"""
+Guesses the database of search terms without querying the Dataset table.
+
+The identifier_regex of all the datasets are compiled into a single regular
+expression (an alternation with one named group per dataset), so a symbol is
+classified with one match. The regular expression is rebuilt when a Dataset
+is saved or deleted: the process that saves it rebuilds it at once, and the
+other workers notice the change (through the Django cache) in at most
+CHECK_INTERVAL seconds.
+"""
+import logging
+import re
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+from NetExplorer.models.mysql_models import Dataset
+
+
+VERSION_KEY    = "plannet:dataset_classifier:version"
+CHECK_INTERVAL = 60
+
+# Numbered or named back-references would point to other groups once joined.
+UNJOINABLE_REGEX = re.compile(r"\\[1-9]|\(\?P=")
+
+
+# ------------------------------------------------------------------------------
+class DatasetClassifier(object):
+    """
+    Classifies symbols like `GeneSearch.infer_symbol_database`: if more than
+    one dataset matches, the last one (in table order) wins; symbols that
+    don't match any dataset are 'Smesgene', 'PFAM', 'GO' or 'Human'.
+
+    Attributes:
+        names (`list` of `str`): Dataset names, in table order.
+    """
+    def __init__(self):
+        self.names    = []
+        self._regex   = None
+        self._groups  = {}
+        self._version = None
+        self._checked = 0
+        self._lock    = threading.Lock()
+
+    def invalidate(self):
+        """
+        Forgets the datasets and tells the other workers to do the same.
+        """
+        with self._lock:
+            self._regex = None
+        try:
+            cache.set(VERSION_KEY, time.time(), None)
+        except Exception as err:
+            logging.warning("Dataset classifier version not shared: %s" % err)
+
+    def _shared_version(self):
+        try:
+            return cache.get(VERSION_KEY)
+        except Exception:
+            return None
+
+    def _load(self):
+        """
+        Reads the datasets and compiles their regular expressions. If they
+        can't be joined (back-references or inline flags), each one is
+        compiled on its own.
+        """
+        datasets = list(Dataset.objects.values_list('name', 'identifier_regex'))
+        groups   = dict(("dataset%d" % idx, name) for idx, (name, regex) in enumerate(datasets))
+        # Reversed, so that the last matching dataset wins, as in infer_symbol_database
+        alternatives = [
+            "(?P<dataset%d>%s)" % (idx, regex)
+            for idx, (name, regex) in reversed(list(enumerate(datasets)))
+        ]
+        try:
+            if any(UNJOINABLE_REGEX.search(regex) for name, regex in datasets):
+                raise re.error("Dataset regexes can't be joined")
+            regex = re.compile("|".join(alternatives)) if alternatives else None
+        except re.error:
+            regex = [
+                (re.compile(regex), name) for name, regex in reversed(datasets)
+            ]
+        self.names   = [ name for name, regex in datasets ]
+        self._groups = groups
+        self._regex  = regex
+
+    def _ensure_loaded(self):
+        now = time.time()
+        if now - self._checked > CHECK_INTERVAL:
+            version = self._shared_version()
+            self._checked = now
+            if version != self._version:
+                self._version = version
+                with self._lock:
+                    self._regex = None
+        if self._regex is None:
+            with self._lock:
+                if self._regex is None:
+                    self._load()
+        return self._regex
+
+    def dataset_of(self, symbol):
+        """
+        Returns:
+            Union([str, None]): Dataset whose identifier_regex matches symbol,
+                None if there is none.
+        """
+        regex = self._ensure_loaded()
+        if not regex:
+            return None
+        if isinstance(regex, list):
+            for compiled, name in regex:
+                if compiled.match(symbol):
+                    return name
+            return None
+        match = regex.match(symbol)
+        if match is None:
+            return None
+        for group, value in match.groupdict().items():
+            if value is not None and group in self._groups:
+                return self._groups[group]
+        return None
+
+    def classify(self, symbol):
+        """
+        Returns:
+            str: Database of symbol: a dataset, 'Smesgene', 'PFAM', 'GO' or 'Human'.
+        """
+        from NetExplorer.models.neo4j_models import PlanarianGene, Domain, GeneOntology
+        database = self.dataset_of(symbol)
+        if database is None:
+            if PlanarianGene.is_symbol_valid(symbol):
+                database = "Smesgene"
+            elif Domain.is_symbol_valid(symbol):
+                database = "PFAM"
+            elif GeneOntology.is_symbol_valid(symbol):
+                database = "GO"
+            else:
+                database = "Human"
+        return database
+
+    def classify_many(self, symbols):
+        """
+        Returns:
+            `list` of `str`: Database of each symbol, see `classify`.
+        """
+        self._ensure_loaded()
+        return [ self.classify(symbol) for symbol in symbols ]
+
+    def get_names(self):
+        """
+        Returns:
+            `list` of `str`: Names of all the datasets, in table order.
+        """
+        self._ensure_loaded()
+        return self.names
+
+
+DATASET_CLASSIFIER = DatasetClassifier()
+
+
+def invalidate_dataset_classifier(sender, **kwargs):
+    DATASET_CLASSIFIER.invalidate()
+
+post_save.connect(invalidate_dataset_classifier, sender=Dataset)
+post_delete.connect(invalidate_dataset_classifier, sender=Dataset)
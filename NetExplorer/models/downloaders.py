@@ -1,83 +1,87 @@
 from .common import *
+from NetExplorer.models.id_converter import IDConverter
+from NetExplorer.models import neo4j_queries as neoquery
+from django.http import StreamingHttpResponse
+import zlib
 
 # ------------------------------------------------------------------------------
 class DownloadHandler(object):
     """
     Class that handles downloadable files.
 
+    Identifiers are read in batches of `batch_size`. Each batch is resolved to
+    planarian contigs, and the data of those contigs is fetched with one query
+    per database, so the number of queries and the memory used don't grow with
+    the number of contigs of a batch.
+
     Attributes:
-        data_from_node (`dict` of `str`: `fun`): Class attribute, dictionary mapping data type keywords, 
+        data_from_row (`dict` of `str`: `fun`): Class attribute, dictionary mapping data type keywords,
             to the methods that handle them.
+        data_queries (`dict` of `str`: `str`): Class attribute, Cypher template
+            that fetches the rows of each data type.
 
     Example::
-    
+
         dhandler = DownloadHandler()
         the_file = dhandler.download_data(identifiers, database, data)
         response = the_file.to_response()
-    
 
-    Methods get_*_data returns a list of tuples, each tuple being a line, and each
-    element of the tuple being a column.
+
+    Methods _get_*_data receive one row of the data query of a contig and return
+    a list of tuples, each tuple being a line, and each element of the tuple being a column.
     """
+    batch_size = 500
 
-    def _get_contig_data(node):
+    def _get_contig_data(row, database):
         """
         Function to return a line with the contig sequence.
-        
+
         Args:
-            node (PlanarianContig): PlanarianContig object.
+            row (dict): Row of HYDRATE_CONTIGS_BULK.
+            database (str): Database of the contig.
 
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Contig sequence.
                     3. Contig database.
                     4. Gene symbol (if available, otherwise "NA").
         """
-        if not node.sequence:
-            node.get_all_information()
-
-        genes = node.get_genes()
-        gene = "NA"
-        if genes:
-            gene = genes[0].symbol
-        return [(node.symbol, node.sequence, node.database, gene)]
+        gene = row['gene'] or "NA"
+        return [(row['symbol'], row['sequence'] or "", database, gene)]
 
-    def _get_orf_data(node):
+    def _get_orf_data(row, database):
         """
-        Function to return line with contig Open Reading Frame (ORF) 
+        Function to return line with contig Open Reading Frame (ORF)
         and other data.
 
         Args:
-            node (PlanarianContig): PlanarianContig object.
-        
+            row (dict): Row of HYDRATE_CONTIGS_BULK.
+            database (str): Database of the contig.
+
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Contig ORF sequence.
                     3. Contig database.
                     4. Gene symbol (if available, otherwise "NA").
         """
-        if not node.orf:
-            node.get_all_information()
-        genes = node.get_genes()
-        gene = "NA"
-        if genes:
-            gene = genes[0].symbol
-        return [(node.symbol, node.orf, node.database, gene)]
-
-    def _get_homology_data(node):
+        gene = row['gene'] or "NA"
+        return [(row['symbol'], row['orf'] or "", database, gene)]
+
+    def _get_homology_data(row, database):
         """
         Function to return line with Homology data for a contig.
 
         Args:
-             node (PlanarianContig): PlanarianContig object.
-            
+            row (dict): Row of HYDRATE_CONTIGS_BULK.
+            database (str): Database of the contig.
+
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Gene symbol (if available, otherwise "NA")..
                     3. Homolog symbol (if available, otherwise "NA").
@@ -86,106 +90,90 @@ class DownloadHandler(object):
                     6. EggNOG HMMER E-Value (if available, otherwise "NA").
                     7. PFAM meta-alignment score (if available, otherwise "NA").
         """
-        genes = node.get_genes()
-        gene = "NA"
-        if genes:
-            gene = genes[0].symbol
-        if node.homolog is not None:
-            return [(node.symbol, gene, node.homolog.human.symbol, 
-                    node.homolog.blast_eval, node.homolog.blast_cov, 
-                    node.homolog.nog_eval, node.homolog.pfam_sc)]
+        gene = row['gene'] or "NA"
+        if row['human'] is not None:
+            return [(row['symbol'], gene, row['human'],
+                    str(row['blast_eval']), str(row['blast_cov']),
+                    str(row['nog_eval']), str(row['pfam_sc']))]
         else:
-            return [(node.symbol, gene, "NA", 
-                    "NA", "NA", 
+            return [(row['symbol'], gene, "NA",
+                    "NA", "NA",
                     "NA", "NA")]
 
-    def _get_pfam_data(node):
+    def _get_pfam_data(row, database):
         """
         Function to return line with PFAM domain data for a contig.
 
         Args:
-            node (PlanarianContig): PlanarianContig object.
-        
+            row (dict): Row of DOWNLOAD_DOMAINS_BULK.
+            database (str): Database of the contig.
+
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Gene symbol (if available, otherwise "NA").
                     3. PFAM domains, in the form of (`accession`:`start`-`end`), separated by `;`.
         """
-        node.get_domains()
-        genes = node.get_genes()
-        gene = "NA"
-        if genes:
-            gene = genes[0].symbol
-
-        if node.domains:
-            domains = ";".join([ "%s:%s-%s:%s"  % (str(dom.domain.accession), str(dom.s_start), str(dom.s_end), str(dom.domain.description)) for dom in node.domains ])
+        gene = row['gene'] or "NA"
+
+        if row['domains']:
+            domains = ";".join([ "%s:%s-%s:%s"  % (str(dom['accession']), str(dom['s_start']), str(dom['s_end']), str(dom['description'])) for dom in row['domains'] ])
         else:
             domains = "NA"
-        
-        return([(node.symbol, gene, domains)])
 
-    def _get_go_data(node):
+        return([(row['symbol'], gene, domains)])
+
+    def _get_go_data(row, database):
         """
         Function to return line with GO for a contig.
 
         Args:
-            node (PlanarianContig): PlanarianContig object.
-        
+            row (dict): Row of DOWNLOAD_GO_BULK.
+            database (str): Database of the contig.
+
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Gene symbol (if available, otherwise "NA").
                     3. GO terms, in the form of (`accession`=`domain`=`name`), separated by `;`.
         """
-        node.get_geneontology()
-        genes = node.get_genes()
-        gene = "NA"
-        if genes:
-            gene = genes[0].symbol
-        gos = ";".join([ go.accession + "=" + go.domain + "=" + go.name  for go in node.gene_ontologies ])
+        gene = row['gene'] or "NA"
+        gos = ";".join([ go['accession'] + "=" + go['domain'] + "=" + go['name']  for go in row['gos'] ])
         if not gos:
             gos = "NA"
-        return [(node.symbol, gene, gos)]
+        return [(row['symbol'], gene, gos)]
 
-    def _get_interactions_data(node):
+    def _get_interactions_data(row, database):
         """
         Function to return several line with interactions for a contig.
 
         Args:
-            node (PlanarianContig): PlanarianContig object.
-        
+            row (dict): Row of DOWNLOAD_INTERACTIONS_BULK.
+            database (str): Database of the contig.
+
         Returns:
             `list` of `tuple` of `str`: List with data for a row in the downloadable
-                file. Contains: 
+                file. Contains:
                     1. Contig symbol.
                     2. Gene symbol (if available, otherwise "NA").
                     3. Interactor contig symbol.
                     4. Interactor gene symbol (if available, otherwise "NA").
                     5. Interaction score (if available, otherwise "NA")
         """
-        node.get_neighbours()
-        genes1 = node.get_genes()
-        gene1 = "NA"
-        if genes1:
-            gene1 = genes1[0].symbol
+        gene1 = row['gene'] or "NA"
 
         ints = []
-        if node.neighbours:
-            for interaction in node.neighbours:
-                genes2 = interaction.target.get_genes()
-                if genes2:
-                    gene2 = genes2[0].symbol
-                else:
-                    gene2 = "NA"
-                ints.append((node.symbol, gene1, interaction.target.symbol, gene2, str(interaction.parameters['int_prob'])))
+        if row['interactions']:
+            for interaction in row['interactions']:
+                gene2 = interaction['gene'] or "NA"
+                ints.append((row['symbol'], gene1, interaction['target'], gene2, str(round(float(interaction['int_prob']), 3))))
         else:
-            ints.append((node.symbol, gene1, "NA", "NA", "NA"))
+            ints.append((row['symbol'], gene1, "NA", "NA", "NA"))
         return ints
 
-    data_from_node = {
+    data_from_row = {
         'contig': _get_contig_data,
         'orf': _get_orf_data,
         'homology': _get_homology_data,
@@ -194,42 +182,135 @@ class DownloadHandler(object):
         'interactions': _get_interactions_data
     }
 
+    data_queries = {
+        'contig': neoquery.HYDRATE_CONTIGS_BULK,
+        'orf': neoquery.HYDRATE_CONTIGS_BULK,
+        'homology': neoquery.HYDRATE_CONTIGS_BULK,
+        'pfam': neoquery.DOWNLOAD_DOMAINS_BULK,
+        'go': neoquery.DOWNLOAD_GO_BULK,
+        'interactions': neoquery.DOWNLOAD_INTERACTIONS_BULK
+    }
+
+    def get_contigs(self, identifiers, database, converter):
+        """
+        Resolves a batch of identifiers to planarian contigs, like
+        `GeneSearch.get_planarian_contigs` does for each one of them. Contig
+        identifiers are used as they are, planarian genes, human genes, gene
+        names and Pfam domain identifiers are mapped to contigs of database
+        with one query per hop. Wildcards, Pfam accessions and GO terms are
+        still searched one by one.
+
+        Args:
+            identifiers (`list` of `str`): Gene/transcript identifiers.
+            database (str): Database of the contigs of genes and human genes.
+            converter (:obj:`IDConverter`): Converter used to classify and map
+                the identifiers.
+
+        Returns:
+            `list` of `tuple`: (symbol, database) of the contigs, in the order
+                of the identifiers.
+        """
+        classified = [ (identifier, converter.classify(identifier)) for identifier in identifiers ]
+        lookups = defaultdict(list)
+        for identifier, id_database in classified:
+            if id_database in ("Smesgene", "Human") and converter.is_bulk(identifier, id_database):
+                lookups[id_database].append(converter.lookup_symbol(identifier, id_database))
+        mapped = dict(
+            (id_database, converter.hop(symbols, id_database, database))
+            for id_database, symbols in lookups.items()
+        )
+        if "Human" in lookups:
+            names = converter.gene_names(lookups["Human"])
+            by_gene = converter.hop(
+                [ gene for genes in names.values() for gene in genes ], "Smesgene", database
+            )
+            for name, genes in names.items():
+                for gene in genes:
+                    mapped["Human"][name].extend(by_gene.get(gene, []))
+            # Pfam domain identifiers, as in GeneSearch._get_human_or_pfam
+            for identifier, symbols in converter.domain_identifiers(lookups["Human"], database).items():
+                mapped["Human"][identifier].extend(symbols)
+
+        contigs = []
+        for identifier, id_database in classified:
+            if id_database in mapped and converter.is_bulk(identifier, id_database):
+                symbols = mapped[id_database].get(converter.lookup_symbol(identifier, id_database), [])
+                contigs.extend((symbol, database) for symbol in symbols)
+            elif id_database not in ("Smesgene", "Human", "PFAM", "GO"):
+                contigs.append((identifier, id_database))
+            else:
+                try:
+                    gsearch = GeneSearch(identifier, database)
+                    gsearch.sterm_database = id_database
+                    contigs.extend(
+                        (node.symbol, node.database) for node in gsearch.get_planarian_contigs()
+                    )
+                except exceptions.NodeNotFound:
+                    continue
+        return contigs
+
+    def iter_elements(self, identifiers, database, data):
+        """
+        Yields the lines of the file, one batch of identifiers at a time.
+
+        Args:
+            identifiers (`list` of `str`): List of gene/transcript identifiers.
+            database (str): Database name of desired results to download.
+            data (str): Desired data to download.
+                Can be ['contig', 'orf', 'homology', 'pfam', 'go', 'interactions']
+
+        Yields:
+            `tuple` of `str`: Columns of each line. Contigs that are not in
+                the database are skipped.
+        """
+        converter = IDConverter([])
+        identifiers = [ identifier for identifier in identifiers if identifier ]
+        for start in range(0, len(identifiers), self.batch_size):
+            contigs = self.get_contigs(identifiers[start:start + self.batch_size], database, converter)
+            by_database = defaultdict(list)
+            for symbol, contig_db in contigs:
+                by_database[contig_db].append(symbol)
+            rows = {}
+            for contig_db, symbols in by_database.items():
+                labels = (contig_db,) * self.data_queries[data].count("%s")
+                results = run_query(self.data_queries[data], *labels, symbols=list(set(symbols)))
+                for row in results.data():
+                    rows[(contig_db, row['symbol'])] = row
+            for contig in contigs:
+                if contig in rows:
+                    for element in self.data_from_row[data](rows[contig], contig[1]):
+                        yield element
+
     def download_data(self, identifiers, database, data):
         """
         Creates file object with the specified data for the
-        specified identifiers.
+        specified identifiers. Nothing is queried until the file is read.
 
-        Args: 
+        Args:
             identifiers (`list` of `str`): List of gene/transcript identifiers.
             database (str): Database name of desired results to download.
-            data (str): Desired data to download. 
+            data (str): Desired data to download.
                 Can be ['contig', 'orf', 'homology', 'pfam', 'go', 'interactions']
-        
+
         Returns:
-            ServedFile: ServedFile object with the file ready to download.
+            StreamedFile: StreamedFile object with the file ready to download.
         """
         fformat = 'csv'
         if data == "contig" or data == "orf":
             fformat = 'fasta'
-        dfile = ServedFile(self.get_filename(data), fformat, self.get_header(data))
-        for identifier in identifiers:
-            try:
-                gsearch = GeneSearch(identifier, database)
-                nodes = gsearch.get_planarian_contigs()
-                for node in nodes:
-                    dfile.add_elements(self.data_from_node[data](node))
-            except exceptions.NodeNotFound:
-                continue
-        return dfile
+        return StreamedFile(
+            self.get_filename(data), self.iter_elements(identifiers, database, data),
+            fformat, self.get_header(data)
+        )
 
     def get_filename(self, data):
         """
         Returns filename string.
 
         Args:
-            data (str): Desired data to download. 
+            data (str): Desired data to download.
                 Can be ['contig', 'orf', 'homology', 'pfam', 'go', 'interactions']
-        
+
         Returns:
             str: String with filename according to the data to download.
         """
@@ -250,9 +331,9 @@ class DownloadHandler(object):
         Returns header string.
 
         Args:
-            data (str): Desired data to download. 
+            data (str): Desired data to download.
                 Can be ['contig', 'orf', 'homology', 'pfam', 'go', 'interactions']
-        
+
         Return:
             str: String with first line (header) of the file.
         """
@@ -264,88 +345,86 @@ class DownloadHandler(object):
 
 
 # ------------------------------------------------------------------------------
-class ServedFile(object):
+class StreamedFile(object):
     """
-    Class of served files for download.
+    Class of served files for download. Lines are formatted while they are
+    sent, so the file is never held in memory or written to disk.
 
     Attributes:
         oname (str): String with output filename.
+        elements (iterable of `tuple`): Data for each line.
         fformat (str): String with file format, can be 'csv' or 'fasta'.
-        header (bool): Bool describing if file should have a header.
-        filename (NamedTemporaryFile): NamedTemporaryFile object.
-        elements (`list` of `tuple`): List of tuples. Each tuple contains the
-            data for each line.
-        written (bool): Bool describing if the file has data on it or not.
+        header (str): Header string, None if the file has no header.
 
     Args:
         oname (str): String with output filename.
-        fformat (str, optional): String with file format, can be 'csv' or 'fasta'. 
+        elements (iterable of `tuple`): Data for each line, e.g.: a generator.
+        fformat (str, optional): String with file format, can be 'csv' or 'fasta'.
             Defaults to 'csv'.
         header (str, optional): Header string to write on the first line of the file.
             Defaults to `None`.
 
     """
-    def __init__(self, oname, fformat='csv', header=None):
+    def __init__(self, oname, elements, fformat='csv', header=None):
+        if fformat not in ('csv', 'fasta'):
+            raise exceptions.InvalidFormat(fformat)
         self.oname = oname
+        self.elements = elements
         self.fformat = fformat
         self.header = header
-        self.filename = tempfile.NamedTemporaryFile()
-        self.elements = []
-        self.written = False
 
-    def add_elements(self, elem):
+    def format_element(self, elem):
         """
-        Adds a register to the list of elements.
-
-        Args:
-            elem (`list` of `tuple`): List of tuples. 
-                Each tuple corresponds to a line.
-
+        Returns:
+            str: Line (or FASTA record) of one element.
         """
-        self.elements.extend(elem)
-        return self
+        if self.fformat == 'csv':
+            return "%s\n" % ",".join(elem)
+        formatseq = "".join(elem[1][i:i+64] + "\n" for i in range(0,len(elem[1]), 64))
+        return ">%s|%s|%s\n%s" % (elem[0], elem[2], elem[3], formatseq)
 
-    def write(self, what=None):
+    def iter_lines(self):
         """
-        Writes to temp file.
-
-        Args:
-            what (None): Nothing.
+        Yields:
+            str: Header and lines of the file.
+        """
+        if self.header is not None:
+            yield self.header
+        for elem in self.elements:
+            yield self.format_element(elem)
 
+    def iter_gzip(self):
+        """
+        Yields:
+            bytes: The file compressed with gzip, chunk by chunk.
         """
-        with open(self.filename.name, "w") as fh:
-            if self.header is not None:
-                fh.write(self.header)
-            for elem in self.elements:
-                if self.fformat == 'csv':
-                    fh.write( "%s\n" % ",".join(elem) )
-                elif self.fformat == 'fasta':
-                    formatseq = "".join(elem[1][i:i+64] + "\n" for i in range(0,len(elem[1]), 64)) 
-                    fh.write(">%s|%s|%s\n%s" % (elem[0], elem[2], elem[3], formatseq))
-                else:
-                    raise InvalidFormat(self.fformat)
-        self.written = True
-        return self
-
-    def to_response(self, what=None):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for line in self.iter_lines():
+            chunk = compressor.compress(line.encode("utf-8"))
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    def to_response(self, compress=False):
         """
         Creates a response object to be served to the user for download.
 
         Args:
-            what (None): Nothing.
+            compress (bool, optional): Serve the file compressed with gzip.
+                Defaults to False.
 
         Returns:
-            `HttpResponse`: HttpResponse object with the file to be returned 
+            `StreamingHttpResponse`: Response object with the file to be returned
                 in a request.
-                    
+
         """
-        if not self.written:
-            self.write(what)
-        wrapper = FileWrapper(open(self.filename.name))
-        response = HttpResponse(wrapper, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename=%s' % self.oname
-        response['Content-Length'] = os.path.getsize(self.filename.name)
+        if compress:
+            response = StreamingHttpResponse(self.iter_gzip(), content_type='application/gzip')
+            response['Content-Disposition'] = 'attachment; filename=%s.gz' % self.oname
+        else:
+            response = StreamingHttpResponse(self.iter_lines(), content_type='text/plain')
+            response['Content-Disposition'] = 'attachment; filename=%s' % self.oname
         return response
 
 
-from NetExplorer.models import exceptions
\ No newline at end of file
+from NetExplorer.models import exceptions
@@ -82,12 +82,21 @@ class NoHomologFound(Exception):
         return "Homolog of %s not found in database." % (self.symbol)
 
 class InvalidFormat(Exception):
-    """Exception raised when format for ServedFile is invalid"""
-    def __init__(self, ffomat):
+    """Exception raised when format for StreamedFile is invalid"""
+    def __init__(self, fformat):
         self.fformat = fformat
     def __str__(self):
         return "Invalid file format: %s ." % (self.fformat)
 
 
 class EmptyPlotError(Exception):
-    """Raised when performing operations on an empty Plot."""
\ No newline at end of file
+    """Raised when performing operations on an empty Plot."""
+
+# ------------------------------------------------------------------------------
+class EnrichmentFailed(Exception):
+    """Exception raised when a GO enrichment analysis can't be performed"""
+    def __init__(self, analysis, error):
+        self.analysis = analysis
+        self.error    = error
+    def __str__(self):
+        return "GO enrichment of %s failed: %s" % (self.analysis, self.error)
@@ -0,0 +1,89 @@
+"""
+Catalog of the expression experiments stored in Neo4j (the ones shown by
+the Network Viewer through :obj:`ExperimentList`).
+
+Reading it needs ALL_EXPERIMENTS_QUERY, which goes through every relationship
+of every Experiment node, so the catalog is built once and kept in the Django
+cache, shared by all the workers. Its key includes the PLANNET_DATA_VERSION
+setting: change the version when the experiments in Neo4j change, or run the
+`build_experiment_catalog` management command after loading them. The catalog
+includes private experiments; :obj:`ExperimentList` removes the ones the user
+can't see.
+
+Settings example::
+
+    PLANNET_DATA_VERSION = "1"
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/var/tmp/plannet_cache',
+        }
+    }
+"""
+from .common import *
+from django.core.cache import cache
+
+
+CATALOG_KEY = "plannet:experiment_catalog:%s"
+
+
+def catalog_key():
+    """
+    Returns:
+        str: Cache key of the catalog for the current PLANNET_DATA_VERSION.
+    """
+    return CATALOG_KEY % getattr(settings, 'PLANNET_DATA_VERSION', "0")
+
+
+def build_experiment_catalog():
+    """
+    Reads the experiments from Neo4j.
+
+    Returns:
+        `list` of `dict`: One entry per experiment, sorted by identifier::
+
+            {
+                'identifier': str, 'url': str, 'reference': str,
+                'private': bool,
+                'samples': sorted `list` of `str`,
+                'datasets': sorted `list` of `str`
+            }
+    """
+    experiments = {}
+    for row in run_query(neoquery.ALL_EXPERIMENTS_QUERY).data():
+        entry = experiments.setdefault(row['identifier'], {
+            'identifier': row['identifier'],
+            'url': row['url'],
+            'reference': row['reference'],
+            'private': row['private'] == 1,
+            'samples': set(),
+            'datasets': set(),
+        })
+        entry['samples'].update(row['samples'])
+        for labels in row['datasets']:
+            entry['datasets'].update(label for label in labels if label != "PlanarianContig")
+    catalog = []
+    for identifier in sorted(experiments):
+        entry = experiments[identifier]
+        entry['samples'] = sorted(entry['samples'])
+        entry['datasets'] = sorted(entry['datasets'])
+        catalog.append(entry)
+    return catalog
+
+
+def get_experiment_catalog(rebuild=False):
+    """
+    Returns the catalog from the cache, building it if it is not there.
+
+    Args:
+        rebuild (bool, optional): Build it even if it is cached. Defaults to False.
+
+    Returns:
+        `list` of `dict`: See `build_experiment_catalog`. Don't modify it.
+    """
+    key = catalog_key()
+    catalog = None if rebuild else cache.get(key)
+    if catalog is None:
+        catalog = build_experiment_catalog()
+        cache.set(key, catalog, None)
+    return catalog
@@ -1,6 +1,6 @@
 from .common import *
-from .gene_ontology_data import *
-from django.conf import settings
+import shutil
+from .go_enrichment_engine import GO_ENRICHMENT
 
 
 class GeneOntologyEnrichment(object):
@@ -8,25 +8,21 @@ class GeneOntologyEnrichment(object):
     Class used for GeneOntology Enrichment.
 
     Attributes:
-        goe (GOEnrichmentStudy): GOEA object from goatools that contains the 
-            analysis performed.
-        results (`list` of `GOEnrichmentRecord`): Records with overrepresented
-            GO terms
-    
+        engine (:obj:`GOEnrichmentEngine`): Shared enrichment engine (GODag and
+            population table of the worker process).
+        study (:obj:`EnrichmentStudy`): Analysis performed.
+        results (`list` of :obj:`EnrichmentRecord`): Records with overrepresented
+            GO terms (best 20 of each domain).
+        results_all (`list` of :obj:`EnrichmentRecord`): All the significant records.
+        error (Exception): Error of the last `get_enriched_gos` that failed.
+
     """
-    _obodag = GODag(os.path.join(settings.BASE_DIR, 'share', 'go-basic.obo'))
-    def __init__(self):
-        self.goe = GOEnrichmentStudy(
-            go_geneids, 
-            geneid2go, 
-            GeneOntologyEnrichment._obodag, 
-            propagate_counts=False, 
-            alpha=0.05, 
-            methods=['fdr_bh']
-        )
-        self.study_results = None
+    def __init__(self, engine=None):
+        self.engine = engine or GO_ENRICHMENT
+        self.study = None
         self.results = None
         self.results_all = None
+        self.error = None
         self.pvalue_cutoff = 0.05
     
     def get_enriched_gos(self, gene_symbols):
@@ -37,17 +33,19 @@ class GeneOntologyEnrichment(object):
             gene_symbols (str): Human gene symbols to compute enrichment for.
         
         Returns:
-            `list` of `GOEnrichmentRecord` or `None`: Records with overrepresented
+            `list` of :obj:`EnrichmentRecord` or `None`: Records with overrepresented
                 GO terms if available, otherwise `None`.
         """
         try:
-            gene_ids = [ genesymbol2id[symbol] for symbol in gene_symbols if symbol in genesymbol2id ]
-            self.study_results = self.goe.run_study(gene_ids, alpha=self.pvalue_cutoff)
-            self.results = [ r for r in self.study_results if r.p_fdr_bh <= self.pvalue_cutoff ]
+            gene_ids = self.engine.gene_ids(gene_symbols)
+            self.study = self.engine.run_study(gene_ids, alpha=self.pvalue_cutoff)
+            self.results = list(self.study.records)
             self.results_all = list(self.results)
             self._keep_best_n()
             return self.results
         except Exception as err:
+            logging.error("GO enrichment error: {}".format(err))
+            self.error = err
             return None
 
     def get_stats(self, gene_set):
@@ -55,13 +53,11 @@ class GeneOntologyEnrichment(object):
         Returns some stats of GO analysis performed
         """
         stats = {'genes_with_go': 0, 'num_of_go': 0, 'input_genes': len(gene_set), 'num_of_sig_go': 0}
-        if not self.study_results:
+        if not self.study or not self.study.study_n:
             return stats
 
-        genes_with_go, num_of_go = self.goe.get_item_cnt(self.study_results, "study_items")
-
-        stats['genes_with_go'] = len(genes_with_go)
-        stats['num_of_go'] = num_of_go
+        stats['genes_with_go'] = self.study.genes_with_go
+        stats['num_of_go'] = self.study.num_of_go
         stats['input_genes'] = len(gene_set)
         stats['num_of_sig_go'] = len(self.results_all)
         return stats
@@ -92,18 +88,19 @@ class GeneOntologyEnrichment(object):
 
         if not self.results:
             return None
-        tmp = tempfile.NamedTemporaryFile(delete=False)
-        tmp.name += "{NS}.png"
-
-        plot_results(tmp.name, self.results)
+        # plot_results writes one png per domain, removed once they are read.
+        tmpdir = tempfile.mkdtemp(prefix="plannet_goea_")
         plot_dict = { 'BP': None, 'CC': None, 'MF': None }
-        for domain in ["BP", "CC", "MF"]:
-            fn = tmp.name.format(NS=domain)
-            try:
-                plot_dict[domain] = base64.b64encode(open(fn, 'rb').read()).decode('utf-8').replace('\n', '')
-            except Exception as err:
-                print(err)
-                continue
+        try:
+            plot_results(os.path.join(tmpdir, "{NS}.png"), self.results)
+            for domain in ["BP", "CC", "MF"]:
+                fn = os.path.join(tmpdir, "%s.png" % domain)
+                if not os.path.exists(fn):
+                    continue
+                with open(fn, 'rb') as fh:
+                    plot_dict[domain] = base64.b64encode(fh.read()).decode('utf-8').replace('\n', '')
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
         return plot_dict
 
     def get_go_list(self):
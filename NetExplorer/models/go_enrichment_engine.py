@@ -0,0 +1,402 @@
+"""
+Gene Ontology enrichment computed with matrix operations.
+
+goatools builds a `GOEnrichmentStudy` over the whole population for every
+analysis and then tests the GO terms one by one. Here the population (all the
+human genes with their GO annotations, the same `go_geneids` and `geneid2go`
+used before) is a sparse genes x terms matrix built once per worker process,
+or loaded from the file written by the `build_go_enrichment` management
+command. An analysis is then:
+
+    * Study counts: the rows of the study genes summed (one sparse product).
+    * Two-sided Fisher's exact test of every term at once, from the
+      hypergeometric distribution (the same test goatools runs with
+      scipy.stats.fisher_exact).
+    * Benjamini-Hochberg FDR over all the terms (as statsmodels 'fdr_bh').
+
+Only the significant terms become records, with the attributes of goatools'
+`GOEnrichmentRecord` used by PlanNET (and by goatools' `plot_results`).
+"""
+from .common import *
+from collections import namedtuple
+
+import numpy as np
+from scipy import sparse
+from scipy.stats import hypergeom
+
+
+NAMESPACES = {
+    'biological_process': 'BP',
+    'cellular_component': 'CC',
+    'molecular_function': 'MF',
+}
+
+# Relative tolerance of scipy.stats.fisher_exact when comparing probabilities.
+FISHER_LOG_GAMMA = np.log1p(1e-14)
+
+# Largest number of probabilities computed at once by `fisher_exact_two_sided`.
+MAX_CELLS = 2 ** 22
+
+MethodField = namedtuple("MethodField", "source method fieldname")
+FDR_BH = MethodField(source="statsmodels", method="fdr_bh", fieldname="fdr_bh")
+
+
+# ------------------------------------------------------------------------------
+def fisher_exact_two_sided(study_counts, study_n, pop_counts, pop_n):
+    """
+    Two-sided Fisher's exact test of many 2x2 tables with the same study and
+    population sizes, like goatools: [[study_count, study_n - study_count],
+    [pop_count - study_count, pop_n - pop_count - (study_n - study_count)]].
+
+    The p-value is the sum of the hypergeometric probabilities that are not
+    larger than the observed one. The distribution of each different
+    population count is computed once, over 0..study_n.
+
+    Args:
+        study_counts (`numpy.ndarray` of int): Study genes in each term.
+        study_n (int): Study genes (in the population).
+        pop_counts (`numpy.ndarray` of int): Population genes in each term.
+        pop_n (int): Population genes.
+
+    Returns:
+        `numpy.ndarray` of float: p-value of each term.
+    """
+    study_counts = np.asarray(study_counts, dtype=np.int64)
+    pop_counts   = np.asarray(pop_counts, dtype=np.int64)
+    if study_n == 0 or not len(study_counts):
+        return np.ones(len(study_counts))
+
+    pairs, pair_idx = np.unique(
+        np.stack([pop_counts, study_counts], axis=1), axis=0, return_inverse=True
+    )
+    counts, count_idx = np.unique(pairs[:, 0], return_inverse=True)
+    count_idx = count_idx.ravel()
+    grid      = np.arange(study_n + 1)
+    step      = max(1, MAX_CELLS // len(grid))
+    pvalues   = np.empty(len(pairs))
+    for start in range(0, len(counts), step):
+        logpmf = hypergeom.logpmf(grid[None, :], pop_n, counts[start:start + step, None], study_n)
+        in_block = np.nonzero((count_idx >= start) & (count_idx < start + step))[0]
+        for chunk in range(0, len(in_block), step):
+            selected = in_block[chunk:chunk + step]
+            rows     = logpmf[count_idx[selected] - start]
+            observed = rows[np.arange(len(selected)), pairs[selected, 1]]
+            extreme  = rows <= (observed + FISHER_LOG_GAMMA)[:, None]
+            pvalues[selected] = np.where(extreme, np.exp(rows), 0).sum(axis=1)
+    return np.minimum(pvalues, 1)[pair_idx.ravel()]
+
+
+def fdr_bh(pvalues):
+    """
+    Benjamini-Hochberg adjusted p-values, as statsmodels' multipletests
+    with method 'fdr_bh'.
+
+    Returns:
+        `numpy.ndarray` of float: Adjusted p-values, in the same order.
+    """
+    pvalues = np.asarray(pvalues, dtype=float)
+    if not len(pvalues):
+        return pvalues
+    order    = np.argsort(pvalues)
+    adjusted = pvalues[order] * len(pvalues) / np.arange(1, len(pvalues) + 1)
+    adjusted = np.minimum.accumulate(adjusted[::-1])[::-1]
+    result   = np.empty(len(pvalues))
+    result[order] = np.minimum(adjusted, 1)
+    return result
+
+
+# ------------------------------------------------------------------------------
+class EnrichmentRecord(object):
+    """
+    Result of one GO term, with the attributes of goatools' `GOEnrichmentRecord`.
+
+    Attributes:
+        GO (str): GO identifier.
+        goterm (GOTerm): Term of the GODag.
+        NS (str): 'BP', 'CC' or 'MF'.
+        name (str): Name of the term.
+        enrichment (str): 'e' (enriched) or 'p' (purified).
+        ratio_in_study (`tuple`): (study_count, study_n).
+        ratio_in_pop (`tuple`): (pop_count, pop_n).
+        p_uncorrected (float): Fisher's exact test p-value.
+        p_fdr_bh (float): Benjamini-Hochberg adjusted p-value.
+        study_items (`set`): Study genes annotated with the term.
+        pop_items (`set`): Population genes annotated with the term.
+    """
+    method_flds = [ FDR_BH ]
+
+    def __init__(self, goterm, study_items, pop_items, study_n, pop_n, p_uncorrected, p_fdr_bh):
+        self.GO             = goterm.id
+        self.goterm         = goterm
+        self.NS             = NAMESPACES.get(goterm.namespace, goterm.namespace)
+        self.name           = goterm.name
+        self.depth          = goterm.depth
+        self.study_items    = study_items
+        self.pop_items      = pop_items
+        self.study_count    = len(study_items)
+        self.study_n        = study_n
+        self.pop_count      = len(pop_items)
+        self.pop_n          = pop_n
+        self.ratio_in_study = (self.study_count, study_n)
+        self.ratio_in_pop   = (self.pop_count, pop_n)
+        self.p_uncorrected  = p_uncorrected
+        self.p_fdr_bh       = p_fdr_bh
+        self.enrichment     = 'e' if self.study_count * pop_n > self.pop_count * study_n else 'p'
+
+    def __repr__(self):
+        return "<EnrichmentRecord %s %s p_fdr_bh=%.3g>" % (self.GO, self.enrichment, self.p_fdr_bh)
+
+
+# ------------------------------------------------------------------------------
+class EnrichmentStudy(object):
+    """
+    Outcome of one analysis.
+
+    Attributes:
+        records (`list` of :obj:`EnrichmentRecord`): Significant terms, sorted
+            like goatools (enrichment, namespace, p-value).
+        study_n (int): Study genes found in the population.
+        genes_with_go (int): Study genes with at least one GO term.
+        num_of_go (int): GO terms with at least one study gene.
+    """
+    def __init__(self, records=None, study_n=0, genes_with_go=0, num_of_go=0):
+        self.records       = records or []
+        self.study_n       = study_n
+        self.genes_with_go = genes_with_go
+        self.num_of_go     = num_of_go
+
+
+# ------------------------------------------------------------------------------
+class PopulationTable(object):
+    """
+    GO annotations of the population as a sparse matrix.
+
+    Attributes:
+        gene_ids (`numpy.ndarray`): Population genes (rows).
+        term_ids (`numpy.ndarray`): GO terms (columns), main identifiers of the GODag.
+        matrix (`scipy.sparse.csr_matrix`): 1 if the gene is annotated with the term.
+        pop_counts (`numpy.ndarray` of int): Genes of each term.
+        symbols (`dict`): Gene id of each human gene symbol.
+    """
+    def __init__(self, gene_ids, term_ids, matrix, symbols):
+        self.gene_ids   = np.asarray(gene_ids)
+        self.term_ids   = np.asarray(term_ids)
+        self.matrix     = sparse.csr_matrix(matrix, dtype=np.int32)
+        self.pop_counts = np.asarray(self.matrix.sum(axis=0)).ravel()
+        self.symbols    = symbols
+        self.rows       = dict((gene_id, row) for row, gene_id in enumerate(self.gene_ids.tolist()))
+        self._columns   = None
+
+    @property
+    def columns(self):
+        """
+        `scipy.sparse.csc_matrix`: Same matrix, to read the genes of a term.
+        """
+        if self._columns is None:
+            self._columns = self.matrix.tocsc()
+        return self._columns
+
+    @property
+    def pop_n(self):
+        return len(self.gene_ids)
+
+    @classmethod
+    def from_associations(cls, population, associations, dag, symbols):
+        """
+        Builds the table from goatools-style associations. As in goatools
+        (with propagate_counts=False), terms missing from the GODag are
+        ignored and alternative identifiers count as their main term.
+
+        Args:
+            population (iterable): Gene ids of the population.
+            associations (`dict`): GO identifiers of each gene id.
+            dag (GODag): Gene Ontology.
+            symbols (`dict`): Gene id of each gene symbol.
+        """
+        gene_ids = sorted(set(population))
+        columns  = {}
+        rows, cols = [], []
+        for row, gene_id in enumerate(gene_ids):
+            terms = set(dag[goid].id for goid in associations.get(gene_id, ()) if goid in dag)
+            for term in terms:
+                rows.append(row)
+                cols.append(columns.setdefault(term, len(columns)))
+        term_ids = [ None ] * len(columns)
+        for term, col in columns.items():
+            term_ids[col] = term
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(gene_ids), len(term_ids))
+        )
+        return cls(gene_ids, term_ids, matrix, symbols)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as content:
+            matrix = sparse.csr_matrix(
+                (np.ones(len(content['indices']), dtype=np.int32), content['indices'], content['indptr']),
+                shape=(len(content['gene_ids']), len(content['term_ids']))
+            )
+            symbols = dict(zip(content['symbols'].tolist(), content['symbol_gene_ids'].tolist()))
+            return cls(content['gene_ids'], content['term_ids'], matrix, symbols)
+
+    def save(self, path):
+        """
+        Writes the table to a .npz file, replacing it atomically.
+        """
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        symbols = sorted(self.symbols.items())
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".npz", delete=False) as fh:
+            np.savez_compressed(
+                fh,
+                gene_ids=self.gene_ids,
+                term_ids=self.term_ids,
+                indptr=self.matrix.indptr,
+                indices=self.matrix.indices,
+                symbols=np.array([ symbol for symbol, gene_id in symbols ]),
+                symbol_gene_ids=np.array([ gene_id for symbol, gene_id in symbols ])
+            )
+        os.replace(fh.name, path)
+
+    def study_rows(self, gene_ids):
+        """
+        Returns:
+            `numpy.ndarray` of int: Rows of the gene ids in the population.
+        """
+        return np.array(sorted(set(
+            self.rows[gene_id] for gene_id in gene_ids if gene_id in self.rows
+        )), dtype=np.int64)
+
+    def genes(self, col, rows=None):
+        """
+        Returns:
+            `set`: Gene ids annotated with the term of a column (only from
+                rows, if given).
+        """
+        column = self.columns
+        genes  = column.indices[column.indptr[col]:column.indptr[col + 1]]
+        if rows is not None:
+            genes = np.intersect1d(genes, rows, assume_unique=True)
+        return set(self.gene_ids[genes].tolist())
+
+
+# ------------------------------------------------------------------------------
+class GOEnrichmentEngine(object):
+    """
+    GO enrichment service of the worker process. The GODag and the population
+    table are loaded on first use: the table from the file written by the
+    `build_go_enrichment` command if it exists, otherwise it is built from
+    the associations in gene_ontology_data.
+
+    Args:
+        path (str, optional): Path of the table file. Defaults to
+            go_enrichment.npz inside the PLANNET_INDEX_DIR setting.
+    """
+    filename = "go_enrichment.npz"
+
+    def __init__(self, path=None):
+        self._path  = path
+        self._dag   = None
+        self._table = None
+        self._lock  = threading.Lock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = os.path.join(settings.PLANNET_INDEX_DIR, self.filename)
+        return self._path
+
+    @property
+    def dag(self):
+        if self._dag is None:
+            with self._lock:
+                if self._dag is None:
+                    self._dag = GODag(os.path.join(settings.BASE_DIR, 'share', 'go-basic.obo'))
+        return self._dag
+
+    @property
+    def table(self):
+        if self._table is None:
+            dag = self.dag
+            with self._lock:
+                if self._table is None:
+                    if os.path.exists(self.path):
+                        self._table = PopulationTable.load(self.path)
+                        logging.info("GO enrichment table loaded from %s" % self.path)
+                    else:
+                        self._table = self.build(dag)
+        return self._table
+
+    @staticmethod
+    def build(dag):
+        """
+        Returns:
+            :obj:`PopulationTable`: Table of the human population used by PlanNET.
+        """
+        from NetExplorer.models.gene_ontology_data import go_geneids, geneid2go, genesymbol2id
+        return PopulationTable.from_associations(go_geneids, geneid2go, dag, genesymbol2id)
+
+    def gene_ids(self, symbols):
+        """
+        Returns:
+            `list`: Gene ids of the human gene symbols (unknown symbols are skipped).
+        """
+        symbols_map = self.table.symbols
+        return [ symbols_map[symbol] for symbol in symbols if symbol in symbols_map ]
+
+    def test(self, rows):
+        """
+        Tests all the GO terms for a study.
+
+        Args:
+            rows (`numpy.ndarray` of int): Population rows of the study genes.
+
+        Returns:
+            `tuple` of `numpy.ndarray`: Study count, p-value and adjusted
+                p-value of each term (column).
+        """
+        table        = self.table
+        study_counts = np.asarray(table.matrix[rows].sum(axis=0)).ravel()
+        pvalues      = fisher_exact_two_sided(study_counts, len(rows), table.pop_counts, table.pop_n)
+        return study_counts, pvalues, fdr_bh(pvalues)
+
+    def run_study(self, gene_ids, alpha=0.05):
+        """
+        Runs the enrichment analysis of a set of genes.
+
+        Args:
+            gene_ids (iterable): Gene ids of the study.
+            alpha (float, optional): Cutoff of the adjusted p-values. Defaults to 0.05.
+
+        Returns:
+            :obj:`EnrichmentStudy`: Significant terms and counts.
+        """
+        table = self.table
+        rows  = table.study_rows(gene_ids)
+        if not len(rows):
+            return EnrichmentStudy()
+        study_counts, pvalues, adjusted = self.test(rows)
+        records = [
+            EnrichmentRecord(
+                goterm        = self.dag[table.term_ids[col]],
+                study_items   = table.genes(col, rows),
+                pop_items     = table.genes(col),
+                study_n       = len(rows),
+                pop_n         = table.pop_n,
+                p_uncorrected = float(pvalues[col]),
+                p_fdr_bh      = float(adjusted[col])
+            )
+            for col in np.nonzero(adjusted <= alpha)[0]
+        ]
+        records.sort(key=lambda record: (record.enrichment, record.NS, record.p_uncorrected))
+        return EnrichmentStudy(
+            records       = records,
+            study_n       = len(rows),
+            genes_with_go = int((table.matrix[rows].getnnz(axis=1) > 0).sum()),
+            num_of_go     = int((study_counts > 0).sum())
+        )
+
+
+GO_ENRICHMENT = GOEnrichmentEngine()
@@ -0,0 +1,228 @@
+"""
+Cache of the PlanExp GO enrichment results.
+
+The GO enrichment of a comparison (the differentially expressed genes of one
+condition against another, their human homologs, the enrichment and the
+three GO plots) only depends on the experiment, the dataset, the pair of
+conditions and the condition in focus, and the data doesn't change until a
+new upload. The results (stats, GO list and plots) are kept without
+expiration in the 'goea' Django cache (the default cache if it is not
+configured), which needs a MAX_ENTRIES large enough for all of them.
+
+Keys use the ids of the experiment, dataset and conditions (an experiment
+uploaded again gets new ids) and the PLANNET_DATA_VERSION setting, which
+should be changed after updating the GO data (go-basic.obo or the
+build_go_enrichment table). The `precompute_goea` management command fills
+the cache for every comparison of an experiment.
+"""
+from .common import *
+import hashlib
+from django.core.cache import caches
+from django.db import connections
+from multiprocessing import Pool
+from NetExplorer.models.mysql_models import Experiment, Dataset, Condition, ExpressionRelative
+from NetExplorer.models.gene_ontology import GeneOntologyEnrichment
+from NetExplorer.models.go_enrichment_engine import GO_ENRICHMENT
+
+
+GOEA_KEY   = "plannet:goea:%s:%s"
+GOEA_CACHE = "goea"
+
+
+def goea_cache():
+    """
+    Returns:
+        BaseCache: The 'goea' cache, or the default one if it is not configured.
+    """
+    return caches[GOEA_CACHE if GOEA_CACHE in settings.CACHES else 'default']
+
+
+# ------------------------------------------------------------------------------
+class GOEAComparison(object):
+    """
+    One GO enrichment analysis of PlanExp: the genes of `condition_focus`
+    in the comparison of condition1 and condition2.
+
+    Args:
+        experiment (str): Experiment name.
+        dataset (str): Dataset name.
+        condition1 (str): Condition name.
+        condition2 (str): Condition name.
+        condition_focus (str): Name of the condition (condition1 or condition2)
+            whose up-regulated genes are analysed.
+
+    Raises:
+        ObjectDoesNotExist: If the experiment, dataset or conditions don't exist.
+    """
+    def __init__(self, experiment, dataset, condition1, condition2, condition_focus):
+        self.experiment = Experiment.objects.get(name=experiment)
+        self.dataset = Dataset.objects.get(name=dataset)
+        self.condition1 = Condition.objects.get(name=condition1, experiment=self.experiment)
+        self.condition2 = Condition.objects.get(name=condition2, experiment=self.experiment)
+        self.condition_focus = condition_focus
+
+    def key(self):
+        """
+        Returns:
+            str: Cache key of the comparison. The same for both orders of
+                the conditions.
+        """
+        params = json.dumps([
+            self.experiment.id, self.dataset.id,
+            sorted([ self.condition1.id, self.condition2.id ]),
+            self.condition_focus
+        ])
+        return GOEA_KEY % (
+            getattr(settings, 'PLANNET_DATA_VERSION', "0"),
+            hashlib.sha1(params.encode('utf-8')).hexdigest()
+        )
+
+    def __str__(self):
+        return "%s %s: %s vs %s (%s)" % (
+            self.experiment.name, self.dataset.name,
+            self.condition1.name, self.condition2.name, self.condition_focus
+        )
+
+    def expression(self):
+        """
+        Returns:
+            QuerySet: :obj:`ExpressionRelative` rows of the comparison, in the
+                order they are stored.
+        """
+        expression = ExpressionRelative.objects.filter(
+            experiment=self.experiment, dataset=self.dataset,
+            condition1=self.condition1, condition2=self.condition2)
+        if not expression.exists():
+            # In case condition1 and condition2 are reversed in Database
+            expression = ExpressionRelative.objects.filter(
+                experiment=self.experiment, dataset=self.dataset,
+                condition1=self.condition2, condition2=self.condition1)
+        return expression
+
+    def compute(self):
+        """
+        Runs the analysis.
+
+        Returns:
+            Union([dict, None]): {'stats': dict, 'golist': str, 'plots': dict}
+                (see :obj:`GeneOntologyEnrichment`), None if the conditions
+                were not compared.
+
+        Raises:
+            EnrichmentFailed: If the enrichment can't be computed (e.g. the
+                GODag or the population table can't be loaded).
+        """
+        expression = self.expression()
+        if not expression:
+            return None
+        if self.condition_focus == expression[0].condition1.name:
+            # Must get Positive fold changes
+            gene_set = list(expression.filter(fold_change__gte=0).values_list('gene_symbol', flat=True))
+        else:
+            # Must get Negative fold changes
+            gene_set = list(expression.filter(fold_change__lte=0).values_list('gene_symbol', flat=True))
+        # Get homologous proteins
+        gene_human_set = GraphCytoscape.get_homologs_bulk(gene_set, self.dataset.name).values()
+        go_analysis = GeneOntologyEnrichment()
+        if go_analysis.get_enriched_gos(gene_human_set) is None:
+            raise exceptions.EnrichmentFailed(self, go_analysis.error)
+        return {
+            'stats': go_analysis.get_stats(gene_set),
+            'golist': go_analysis.get_go_list(),
+            'plots': go_analysis.get_plots(),
+        }
+
+    def get(self, rebuild=False):
+        """
+        Returns the results from the cache, computing them if they are not there.
+
+        Args:
+            rebuild (bool, optional): Compute them even if they are cached.
+                Defaults to False.
+
+        Returns:
+            Union([dict, None]): See `compute`.
+
+        Raises:
+            EnrichmentFailed: See `compute`. Failures are not cached.
+        """
+        key = self.key()
+        cache = goea_cache()
+        result = None if rebuild else cache.get(key)
+        if result is None:
+            result = self.compute()
+            if result is not None:
+                cache.set(key, result, None)
+        return result
+
+
+# ------------------------------------------------------------------------------
+def get_goea_comparisons(experiment, dataset=None):
+    """
+    Lists all the analyses of an experiment: both conditions of every pair
+    compared in ExpressionRelative.
+
+    Args:
+        experiment (str): Experiment name.
+        dataset (str, optional): Only the comparisons of this dataset.
+
+    Returns:
+        `list` of `tuple`: (experiment, dataset, condition1, condition2,
+            condition_focus) names.
+    """
+    rows = ExpressionRelative.objects.filter(experiment__name=experiment)
+    if dataset is not None:
+        rows = rows.filter(dataset__name=dataset)
+    pairs = rows.values_list('dataset__name', 'condition1__name', 'condition2__name').distinct()
+    comparisons = []
+    for dataset_name, condition1, condition2 in sorted(set(pairs)):
+        for focus in (condition1, condition2):
+            comparisons.append((experiment, dataset_name, condition1, condition2, focus))
+    return comparisons
+
+
+def _precompute_comparison(args):
+    """
+    Computes and caches one analysis. Runs in the processes of `precompute_goea`.
+
+    Returns:
+        `tuple`: (comparison, number of significant GO terms or None, error message or None).
+    """
+    comparison, rebuild = args
+    try:
+        result = GOEAComparison(*comparison).get(rebuild=rebuild)
+        return comparison, result['stats']['num_of_sig_go'] if result else None, None
+    except Exception as err:
+        return comparison, None, str(err)
+
+
+def precompute_goea(comparisons, processes=None, rebuild=False):
+    """
+    Fills the cache for several analyses with a pool of processes. The GO
+    enrichment table is loaded before starting them, so they share it.
+
+    Args:
+        comparisons (`list` of `tuple`): See `get_goea_comparisons`.
+        processes (int, optional): Number of processes. Defaults to the
+            number of CPUs. 1 runs them in this process.
+        rebuild (bool, optional): Compute the cached ones again.
+
+    Yields:
+        `tuple`: Result of each analysis, see `_precompute_comparison`.
+    """
+    tasks = [ (comparison, rebuild) for comparison in comparisons ]
+    # Loaded here, so the forked processes inherit the table and the GODag.
+    GO_ENRICHMENT.table
+    if processes == 1:
+        for task in tasks:
+            yield _precompute_comparison(task)
+        return
+    # Database connections can't be shared by the forked processes.
+    connections.close_all()
+    pool = Pool(processes)
+    try:
+        for outcome in pool.imap_unordered(_precompute_comparison, tasks):
+            yield outcome
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,388 @@
+"""
+Backends used by PlanNET to talk to Neo4j.
+
+The module-global `GRAPH` object in `NetExplorer.models.common` is a
+:class:`GraphProxy`: it reads the ``NEO4J`` dictionary from the Django settings
+the first time it is used and builds the configured backend. Every backend
+exposes the same ``run(query, **params)`` method, returning a
+:class:`QueryResult` that supports ``.data()`` and iteration, just like the
+py2neo cursors the models were written against, and an
+``explain(query, **params)`` method returning the operators of the plan.
+
+Settings example::
+
+    NEO4J = {
+        'BACKEND': 'bolt',               # Needs the neo4j driver (pip install neo4j).
+        'URI': 'bolt://127.0.0.1:7687',
+        'USER': 'neo4j',
+        'PASSWORD': 'secret',
+        'NO_AUTH': False,                # True to connect to Bolt without credentials.
+        'MAX_POOL_SIZE': 50,
+        'MAX_CONNECTION_LIFETIME': 3600,
+        'CONNECTION_ACQUISITION_TIMEOUT': 60,
+    }
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+DEFAULT_NEO4J_SETTINGS = {
+    'BACKEND': 'http',
+    'URI': 'http://127.0.0.1:7474/db/data/',
+    'USER': None,
+    'PASSWORD': None,
+    'NO_AUTH': False,
+    'MAX_POOL_SIZE': 50,
+    'MAX_CONNECTION_LIFETIME': 3600,
+    'CONNECTION_ACQUISITION_TIMEOUT': 60,
+}
+
+
+# ------------------------------------------------------------------------------
+class QueryResult(object):
+    """
+    Eager result of a Cypher query. Records are fetched before the session is
+    given back to the pool, so the result can be used after that.
+
+    Attributes:
+        records (`list` of `dict`): One dictionary per returned row.
+    """
+    __slots__ = ("records",)
+
+    def __init__(self, records):
+        self.records = records
+
+    def data(self):
+        """
+        Returns:
+            `list` of `dict`: One dictionary per returned row.
+        """
+        return self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+def plan_operators(plan):
+    """
+    Flattens a query plan returned by EXPLAIN.
+
+    Args:
+        plan: Root of the plan. Either an object with `operator_type` and
+            `children` attributes (py2neo, neo4j driver 1.x) or a dictionary
+            with 'operatorType' and 'children' keys (neo4j driver 4.x).
+
+    Returns:
+        `list` of `str`: Operator names of the plan, root first. Runtime
+            suffixes (e.g.: '@neo4j') are removed.
+    """
+    operators = []
+    pending   = [plan] if plan is not None else []
+    while pending:
+        step = pending.pop()
+        if isinstance(step, dict):
+            operator = step.get('operatorType', '')
+            children = step.get('children', [])
+        else:
+            operator = getattr(step, 'operator_type', '')
+            children = getattr(step, 'children', [])
+        operators.append(operator.split("@")[0])
+        pending.extend(reversed(list(children)))
+    return operators
+
+
+# ------------------------------------------------------------------------------
+class HttpBackend(object):
+    """
+    Backend using the py2neo REST interface. One HTTP round-trip per query.
+
+    Attributes:
+        uri (str): Neo4j REST endpoint.
+    """
+    def __init__(self, uri, user=None, password=None, **kwargs):
+        self.uri      = uri
+        self.user     = user
+        self.password = password
+        self._graph   = None
+        self._lock    = threading.Lock()
+
+    def _get_graph(self):
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    from py2neo import Graph
+                    if self.user:
+                        self._graph = Graph(self.uri, user=self.user, password=self.password)
+                    else:
+                        self._graph = Graph(self.uri)
+        return self._graph
+
+    def run(self, query, **params):
+        """
+        Runs a Cypher query.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            QueryResult: Rows returned by the query.
+        """
+        return QueryResult(self._get_graph().run(query, **params).data())
+
+    def explain(self, query, **params):
+        """
+        Plans a Cypher query with EXPLAIN, without running it.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            `list` of `str`: Operators of the query plan.
+        """
+        cursor = self._get_graph().run("EXPLAIN " + query, **params)
+        if hasattr(cursor, 'plan'):
+            plan = cursor.plan()
+        else:
+            plan = cursor.summary().plan
+        return plan_operators(plan)
+
+    def reset(self):
+        """Forgets the current connection, it will be opened again when needed."""
+        with self._lock:
+            self._graph = None
+
+    def close(self):
+        self.reset()
+
+
+# ------------------------------------------------------------------------------
+class BoltBackend(object):
+    """
+    Backend using the official ``neo4j`` driver over Bolt. The driver keeps a
+    pool of open connections that is shared by all the threads of a worker.
+
+    The driver is created lazily and is bound to the process that created it:
+    sockets can't be shared after a fork, so a forked worker detects the new
+    pid and builds its own driver (see :func:`init_worker` to do it eagerly).
+
+    Attributes:
+        uri (str): Bolt URI.
+        no_auth (bool): Connect without credentials. Otherwise a user is required.
+        max_pool_size (int): Maximum number of connections per worker.
+        max_connection_lifetime (int): Seconds before a connection is recycled.
+        connection_acquisition_timeout (int): Seconds to wait for a free
+            connection before giving up.
+    """
+    def __init__(self, uri, user=None, password=None, no_auth=False, max_pool_size=50,
+                 max_connection_lifetime=3600, connection_acquisition_timeout=60, **kwargs):
+        if not user and not no_auth:
+            raise ImproperlyConfigured(
+                "NEO4J USER is empty. Set NEO4J['NO_AUTH'] = True to connect to Bolt without credentials."
+            )
+        self.uri      = uri
+        self.user     = user
+        self.password = password
+        self.no_auth  = no_auth
+        self.max_pool_size                  = max_pool_size
+        self.max_connection_lifetime        = max_connection_lifetime
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self._driver  = None
+        self._pid     = None
+        self._lock    = threading.Lock()
+
+    def _get_driver(self):
+        pid = os.getpid()
+        if self._driver is None or self._pid != pid:
+            with self._lock:
+                if self._driver is None or self._pid != pid:
+                    # A driver inherited from the parent process is dropped
+                    # without closing it: its sockets belong to the parent.
+                    from neo4j import GraphDatabase
+                    auth = None if self.no_auth else (self.user, self.password)
+                    self._driver = GraphDatabase.driver(
+                        self.uri,
+                        auth=auth,
+                        max_connection_pool_size=self.max_pool_size,
+                        max_connection_lifetime=self.max_connection_lifetime,
+                        connection_acquisition_timeout=self.connection_acquisition_timeout
+                    )
+                    self._pid = pid
+                    logging.info("Neo4j Bolt driver opened for %s (pid %s)" % (self.uri, pid))
+        return self._driver
+
+    def run(self, query, **params):
+        """
+        Runs a Cypher query in a session borrowed from the pool.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            QueryResult: Rows returned by the query.
+        """
+        with self._get_driver().session() as session:
+            records = session.run(query, params).data()
+        return QueryResult(records)
+
+    def explain(self, query, **params):
+        """
+        Plans a Cypher query with EXPLAIN, without running it.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            `list` of `str`: Operators of the query plan.
+        """
+        with self._get_driver().session() as session:
+            summary = session.run("EXPLAIN " + query, params).consume()
+        return plan_operators(summary.plan)
+
+    def reset(self):
+        """
+        Closes the pool if it was opened by this process. The next query
+        opens a new one.
+        """
+        with self._lock:
+            if self._driver is not None and self._pid == os.getpid():
+                self._driver.close()
+            self._driver = None
+            self._pid    = None
+
+    def close(self):
+        self.reset()
+
+
+BACKENDS = {
+    'http': HttpBackend,
+    'bolt': BoltBackend,
+}
+
+
+# ------------------------------------------------------------------------------
+def get_neo4j_settings():
+    """
+    Returns:
+        dict: ``NEO4J`` Django setting, with defaults for the missing keys.
+    """
+    conf = dict(DEFAULT_NEO4J_SETTINGS)
+    conf.update(getattr(settings, 'NEO4J', {}))
+    return conf
+
+
+def build_backend(conf=None):
+    """
+    Builds a backend from a settings dictionary.
+
+    Args:
+        conf (dict, optional): Dictionary like the ``NEO4J`` setting. Defaults
+            to the Django settings.
+
+    Returns:
+        HttpBackend or BoltBackend: Backend object.
+
+    Raises:
+        ImproperlyConfigured: If the backend name is unknown, or the Bolt
+            backend has no user and NO_AUTH is not set.
+    """
+    if conf is None:
+        conf = get_neo4j_settings()
+    backend = conf['BACKEND'].lower()
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            "Unknown NEO4J backend '%s'. Choose one of: %s" % (backend, ", ".join(sorted(BACKENDS)))
+        )
+    return BACKENDS[backend](
+        uri=conf['URI'],
+        user=conf['USER'],
+        password=conf['PASSWORD'],
+        no_auth=conf['NO_AUTH'],
+        max_pool_size=conf['MAX_POOL_SIZE'],
+        max_connection_lifetime=conf['MAX_CONNECTION_LIFETIME'],
+        connection_acquisition_timeout=conf['CONNECTION_ACQUISITION_TIMEOUT']
+    )
+
+
+# ------------------------------------------------------------------------------
+class GraphProxy(object):
+    """
+    Thread-safe stand-in for the module-global graph object. The backend is
+    built from the Django settings on first use, so importing the models does
+    not open any connection.
+    """
+    def __init__(self, conf=None):
+        self._conf    = conf
+        self._backend = None
+        self._lock    = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = build_backend(self._conf)
+        return self._backend
+
+    def run(self, query, **params):
+        """
+        Runs a Cypher query with the configured backend.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            QueryResult: Rows returned by the query.
+        """
+        return self.backend.run(query, **params)
+
+    def explain(self, query, **params):
+        """
+        Plans a Cypher query with the configured backend, without running it.
+
+        Args:
+            query (str): Cypher query.
+            **params: Query parameters.
+
+        Returns:
+            `list` of `str`: Operators of the query plan.
+        """
+        return self.backend.explain(query, **params)
+
+    def reset(self):
+        """Drops the connections of this process. Call it after forking."""
+        if self._backend is not None:
+            self._backend.reset()
+
+    def configure(self, conf):
+        """
+        Replaces the backend with one built from `conf`.
+
+        Args:
+            conf (dict): Dictionary like the ``NEO4J`` setting.
+        """
+        with self._lock:
+            if self._backend is not None:
+                self._backend.close()
+            self._conf    = conf
+            self._backend = None
+
+
+def init_worker(*args, **kwargs):
+    """
+    Per-worker initialisation hook (uWSGI ``postfork``, gunicorn ``post_fork``).
+    Drops any connection inherited from the master process.
+    """
+    from NetExplorer.models.common import GRAPH
+    GRAPH.reset()
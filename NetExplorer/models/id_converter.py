@@ -1,49 +1,349 @@
 from .common import *
+import csv
+from NetExplorer.models import neo4j_queries as neoquery
+from NetExplorer.models.dataset_classifier import DATASET_CLASSIFIER
 
 
+# ------------------------------------------------------------------------------
+class EchoBuffer(object):
+    """
+    File-like object that returns what is written to it, so that csv.writer
+    can be used to build the lines of a streamed response.
+    """
+    def write(self, value):
+        return value
+
+
+# ------------------------------------------------------------------------------
 class IDConverter(object):
+    """
+    Converts identifiers of any database to another database through their
+    planarian genes (`by_db` = 'Gene') or their human homologs (`by_db` = 'Human').
+
+    Symbols are converted in batches of `batch_size`. The symbols of each
+    batch are classified first, and then each hop (input -> intermediate,
+    intermediate -> target) is resolved with one UNWIND query per database.
+    Terms classified as 'Human' are also looked up as planarian gene names
+    and Pfam domain identifiers. Only wildcards, Pfam accessions and GO terms
+    are still searched one by one with :obj:`GeneSearch`.
+
+    Attributes:
+        symbols (`list` of `str`): Identifiers to convert.
+        hops (`dict`): Query of each hop, by (source type, target type), where
+            type is 'Smesgene', 'Human' or 'contig'. Values are (template, label
+            of the template, source column, target column), and the label is
+            'source', 'target' or 'preferred' (PlanarianGene.preferred_database).
+
+    Args:
+        symbols (`list` of `str`): Identifiers to convert.
+
+    Example::
+
+        converter = IDConverter(["dd_Smed_v6_702_0_1", "SMESG000067473.1"])
+        for input_node, intermediates, targets in converter.iter_convert("Smest", "Gene"):
+            print(input_node.symbol, [ node.symbol for node in targets ])
+    """
+    batch_size = 1000
+    header = ("input", "input_database", "intermediate", "target")
+    hops = {
+        ("contig",   "Smesgene"): (neoquery.GET_GENES_BULK, 'source', 'contig', 'gene'),
+        ("contig",   "Human"):    (neoquery.GET_HOMOLOGS_BULK, 'source', 'planarian', 'human'),
+        ("Smesgene", "contig"):   (neoquery.CONTIGS_BULK_FROM_GENES, 'target', 'source', 'target'),
+        ("Smesgene", "Human"):    (neoquery.GET_HOMOLOGS_BULK_FROM_GENE, 'preferred', 'planarian', 'human'),
+        ("Human",    "contig"):   (neoquery.CONTIGS_BULK_FROM_HUMANS, 'target', 'source', 'target'),
+        ("Human",    "Smesgene"): (neoquery.GENES_BULK_FROM_HUMANS, 'preferred', 'source', 'target'),
+        ("Smesgene", "Smesgene"): (neoquery.EXISTING_SYMBOLS_BULK, 'source', 'source', 'target'),
+        ("Human",    "Human"):    (neoquery.EXISTING_SYMBOLS_BULK, 'source', 'source', 'target'),
+    }
 
     def __init__(self, symbols):
         self.symbols = symbols
-    
-    def convert(self, to_db, by_db="Gene"):
-        intermediate_elements = self._get_intermediate_elements(to_db, by_db)
-        results = self._get_results(intermediate_elements, to_db, by_db)
-        print(results)
-        return results
-            
-    def _get_intermediate_elements(self, to_db, by_db):
-        intermediate_elements = []
-        for symbol in self.symbols:
-            gene_search = GeneSearch(symbol, to_db)
-            if by_db == "Gene":
-                genes_for_symbol = gene_search.get_planarian_genes()
-            elif by_db == "Human":
-                genes_for_symbol = gene_search.get_human_genes()
-                print(genes_for_symbol)
-            input_node = self._return_input_node(gene_search)
-            intermediate_elements.append((input_node, genes_for_symbol))
-        return intermediate_elements
-
-    def _return_input_node(self, gene_search):
-        if gene_search.sterm_database == "Human":
-            node_obj = HumanNode(gene_search.sterm, gene_search.sterm_database, query=False)
-        elif gene_search.sterm_database == "Smesgene":
-            node_obj = PlanarianGene(gene_search.sterm, gene_search.sterm_database, query=False)
+
+    @staticmethod
+    def database_name(database):
+        """
+        Returns:
+            str: Database of the nodes of a conversion, 'Gene' is 'Smesgene'.
+        """
+        return "Smesgene" if database == "Gene" else database
+
+    @staticmethod
+    def node_type(database):
+        """
+        Returns:
+            str: 'Smesgene', 'Human' or 'contig' (any transcriptome).
+        """
+        return database if database in ("Smesgene", "Human") else "contig"
+
+    @staticmethod
+    def make_node(symbol, database):
+        """
+        Returns:
+            `Node`: :obj:`HumanNode`, :obj:`PlanarianGene` or :obj:`PlanarianContig`,
+                not queried.
+        """
+        if database == "Human":
+            return HumanNode(symbol, database, query=False)
+        elif database == "Smesgene":
+            return PlanarianGene(symbol, database, query=False)
+        else:
+            return PlanarianContig(symbol, database, query=False)
+
+    @staticmethod
+    def classify(symbol):
+        """
+        Guesses the database of a symbol like `GeneSearch.infer_symbol_database`.
+
+        Returns:
+            str: Database of symbol ('Human' if it doesn't match any pattern).
+        """
+        return DATASET_CLASSIFIER.classify(symbol)
+
+    @staticmethod
+    def is_bulk(symbol, database):
+        """
+        Returns:
+            bool: True if symbol can be resolved with the bulk queries.
+        """
+        return "*" not in symbol and database not in ("PFAM", "GO")
+
+    @staticmethod
+    def lookup_symbol(symbol, database):
+        """
+        Returns:
+            str: Symbol as stored in Neo4j (human symbols are upper case).
+        """
+        return symbol.upper() if database == "Human" else symbol
+
+    @staticmethod
+    def _add_unique(mapping, source, target):
+        if target is not None and target not in mapping[source]:
+            mapping[source].append(target)
+
+    def hop(self, symbols, source_db, target_db):
+        """
+        Maps symbols of one database to the related symbols of another one
+        with a single query.
+
+        Args:
+            symbols (`list` of `str`): Symbols in source_db.
+            source_db (str): Database of symbols.
+            target_db (str): Database of the results.
+
+        Returns:
+            `defaultdict` of `str`: `list` of `str`: Symbols in target_db of
+                each symbol (without duplicates).
+
+        Raises:
+            IncorrectDatabase: If a database is not a Neo4j label used by PlanNET.
+        """
+        mapping = defaultdict(list)
+        key = (self.node_type(source_db), self.node_type(target_db))
+        if not symbols or key not in self.hops:
+            return mapping
+        template, label, source_col, target_col = self.hops[key]
+        label = {
+            'source': source_db,
+            'target': target_db,
+            'preferred': PlanarianGene.preferred_database
+        }[label]
+        for row in run_query(template, label, symbols=list(set(symbols))).data():
+            self._add_unique(mapping, row[source_col], row[target_col])
+        return mapping
+
+    def gene_names(self, names):
+        """
+        Maps planarian gene names to their genes with a single query.
+
+        Args:
+            names (`list` of `str`): Upper case gene names.
+
+        Returns:
+            `defaultdict` of `str`: `list` of `str`: Smesgene symbols of each name.
+        """
+        mapping = defaultdict(list)
+        if names:
+            for row in run_query(neoquery.GENES_BULK_FROM_NAMES, symbols=list(set(names))).data():
+                self._add_unique(mapping, row['source'], row['target'])
+        return mapping
+
+    def domain_identifiers(self, identifiers, target_db):
+        """
+        Maps Pfam domain identifiers (e.g. 'PKINASE') to the planarian genes
+        or contigs annotated with the domain with a single query. Search terms
+        classified as 'Human' can be domain identifiers, see
+        `GeneSearch._get_human_or_pfam`.
+
+        Args:
+            identifiers (`list` of `str`): Upper case domain identifiers.
+            target_db (str): 'Smesgene' or a transcriptome.
+
+        Returns:
+            `defaultdict` of `str`: `list` of `str`: Symbols in target_db of
+                each identifier.
+        """
+        mapping = defaultdict(list)
+        if not identifiers:
+            return mapping
+        if self.node_type(target_db) == "Smesgene":
+            template, label = neoquery.GENES_BULK_FROM_DOMAIN_IDENTIFIERS, PlanarianGene.preferred_database
         else:
-            node_obj = PlanarianContig(gene_search.sterm, gene_search.sterm_database, query=False)
-        return node_obj
-
-    def _get_results(self, intermediate_elements, to_db, by_db):
-        results = []
-        for element in intermediate_elements:
-            contigs_for_element = []
-            intermediates_for_element = []
-            for target_element in element[1]:
-                if to_db == by_db:
-                    contigs_for_element.append(target_element)
-                else:
-                    contigs_for_element.extend(target_element.get_planarian_contigs(to_db))
-                    intermediates_for_element.append(target_element)
-            results.append((element[0], intermediates_for_element, list(set(contigs_for_element))))
-        return results
+            template, label = neoquery.CONTIGS_BULK_FROM_DOMAIN_IDENTIFIERS, target_db
+        for row in run_query(template, label, symbols=list(set(identifiers))).data():
+            self._add_unique(mapping, row['source'], row['target'])
+        return mapping
+
+    def _search(self, symbol, database, by_db):
+        """
+        Gets the intermediate symbols of one input that can't be resolved in bulk.
+
+        Returns:
+            `list` of `str`: Symbols in by_db.
+        """
+        gsearch = GeneSearch(symbol, by_db)
+        gsearch.sterm_database = database
+        try:
+            if by_db == "Smesgene":
+                nodes = gsearch.get_planarian_genes()
+            else:
+                nodes = gsearch.get_human_genes()
+        except exceptions.NodeNotFound:
+            nodes = []
+        mapping = defaultdict(list)
+        for node in nodes:
+            self._add_unique(mapping, symbol, node.symbol)
+        return mapping[symbol]
+
+    def _convert_batch(self, symbols, to_db, by_db):
+        """
+        Converts a batch of symbols, see `iter_convert`.
+        """
+        inputs = list(zip(symbols, DATASET_CLASSIFIER.classify_many(symbols)))
+
+        # Input -> intermediate. One query per input database.
+        lookups = defaultdict(list)
+        for symbol, database in inputs:
+            if self.is_bulk(symbol, database):
+                lookups[database].append(self.lookup_symbol(symbol, database))
+        by_input = dict(
+            (database, self.hop(database_symbols, database, by_db))
+            for database, database_symbols in lookups.items()
+        )
+        if "Human" in lookups and by_db == "Smesgene":
+            # Search terms that are not planarian identifiers can also be gene
+            # names or Pfam domain identifiers
+            for mapping in (self.gene_names(lookups["Human"]), self.domain_identifiers(lookups["Human"], by_db)):
+                for name, genes in mapping.items():
+                    for gene in genes:
+                        self._add_unique(by_input["Human"], name, gene)
+        intermediates = []
+        for symbol, database in inputs:
+            if self.is_bulk(symbol, database):
+                intermediates.append(by_input[database].get(self.lookup_symbol(symbol, database), []))
+            else:
+                intermediates.append(self._search(symbol, database, by_db))
+
+        # Intermediate -> target. One query for the whole batch.
+        if to_db != by_db:
+            by_intermediate = self.hop(
+                [ symbol for symbols in intermediates for symbol in symbols ], by_db, to_db
+            )
+
+        for (symbol, database), intermediate in zip(inputs, intermediates):
+            if to_db == by_db:
+                targets = intermediate
+                intermediate = []
+            else:
+                mapping = defaultdict(list)
+                for isymbol in intermediate:
+                    for target in by_intermediate.get(isymbol, []):
+                        self._add_unique(mapping, symbol, target)
+                targets = mapping[symbol]
+            yield (
+                self.make_node(symbol, database),
+                [ self.make_node(isymbol, by_db) for isymbol in intermediate ],
+                [ self.make_node(target, to_db) for target in targets ]
+            )
+
+    def iter_convert(self, to_db, by_db="Gene"):
+        """
+        Converts the symbols, one batch at a time.
+
+        Args:
+            to_db (str): Database of the results ('Gene', 'Human' or a transcriptome).
+            by_db (str, optional): 'Gene' or 'Human'. Defaults to 'Gene'.
+
+        Yields:
+            `tuple`: (input node, `list` of intermediate nodes, `list` of target
+                nodes) for each symbol, in the same order. Intermediates are
+                empty when `to_db` is `by_db`.
+
+        Raises:
+            IncorrectDatabase: If to_db is not a Neo4j label used by PlanNET.
+        """
+        to_db = self.database_name(to_db)
+        by_db = self.database_name(by_db)
+        for start in range(0, len(self.symbols), self.batch_size):
+            for result in self._convert_batch(self.symbols[start:start + self.batch_size], to_db, by_db):
+                yield result
+
+    def convert(self, to_db, by_db="Gene"):
+        """
+        Returns:
+            `list` of `tuple`: All the results of `iter_convert`.
+        """
+        return list(self.iter_convert(to_db, by_db))
+
+    def iter_rows(self, to_db, by_db="Gene"):
+        """
+        Yields:
+            `tuple` of `str`: Input symbol, input database, intermediate symbols
+                and target symbols (separated by ';') of each symbol.
+        """
+        for input_node, intermediates, targets in self.iter_convert(to_db, by_db):
+            yield (
+                input_node.symbol, input_node.database,
+                ";".join(node.symbol for node in intermediates),
+                ";".join(node.symbol for node in targets)
+            )
+
+    def iter_delimited(self, to_db, by_db="Gene", delimiter=","):
+        """
+        Yields:
+            str: Lines of a CSV (or TSV with delimiter '\\t') file with the
+                header and the results of `iter_rows`.
+        """
+        writer = csv.writer(EchoBuffer(), delimiter=delimiter)
+        yield writer.writerow(self.header)
+        for row in self.iter_rows(to_db, by_db):
+            yield writer.writerow(row)
+
+    def iter_json(self, to_db, by_db="Gene"):
+        """
+        Yields:
+            str: Chunks of a JSON object with the results::
+
+                {
+                    "to": "Smest", "by": "Gene",
+                    "results": [
+                        {
+                            "input": {"symbol": str, "database": str},
+                            "intermediates": [{"symbol": str, "database": str}],
+                            "targets": [{"symbol": str, "database": str}]
+                        }
+                    ]
+                }
+        """
+        def node_dict(node):
+            return { 'symbol': node.symbol, 'database': node.database }
+
+        yield '{"to": %s, "by": %s, "results": [' % (json.dumps(to_db), json.dumps(by_db))
+        separator = ""
+        for input_node, intermediates, targets in self.iter_convert(to_db, by_db):
+            yield separator + json.dumps({
+                'input': node_dict(input_node),
+                'intermediates': [ node_dict(node) for node in intermediates ],
+                'targets': [ node_dict(node) for node in targets ]
+            })
+            separator = ","
+        yield ']}'
@@ -0,0 +1,268 @@
+"""
+Local store of the gene lists of KEGG pathways.
+
+`KeggPathway` used to ask togows.dbcls.jp for the genes of the pathway on
+every request. The gene lists are now kept on disk (one JSON file per pathway
+inside PLANNET_INDEX_DIR/kegg) and only fetched again when they are older
+than the TTL. If KEGG can't be reached the stored list is used even if it is
+old, and with OFFLINE no request is ever made. The store can be filled from a
+bundle with the `kegg_store` management command.
+
+The graphs built from a gene list (one per pathway and dataset) are kept in
+memory by each worker, so repeating a pathway doesn't query Neo4j again.
+Each request gets its own copy of the graph, as the views modify it.
+
+Settings example::
+
+    KEGG = {
+        'URL': 'http://togows.dbcls.jp/entry/pathway/%s/genes.json',
+        'TIMEOUT': 10,         # Seconds to wait for KEGG.
+        'TTL': 2592000,        # Seconds before a gene list is fetched again. None never refreshes.
+        'OFFLINE': False,      # Only use the stored gene lists.
+        'GRAPHS': 200,         # Pathway graphs kept in memory per worker process.
+    }
+
+Bundle format (optionally gzipped)::
+
+    {"hsa04310": ["WNT1", "FZD1", ...], ...}
+"""
+import copy
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+import requests
+from django.conf import settings
+
+from NetExplorer.models.node_cache import NodeCache
+
+
+DEFAULT_KEGG_SETTINGS = {
+    'URL': 'http://togows.dbcls.jp/entry/pathway/%s/genes.json',
+    'TIMEOUT': 10,
+    'TTL': 30 * 86400,
+    'OFFLINE': False,
+    'GRAPHS': 200,
+}
+
+PATHWAY_REGEX = re.compile(r"^[a-z]{2,4}\d{5}$")
+
+# Seconds without asking KEGG again for an expired pathway after a failure.
+RETRY_AFTER = 300
+
+
+# ------------------------------------------------------------------------------
+class KeggStore(object):
+    """
+    Gene lists of KEGG pathways, on disk, with a time to live.
+
+    Attributes:
+        directory (str): Directory with one JSON file per pathway.
+        graphs (:obj:`NodeCache`): Pathway graphs by (dataset, pathway,
+            fetched time of the gene list).
+
+    Args:
+        directory (str, optional): Defaults to 'kegg' inside PLANNET_INDEX_DIR.
+        conf (dict, optional): Overrides of the KEGG setting.
+    """
+    def __init__(self, directory=None, conf=None):
+        self._directory = directory
+        self._conf      = conf
+        self._failures  = {}
+        self.graphs     = None
+
+    @property
+    def conf(self):
+        if self._conf is None:
+            conf = dict(DEFAULT_KEGG_SETTINGS)
+            conf.update(getattr(settings, 'KEGG', {}))
+            self._conf = conf
+        return self._conf
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = os.path.join(settings.PLANNET_INDEX_DIR, 'kegg')
+        return self._directory
+
+    @staticmethod
+    def normalize(symbol):
+        """
+        Returns:
+            str: Pathway identifier as used by KEGG and in the file names,
+                e.g.: 'hsa04310' for ' HSA04310'.
+        """
+        return (symbol or "").strip().lower()
+
+    @staticmethod
+    def is_pathway(symbol):
+        """
+        Returns:
+            bool: True if symbol is a normalized KEGG pathway identifier,
+                e.g.: 'hsa04310' (see `normalize`).
+        """
+        return bool(PATHWAY_REGEX.match(symbol or ""))
+
+    def path(self, symbol):
+        return os.path.join(self.directory, "%s.json" % symbol)
+
+    def load(self, symbol):
+        """
+        Returns:
+            Union([dict, None]): Stored entry of a pathway, {'genes': `list`,
+                'fetched': float}, None if it is not stored.
+        """
+        try:
+            with open(self.path(symbol)) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, symbol, genes, fetched=None):
+        """
+        Stores the gene list of a pathway, replacing the file atomically.
+
+        Returns:
+            dict: The stored entry.
+        """
+        entry = {
+            'genes': list(genes),
+            'fetched': time.time() if fetched is None else fetched
+        }
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, delete=False) as fh:
+            json.dump(entry, fh)
+        os.replace(fh.name, self.path(symbol))
+        return entry
+
+    def is_fresh(self, entry):
+        ttl = self.conf['TTL']
+        return ttl is None or time.time() - entry['fetched'] < ttl
+
+    def fetch(self, symbol):
+        """
+        Asks KEGG (through togows) for the genes of a pathway.
+
+        Returns:
+            `list` of `str`: Gene symbols, empty if the pathway has no genes.
+
+        Raises:
+            requests.RequestException: If KEGG can't be reached or answers
+                with an error.
+            ValueError: If the answer is not JSON.
+        """
+        response = requests.get(self.conf['URL'] % symbol, timeout=self.conf['TIMEOUT'])
+        response.raise_for_status()
+        content = response.json()
+        if not content:
+            return []
+        return [ gene.split(";")[0] for gene in content[0].values() ]
+
+    def get(self, symbol):
+        """
+        Returns the stored entry of a pathway, fetching it from KEGG first if
+        it is missing or expired (and the store is not OFFLINE). If KEGG fails
+        the stored entry is returned even if it expired, and KEGG is not asked
+        again for that pathway during RETRY_AFTER seconds.
+
+        Args:
+            symbol (str): KEGG pathway identifier, in any case.
+
+        Returns:
+            Union([dict, None]): {'genes': `list`, 'fetched': float}, None if
+                the pathway is not stored and can't be fetched.
+        """
+        symbol = self.normalize(symbol)
+        if not self.is_pathway(symbol):
+            return None
+        entry = self.load(symbol)
+        if (entry is not None and self.is_fresh(entry)) or self.conf['OFFLINE']:
+            return entry
+        if entry is not None and time.time() - self._failures.get(symbol, 0) < RETRY_AFTER:
+            return entry
+        try:
+            entry = self.save(symbol, self.fetch(symbol))
+            self._failures.pop(symbol, None)
+            return entry
+        except (requests.RequestException, ValueError) as err:
+            self._failures[symbol] = time.time()
+            logging.warning("KEGG pathway %s can't be fetched (%s), %s" % (
+                symbol, err, "using stored genes" if entry is not None else "not stored"
+            ))
+            return entry
+
+    def get_graph(self, symbol, database, build):
+        """
+        Returns the graph of a pathway in a dataset, building it only if it
+        isn't cached for the current gene list. The cached graph is never
+        returned: callers get a deep copy, which they can modify.
+
+        Args:
+            symbol (str): KEGG pathway identifier, in any case.
+            database (str): Dataset of the graph.
+            build (function): Called with the gene list, returns the graph.
+
+        Returns:
+            Union([graph, None]): Graph returned by build, None if the gene
+                list is not available.
+        """
+        entry = self.get(symbol)
+        if entry is None:
+            return None
+        if self.graphs is None:
+            self.graphs = NodeCache(max_size=self.conf['GRAPHS'], ttl=None)
+        key = (database, self.normalize(symbol), entry['fetched'])
+        graph = self.graphs.get(key)
+        if graph is None:
+            graph = build(entry['genes'])
+            self.graphs.set(key, graph)
+        return copy.deepcopy(graph)
+
+    def load_bundle(self, path):
+        """
+        Stores all the pathways of a bundle file (JSON, gzipped if the name
+        ends with .gz). The gene lists are considered fetched now.
+
+        Returns:
+            int: Number of stored pathways.
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as fh:
+            bundle = json.load(fh)
+        stored = 0
+        for symbol, genes in bundle.items():
+            symbol = self.normalize(symbol)
+            if self.is_pathway(symbol):
+                self.save(symbol, genes)
+                stored += 1
+            else:
+                logging.warning("Invalid KEGG pathway in bundle: %s" % symbol)
+        return stored
+
+    def export_bundle(self, path):
+        """
+        Writes all the stored pathways to a bundle file.
+
+        Returns:
+            int: Number of exported pathways.
+        """
+        bundle = {}
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                symbol = filename[:-len(".json")]
+                if filename.endswith(".json") and self.is_pathway(symbol):
+                    entry = self.load(symbol)
+                    if entry is not None:
+                        bundle[symbol] = entry['genes']
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt") as fh:
+            json.dump(bundle, fh)
+        return len(bundle)
+
+
+KEGG_STORE = KeggStore()
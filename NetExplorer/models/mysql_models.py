@@ -51,6 +51,8 @@ class Dataset(models.Model):
     def get_allowed_datasets(cls, user, skip_smesgene=True):
         """
         Classmethod that returns QuerySet of allowed datasets for a given user.
+        The result is memoized on the user object, so it is computed once per
+        request (request.user is created for each request).
 
         Args:
             user (User): User object.
@@ -59,6 +61,19 @@ class Dataset(models.Model):
             `list` of `Dataset`: List of Dataset objects sorted by year 
                 to which `user` has permissions to.
         """
+        memo = getattr(user, '_allowed_datasets', None)
+        if memo is None:
+            memo = {}
+            try:
+                user._allowed_datasets = memo
+            except AttributeError:
+                pass
+        if skip_smesgene not in memo:
+            memo[skip_smesgene] = list(cls._query_allowed_datasets(user, skip_smesgene))
+        return memo[skip_smesgene]
+
+    @classmethod
+    def _query_allowed_datasets(cls, user, skip_smesgene):
         public_datasets = cls.objects.filter(public=True)
         if skip_smesgene:
             public_datasets = public_datasets.exclude(name="Smesgene")
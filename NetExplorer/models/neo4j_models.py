@@ -16,6 +16,7 @@ class Node(object):
         allowed_databases (`set` of `str`): Class attribute. Set of allowed 
             Labels for Node.
     """
+    __slots__ = ('symbol', 'database', 'neighbours', 'domains')
 
     def __init__(self, symbol, database):
         super(Node, self).__init__()
@@ -41,9 +42,7 @@ class Node(object):
             Union([`list` of `Domain`, None]): List of domains annotated for 
             this Node. None if there are no domain annotations.
         """
-        query = neoquery.DOMAIN_QUERY % (self.database, self.symbol)
-
-        results = GRAPH.run(query)
+        results = run_query(neoquery.DOMAIN_QUERY, self.database, symbol=self.symbol)
         results = results.data()
 
         if results:
@@ -123,6 +122,10 @@ class Homology(object):
             hit in pfam alignment.
         prednode (PlanarianContig, optional): PlanarianContig object.
     """
+    __slots__ = (
+        'prednode', 'human', 'blast_cov', 'blast_eval', 'nog_brh',
+        'pfam_sc', 'nog_eval', 'blast_brh', 'pfam_brh'
+    )
 
     def __init__(
             self,  human, blast_cov=None, blast_eval=None, 
@@ -203,16 +206,23 @@ class Domain(object):
         Raises:
             NodeNotFound: raised if there are no planarian contigs with this Domain.
         """
-        query = "";
         if not re.match(Domain.pfam_regexp + r'\.\d+', self.accession):
             # Fuzzy pfam accession (no number)
-            acc_regex = self.accession + ".*"
-            query = neoquery.DOMAIN_TO_CONTIG_FUZZY % (database, acc_regex)
+            from NetExplorer.models.ngram_index import NGRAM_INDEX
+            matches = NGRAM_INDEX.search("Pfam", "accession", self.accession + "*")
+            if matches is None:
+                acc_regex = re.escape(self.accession) + ".*"
+                results = run_query(neoquery.DOMAIN_TO_CONTIG_FUZZY, database, regex=acc_regex).data()
+            elif matches:
+                results = run_query(
+                    neoquery.DOMAIN_TO_CONTIG_ACCESSIONS, database,
+                    accessions=[ accession for accession, symbol in matches ]
+                ).data()
+            else:
+                results = []
         else:
-            query = neoquery.DOMAIN_TO_CONTIG % (database, self.accession)
-
-        results = GRAPH.run(query)
-        results = results.data()
+            results = run_query(neoquery.DOMAIN_TO_CONTIG, database, accession=self.accession)
+            results = results.data()
         nodes = []
         if results:
             for row in results:
@@ -222,8 +232,7 @@ class Domain(object):
             raise exceptions.NodeNotFound(self.accession, "Pfam-%s" % database)
 
     def get_planarian_genes(self, database):
-        query = neoquery.GET_GENES_FROMDOMAIN_QUERY % (database, self.accession)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.GET_GENES_FROMDOMAIN_QUERY, database, accession=self.accession)
         results = results.data()
         planarian_genes = []
         if results:
@@ -247,9 +256,10 @@ class Domain(object):
         """
         Queries domain by identifier instead of accession. Fills all attributes.
         """
-        query = neoquery.DOMAIN_IDENTIFIER_QUERY % (identifier.upper())
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            ("Pfam", identifier.upper(), "DOMAIN_IDENTIFIER"),
+            neoquery.DOMAIN_IDENTIFIER_QUERY, identifier=identifier.upper()
+        )
         if results:
             self.accession = results[0]['accession']
             self.identifier = results[0]['identifier']
@@ -274,6 +284,8 @@ class HasDomain(object):
         perc (float): Float with % of domain in sequence.
 
     """
+    __slots__ = ('domain', 'node', 'p_start', 'p_end', 's_start', 's_end', 'perc')
+
     def __init__(self, domain, node, p_start, p_end, s_start, s_end, perc):
         self.domain  = domain
         self.node    = node
@@ -357,6 +369,7 @@ class PredInteraction(object):
             database on creation. Defaults to True. Query will only be performed
             if query = `True` and parameters = None.
     """
+    __slots__ = ('source_symbol', 'target', 'database', 'parameters')
 
     def __init__(self, source_symbol, target, database, parameters=None, query=True):
         self.source_symbol = source_symbol
@@ -373,9 +386,10 @@ class PredInteraction(object):
         of the :obj:`PredInteraction` instance. If interaction is not found, they all will 
         be `None`.
         """
-        query = neoquery.PREDINTERACTION_QUERY % (self.database, self.database, self.source_symbol, self.target.symbol)
-
-        results = GRAPH.run(query)
+        results = run_query(
+            neoquery.PREDINTERACTION_QUERY, self.database, self.database,
+            source=self.source_symbol, target=self.target.symbol
+        )
         results = results.data()
 
         if results:
@@ -445,6 +459,7 @@ class HumanNode(Node):
         summary_source: String with the source of the summary.
     """
 
+    __slots__ = ('summary', 'summary_source')
     allowed_databases = set(["Human"])
 
     def __init__(self, symbol, database, query=True):
@@ -455,9 +470,10 @@ class HumanNode(Node):
         self.summary_source = None
 
     def __query_node(self):
-        query = neoquery.HUMANNODE_QUERY % (self.database, self.symbol)
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            (self.database, self.symbol, "HUMANNODE"),
+            neoquery.HUMANNODE_QUERY, self.database, symbol=self.symbol
+        )
         if results:
             for row in results:
                 self.symbol   = row["symbol"]
@@ -507,8 +523,7 @@ class HumanNode(Node):
         Returns:
             list: List of :obj:`PlanarianGene` instances.
         """
-        query = neoquery.GET_GENES_FROMHUMAN_QUERY % (database, self.symbol)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.GET_GENES_FROMHUMAN_QUERY, database, symbol=self.symbol)
         results = results.data()
         if results:
             smesgenes = []
@@ -545,8 +560,7 @@ class HumanNode(Node):
         """
         Retrieves gene summary when available and saves it into attribute.
         """
-        query = neoquery.SUMMARY_QUERY % (self.symbol)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.SUMMARY_QUERY, symbol=self.symbol)
         results = results.data()
         if results:
             self.summary = results[0]['summary']
@@ -593,18 +607,19 @@ class HumanNode(Node):
         # Initialize homologs dictionary
         homologs         = {}
         database_to_look = set()
-        query_to_use = neoquery.HOMOLOGS_QUERY
         if database == "ALL":
             database_to_look = set(DATABASES)
-            query_to_use = neoquery.HOMOLOGS_QUERY_ALL % (self.symbol)
+            labels = []
+            query_to_use = neoquery.HOMOLOGS_QUERY_ALL
         else:
             database_to_look = set([database])
-            query_to_use = neoquery.HOMOLOGS_QUERY % (database, self.symbol)
+            labels = [database]
+            query_to_use = neoquery.HOMOLOGS_QUERY
         for db in database_to_look:
             homologs[db] = []
 
         # Get the homologs
-        results  = GRAPH.run(query_to_use)
+        results  = run_query(query_to_use, *labels, symbol=self.symbol)
         results  = results.data()
         if results:
             for row in results:
@@ -640,19 +655,39 @@ class WildCard(object):
     """
     Class for wildcard searches. Returns a list of symbols.
 
+    Searches are resolved with the n-gram index (see `build_ngram_index`) 
+    when it covers the database, and with a regular expression query in 
+    Neo4j otherwise.
+
     Args:
         search (str): String to search.
         database (str): Database (label in neo4j) for the search.
 
     Attributes:
-        search (str): String to search.
+        pattern (str): Upper case search, `*` matches anything.
+        search (str): Regular expression equivalent to `pattern`, with the
+            other characters escaped.
         database (str): Database (label in neo4j) for the search.
     """
     def __init__(self, search, database):
+        from NetExplorer.models.ngram_index import wildcard_regex
         search = search.upper()
-        self.search   = search.replace("*", ".*")
+        self.pattern  = search
+        self.search   = wildcard_regex(search)
         self.database = database
 
+    def _search(self, prop, query):
+        """
+        Returns:
+            `list` of `dict`: Rows with the 'symbol' and the matching value 
+                (under the key `prop`) of each node.
+        """
+        from NetExplorer.models.ngram_index import NGRAM_INDEX
+        matches = NGRAM_INDEX.search(self.database, prop, self.pattern)
+        if matches is None:
+            return run_query(query, self.database, regex=self.search).data()
+        return [ { prop: value, 'symbol': symbol } for value, symbol in matches ]
+
     def get_human_genes(self):
         """
         Gets list of :obj:`HumanNode` objects matching the wildcard query.
@@ -660,9 +695,7 @@ class WildCard(object):
         Returns:
             `list`: :obj:`HumanNode` objects.
         """
-        query   = neoquery.SYMBOL_WILDCARD % (self.database, self.search)
-        results = GRAPH.run(query)
-        results = results.data()
+        results = self._search("symbol", neoquery.SYMBOL_WILDCARD)
         list_of_nodes = []
         if results:
             for row in results:
@@ -676,9 +709,7 @@ class WildCard(object):
         Returns:
             `list`: :obj:`PlanarianGene` objects.
         """
-        query = neoquery.NAME_WILDCARD % (self.database, self.search)
-        results = GRAPH.run(query)
-        results = results.data()
+        results = self._search("name", neoquery.NAME_WILDCARD)
         list_of_nodes = []
         if results:
             for row in results:
@@ -722,6 +753,10 @@ class PlanarianContig(Node):
         allowed_databases (`dict`): Class attribute, dictionary with names of neo4j 
             labels for planarian genes.
     """
+    __slots__ = (
+        'sequence', 'orf', 'homolog', 'important', 'degree', 'gccont',
+        'length', 'orflength', 'gene_ontologies', 'name', 'gene'
+    )
     allowed_databases = ALL_DATABASES
 
     def __init__(self, symbol, database,
@@ -753,9 +788,10 @@ class PlanarianContig(Node):
         Gets gene name if possible and loads `gene` and `name` attributes.
         """
         if self.gene is None:
-            query = neoquery.GET_GENE % (self.database, self.symbol)
-            results = GRAPH.run(query)
-            results = results.data()
+            results = cached_query(
+                (self.database, self.symbol, "GET_GENE"),
+                neoquery.GET_GENE, self.database, symbol=self.symbol
+            )
             if results:
                 self.gene = results[0]['genesymbol']
                 if results[0]['name']:
@@ -773,8 +809,7 @@ class PlanarianContig(Node):
             `list`: List of :obj:`PlanarianGene` objects that this contig is 
                 associated with.
         """
-        query = neoquery.GET_GENES_QUERY % (self.database, self.symbol)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.GET_GENES_QUERY, self.database, symbol=self.symbol)
         results = results.data()
         if results:
             return [ 
@@ -810,10 +845,10 @@ class PlanarianContig(Node):
         Raises:
             NodeNotFound: If node is not in database.
         """
-        query = neoquery.PREDNODE_QUERY % (self.database, self.symbol)
-
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            (self.database, self.symbol, "PREDNODE"),
+            neoquery.PREDNODE_QUERY, self.database, symbol=self.symbol
+        )
 
         if results:
             for row in results:
@@ -839,9 +874,10 @@ class PlanarianContig(Node):
         else:
             logging.info("NOTFOUND")
             # Maybe node does not have an homolog
-            query = neoquery.PREDNODE_NOHOMOLOG_QUERY % (self.database, self.symbol)
-            results = GRAPH.run(query)
-            results = results.data()
+            results = cached_query(
+                (self.database, self.symbol, "PREDNODE_NOHOMOLOG"),
+                neoquery.PREDNODE_NOHOMOLOG_QUERY, self.database, symbol=self.symbol
+            )
 
             if results:
                 self.symbol = results[0]['symbol']
@@ -864,6 +900,54 @@ class PlanarianContig(Node):
         """
         self.__query_node()
 
+    @classmethod
+    def hydrate_bulk(cls, contigs):
+        """
+        Fills sequence, orf, length, homolog (with its scores), gene and name of
+        a list of PlanarianContig objects with one query per database, instead
+        of calling `get_homolog()` and `get_gene_name()` on each one of them.
+        Attributes that are already set are kept, except the name of contigs
+        without a gene, which is filled with the gene as in `get_gene_name()`.
+
+        Args:
+            contigs (`list` of :obj:`PlanarianContig`): Contigs to fill.
+
+        Returns:
+            `list` of :obj:`PlanarianContig`: The same list of contigs.
+        """
+        by_database = defaultdict(lambda: defaultdict(list))
+        for contig in contigs:
+            by_database[contig.database][contig.symbol].append(contig)
+
+        for database, by_symbol in by_database.items():
+            results = run_query(neoquery.HYDRATE_CONTIGS_BULK, database, symbols=list(by_symbol))
+            results = results.data()
+            for row in results:
+                for contig in by_symbol[row['symbol']]:
+                    if contig.sequence is None:
+                        contig.sequence = row['sequence']
+                    if contig.orf is None:
+                        contig.orf = row['orf']
+                    if contig.length is None:
+                        contig.length = row['length']
+                    if contig.homolog is None and row['human'] is not None:
+                        contig.homolog = Homology(
+                            prednode   = contig,
+                            human      = HumanNode(row['human'], "Human", query=False),
+                            blast_cov  = row['blast_cov'],
+                            blast_eval = row['blast_eval'],
+                            nog_brh    = row['nog_brh'],
+                            pfam_sc    = row['pfam_sc'],
+                            nog_eval   = row['nog_eval'],
+                            blast_brh  = row['blast_brh'],
+                            pfam_brh   = row['pfam_brh']
+                        )
+                    if contig.gene is None:
+                        contig.gene = row['gene']
+                        if row['name']:
+                            contig.name = row['name']
+        return contigs
+
     def to_jsondict(self):
         """
         This function takes a node object and returns a dictionary with the necessary
@@ -913,8 +997,9 @@ class PlanarianContig(Node):
         Fills attribute neighbours, which will be a list of PredInteraction objects.
         Used by NetExplorer add_connection/expand
         """
-        query = neoquery.NEIGHBOURS_QUERY_SHALLOW % (self.database, self.database, self.symbol)
-        results = GRAPH.run(query)
+        results = run_query(
+            neoquery.NEIGHBOURS_QUERY_SHALLOW, self.database, self.database, symbol=self.symbol
+        )
         results = results.data()
         if results:
             for row in results:
@@ -950,44 +1035,32 @@ class PlanarianContig(Node):
             self.degree     = 0
         return self.neighbours
 
-    def path_to_node(self, target, plen):
+    def path_to_node(self, target, plen, max_paths=None):
         """
         Given a target node object, this method finds all the shortest paths to 
         that node of length plen. If there aren't any, it returns None.
+        Paths are searched in the in-memory interactome of the dataset 
+        (see :obj:`InteractomeCSR`), not in Neo4j.
         
         Args:
             target (PlanarianContig): Target gene in the graph.
             plen (int): Path length to consider. All paths from `self` to `target
                 will be of length = `plen`.
+            max_paths (int, optional): Maximum number of paths. Defaults to
+                PATH_FINDER_MAX_PATHS setting.
 
         Returns:
             Union([Pathway, None]): Pathway between `self` and `target` or None 
             if no pathway exists. 
         """
-        query = neoquery.PATH_QUERY % (self.database, plen, target.database, self.symbol, target.symbol)
-        results = GRAPH.run(query)
-        results = results.data()
-        if results:
-            paths = []
-            for path in results:
-                nodes_in_path  = [ PlanarianContig(node, self.database, query=False) for node in path['symbols']]
-                relationships  = []
-                path_graph_obj = GraphCytoscape()
-                for idx, val in enumerate(path['int_prob']):
-                    parameters = {}
-                    parameters['int_prob']    = path['int_prob'][idx]
-                    parameters['path_length'] = path['path_length'][idx]
-                    relationships.append(
-                        PredInteraction(
-                            database      = self.database,
-                            source_symbol = path['symbols'][idx],
-                            target        = nodes_in_path[idx + 1],
-                            parameters    = parameters
-                        )
-                    )
-                path_graph_obj.add_elements(nodes_in_path)
-                path_graph_obj.add_elements(relationships)
-                paths.append(Pathway(graph=path_graph_obj))
+        from NetExplorer.models.path_engine import INTERACTOMES
+        if max_paths is None:
+            max_paths = settings.PATH_FINDER_MAX_PATHS
+        paths = []
+        if target.database == self.database:
+            interactome = INTERACTOMES.get(self.database)
+            paths = interactome.pathways(self.symbol, target.symbol, int(plen), max_paths)
+        if paths:
             return paths
         else:
             # No results
@@ -999,51 +1072,56 @@ class PlanarianContig(Node):
         Method to get the adjacent nodes in the graph and all the information about 
         those connections (including the homology information, etc.).
         Fills attribute neighbours, which will be a list of PredInteraction objects.
+        Neighbours, their homologs and their genes come from a single query,
+        regardless of the degree of the node.
         """
-        query = neoquery.NEIGHBOURS_QUERY % (self.database, self.database, self.symbol)
-        results = GRAPH.run(query)
-        results = results.data()
-        if results:
-            for row in results:
-                parameters = {}
-                # Initialize parameters to pass to the PredInteraction object
-                parameters = {
-                    'int_prob'    : round(float(row['int_prob']), 3),
-                    'path_length' : int(row['path_length']),
-                    'cellcom_nto' : round(float(row['cellcom_nto']), 3),
-                    'molfun_nto'  : round(float(row['molfun_nto']), 3),
-                    'bioproc_nto' : round(float(row['bioproc_nto']), 3),
-                    'dom_int_sc'  : round(float(row['dom_int_sc']), 3)
-                }
-                # Homology object
-                human_node = HumanNode(row['human'], "Human")
-                thomolog  = Homology(
-                    human      = human_node,        blast_cov = row['blast_cov'],
-                    blast_eval = row['blast_eval'], nog_brh = row['nog_brh'],
-                    pfam_sc    = row['pfam_sc'],    nog_eval   = row['nog_eval'],
-                    blast_brh  = row['blast_brh'],  pfam_brh   = row['pfam_brh']
-                )
-                # Node Object
-                target = PlanarianContig(
-                    symbol   = row['target'],    database = self.database,
-                    homolog  = thomolog,         query=False
-                )
+        with QueryCounter("PlanarianContig.get_neighbours", limit=1):
+            results = run_query(
+                neoquery.NEIGHBOURS_QUERY, self.database, self.database, symbol=self.symbol
+            )
+            results = results.data()
+            if results:
+                for row in results:
+                    parameters = {}
+                    # Initialize parameters to pass to the PredInteraction object
+                    parameters = {
+                        'int_prob'    : round(float(row['int_prob']), 3),
+                        'path_length' : int(row['path_length']),
+                        'cellcom_nto' : round(float(row['cellcom_nto']), 3),
+                        'molfun_nto'  : round(float(row['molfun_nto']), 3),
+                        'bioproc_nto' : round(float(row['bioproc_nto']), 3),
+                        'dom_int_sc'  : round(float(row['dom_int_sc']), 3)
+                    }
+                    # Homology object
+                    human_node = HumanNode(row['human'], "Human", query=False)
+                    thomolog  = Homology(
+                        human      = human_node,        blast_cov = row['blast_cov'],
+                        blast_eval = row['blast_eval'], nog_brh = row['nog_brh'],
+                        pfam_sc    = row['pfam_sc'],    nog_eval   = row['nog_eval'],
+                        blast_brh  = row['blast_brh'],  pfam_brh   = row['pfam_brh']
+                    )
+                    # Node Object
+                    target = PlanarianContig(
+                        symbol   = row['target'],    database = self.database,
+                        homolog  = thomolog,         gene     = row['gene'],
+                        name     = row['name'],      query=False
+                    )
 
-                # Add prednode to homology object
-                target.homolog.prednode = target
+                    # Add prednode to homology object
+                    target.homolog.prednode = target
 
-                # Interaction Object
-                interaction = PredInteraction(
-                    source_symbol = self.symbol,
-                    target        = target,
-                    database      = self.database,
-                    parameters    = parameters
-                )
-                # Add interaction to list of neighbours
-                self.neighbours.append(interaction)
-        else:
-            self.neighbours = None
-            self.degree     = 0
+                    # Interaction Object
+                    interaction = PredInteraction(
+                        source_symbol = self.symbol,
+                        target        = target,
+                        database      = self.database,
+                        parameters    = parameters
+                    )
+                    # Add interaction to list of neighbours
+                    self.neighbours.append(interaction)
+            else:
+                self.neighbours = None
+                self.degree     = 0
 
         if self.neighbours is not None:
             # Sort interactions by probability
@@ -1056,8 +1134,10 @@ class PlanarianContig(Node):
         Gets expression data for a particular node, a particular experiment and a particular sample
         """
         expression = None
-        query = neoquery.EXPRESSION_QUERY % (self.database, self.symbol, experiment.id, sample)
-        results = GRAPH.run(query)
+        results = run_query(
+            neoquery.EXPRESSION_QUERY, self.database,
+            symbol=self.symbol, experiment=experiment.id, sample=sample
+        )
         results = results.data()
         if results:
             for row in results:
@@ -1073,7 +1153,8 @@ class PlanarianContig(Node):
         nodes = []
         edges = []
         added_elements = set()
-        if not self.neighbours:
+        if self.neighbours is not None and not self.neighbours:
+            # None means that neighbours were already fetched and there are none
             self.get_neighbours()
         nodes.append(self)
         added_elements.add(self.symbol)
@@ -1098,8 +1179,7 @@ class PlanarianContig(Node):
         
         if self.homolog is not None:
             
-            query = neoquery.GO_HUMAN_GET_GO_QUERY % self.homolog.human.symbol
-            results = GRAPH.run(query)
+            results = run_query(neoquery.GO_HUMAN_GET_GO_QUERY, symbol=self.homolog.human.symbol)
             if results:
                 for row in results:
                     self.gene_ontologies.append(
@@ -1111,10 +1191,10 @@ class PlanarianContig(Node):
             self.gene_ontologies = []
 
     def __hash__(self):
-        return hash((self.symbol, self.database, self.important))
+        return hash((self.symbol, self.database))
 
     def __eq__(self, other):
-        return (self.symbol, self.database, self.important) == (other.symbol, other.database, other.important)
+        return (self.symbol, self.database) == (other.symbol, other.database)
 
     def __str__(self):
         return "%s:%s" % (self.database, self.symbol)
@@ -1153,17 +1233,24 @@ class oldExperiment(object):
     def __get_minmax(self):
         """
         Checks if the specified experiment exists in the database and gets the 
-        max, min expression ranges and the reference defined.
+        max, min expression ranges and the reference defined. Properties are 
+        kept in NODE_CACHE, so colouring a graph again does not query them.
+
+        Raises:
+            ExperimentNotFound: If the experiment is not in the database.
         """
-        query   = neoquery.EXPERIMENT_QUERY % (self.id)
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            ("Experiment", self.id, "EXPERIMENT"),
+            neoquery.EXPERIMENT_QUERY, experiment=self.id
+        )
         if results:
             self.maxexp      = results[0]["maxexp"]
             self.minexp      = results[0]["minexp"]
             self.reference   = results[0]["reference"]
             self.url         = results[0]["url"]
             self.percentiles = results[0]["percentiles"]
+        else:
+            raise exceptions.ExperimentNotFound(self.id)
 
     def to_json(self):
         """
@@ -1245,18 +1332,66 @@ class GraphCytoscape(object):
     Class for a graph object. Holds nodes and edges of any type as long as they have 
     a common interface (symbol attribute and to_jsondict() method).
 
+    Nodes are stored in a dictionary keyed by (database, symbol) and edges in a 
+    dictionary keyed by (database, symbol, symbol), with the two symbols sorted, 
+    so adding, merging and looking up elements is O(1) and every node or 
+    interaction is kept only once.
+
     Attributes:
-        nodes (set): Set of :obj:`Node` objects.
-        edges (set): Set of :obj:`PredInteraction` objects.
+        nodes (iterable): :obj:`Node` objects in the graph.
+        edges (iterable): :obj:`PredInteraction` objects in the graph.
     """
     def __init__(self):
-        self.nodes = set()
-        self.edges = set()
+        self._nodes = {}
+        self._edges = {}
+
+    @property
+    def nodes(self):
+        return self._nodes.values()
+
+    @property
+    def edges(self):
+        return self._edges.values()
+
+    @staticmethod
+    def node_key(node):
+        """
+        Args:
+            node (:obj:`Node`): Node instance.
+
+        Returns:
+            tuple: Key of the node in the graph, (database, symbol).
+        """
+        return (node.database, node.symbol)
+
+    @staticmethod
+    def edge_key(edge):
+        """
+        Args:
+            edge (:obj:`PredInteraction`): PredInteraction instance.
+
+        Returns:
+            tuple: Key of the interaction in the graph, (database, symbol, symbol). 
+                Symbols are sorted, so both directions have the same key.
+        """
+        return (edge.database,) + tuple(sorted((edge.source_symbol, edge.target.symbol)))
+
+    def get_node(self, database, symbol):
+        """
+        Args:
+            database (str): Database of the node.
+            symbol (str): Symbol of the node.
+
+        Returns:
+            Union([:obj:`Node`, None]): Node in the graph, None if not present.
+        """
+        return self._nodes.get((database, symbol))
 
     def add_elements(self, elements):
         """
         Method that takes a list of node or PredInteraction objects and adds them
-        to the graph.
+        to the graph. Nodes already in the graph are kept, and marked as important 
+        if the new one is important. Interactions already in the graph are kept.
 
         Args:
             elements (`list` of :obj:`PredInteraction` or :obj:`Node`): List of 
@@ -1267,9 +1402,14 @@ class GraphCytoscape(object):
         """
         for element in elements:
             if isinstance(element, Node):
-                self.nodes.add( element )
+                key   = self.node_key(element)
+                known = self._nodes.get(key)
+                if known is None:
+                    self._nodes[key] = element
+                elif known is not element and getattr(element, 'important', False):
+                    known.important = True
             elif isinstance(element, PredInteraction):
-                self.edges.add( element )
+                self._edges.setdefault(self.edge_key(element), element)
             else:
                 raise ValueError("Should provide only Node or PredInteraction instances.")
 
@@ -1318,13 +1458,14 @@ class GraphCytoscape(object):
 
     def define_important(self, vip_nodes):
         """
-        Gets a list/set of nodes and defines them as important.
+        Gets a list/set of nodes and defines them as important. Only 
+        :obj:`PlanarianContig` nodes can be important.
 
         Args:
-            vip_nodes (`list`): List of :obj:`Node` instances.
+            vip_nodes (`list`): List of node symbols.
         """
         for node in self.nodes:
-            if node.symbol in vip_nodes:
+            if isinstance(node, PlanarianContig) and node.symbol in vip_nodes:
                 node.important = True
         return self
 
@@ -1381,12 +1522,17 @@ class GraphCytoscape(object):
                     }
 
         """
-        graphelements = {
-            'nodes': [node.to_jsondict() for node in self.nodes],
-            'edges': [edge.to_jsondict() for edge in self.edges]
-        }
-        graphelements = json.dumps(graphelements)
-        return graphelements
+        return "".join(self.iter_json())
+
+    def iter_json(self):
+        """
+        Writes the same JSON as `to_json()` in chunks, directly from the node 
+        and edge attributes. Can be returned in a StreamingHttpResponse.
+
+        Returns:
+            iterator of `str`: Pieces of the JSON string.
+        """
+        return iter_graph_json(self.nodes, self.edges)
 
     def filter(self, including):
         """
@@ -1396,26 +1542,21 @@ class GraphCytoscape(object):
             including (set): Set of `Node` instances that has to be kept. Only 
                 interactions where both nodes are in `including` will be kept.
         """
-        nodes_to_keep = []
-        edges_to_keep = []
-        for node in self.nodes:
-            if node.symbol in including:
-                nodes_to_keep.append(node)
-            else:
-                continue
-        for edge in self.edges:
-            if edge.source_symbol in including and edge.target.symbol in including:
-                edges_to_keep.append(edge)
-            else:
-                continue
-        self.nodes = nodes_to_keep
-        self.edges = edges_to_keep
+        self._nodes = dict(
+            (key, node) for key, node in self._nodes.items()
+            if node.symbol in including
+        )
+        self._edges = dict(
+            (key, edge) for key, edge in self._edges.items()
+            if edge.source_symbol in including and edge.target.symbol in including
+        )
         return self
 
     def get_expression(self, experiment, samples):
         """
         Gets the expression for all the node objects in the graph.
         Returns a dictionary: expression_data[node.symbol][sample]
+        All the samples are fetched with a single query per database.
 
         Args:
             experiment (str): :obj:`oldExperiment instance.
@@ -1426,47 +1567,56 @@ class GraphCytoscape(object):
                 Primary key is node symbol, secondary key is sample name and value 
                 is expression value (float).
         """
-        node_list     = ",".join(map(lambda x: '"' + x + '"', [node.symbol for node in self.nodes ]))
-        node_selector = "[" + node_list + "]"
-        expression    = {}
-        for sample in samples:
-            query = neoquery.EXPRESSION_QUERY_GRAPH % (node_selector, experiment.id, sample)
-            results = GRAPH.run(query)
-            results = results.data()
-            for row in results:
-                if row['symbol'] not in expression:
-                    expression[row['symbol']] = {}
-                expression[row['symbol']][sample] = row['exp']
+        samples      = list(samples)
+        node_symbols = defaultdict(list)
+        for node in self.nodes:
+            node_symbols[node.database].append(node.symbol)
+        expression   = {}
+        for database, symbols in node_symbols.items():
+            results = run_query(
+                neoquery.EXPRESSION_QUERY_GRAPH, database,
+                symbols=symbols, experiment=experiment.id, samples=samples
+            )
+            for row in results.data():
+                expression.setdefault(row['symbol'], {}).update(zip(samples, row['exp']))
         return expression
 
     def get_connections(self):
         """
-        Function that looks for the edges between the nodes in the graph and 
-        adds them to the attribute `edges`.
+        Function that looks for the edges between the nodes in the graph 
+        (induced subgraph) and adds them to the attribute `edges`. Uses the 
+        in-memory interactome of the dataset if available (and built with the
+        edge scores), otherwise one query per dataset. Each interaction is
+        added once, whatever its direction.
         """
-        node_q_string = str(list([str(node.symbol) for node in self.nodes]))
-        query = neoquery.GET_CONNECTIONS_QUERY % (node_q_string, node_q_string)
-        results = GRAPH.run(query)
-        results = results.data()
-        if results:
-            for row in results:
-                parameters = {}
-                parameters = {
-                    'int_prob'    : round(float(row['int_prob']), 3),
-                    'path_length' : round(float(row['path_length']), 3),
-                    'cellcom_nto' : round(float(row['cellcom_nto']), 3),
-                    'molfun_nto'  : round(float(row['molfun_nto']), 3),
-                    'bioproc_nto' : round(float(row['bioproc_nto']), 3),
-                    'dom_int_sc'  : round(float(row['dom_int_sc']), 3)
-                }
-                database = [ database for database in row['database'] if database != "PlanarianContig" ][0]
-                newinteraction = PredInteraction(
+        from NetExplorer.models.path_engine import INTERACTOMES
+        contigs = defaultdict(dict)
+        for node in self.nodes:
+            if isinstance(node, PlanarianContig):
+                contigs[node.database][node.symbol] = node
+        for database, nodes in contigs.items():
+            interactome = INTERACTOMES.get_available(database)
+            if interactome is not None and interactome.scores is not None:
+                rows = interactome.induced_edges(nodes)
+            else:
+                rows = run_query(
+                    neoquery.GET_CONNECTIONS_QUERY, database, database, symbols=list(nodes)
+                ).data()
+            for row in rows:
+                edge_key = (database,) + tuple(sorted((row['nsymbol'], row['msymbol'])))
+                if edge_key in self._edges:
+                    continue
+                parameters = dict(
+                    (prop, round(float(row[prop]), 3))
+                    for prop in ('int_prob', 'path_length', 'cellcom_nto', 'molfun_nto', 'bioproc_nto', 'dom_int_sc')
+                    if row.get(prop) is not None
+                )
+                self._edges[edge_key] = PredInteraction(
                     database      = database,
                     source_symbol = row['nsymbol'],
-                    target        = PlanarianContig(row['msymbol'], database, query=False),
+                    target        = nodes[row['msymbol']],
                     parameters    = parameters
                 )
-                self.add_interaction(newinteraction)
         return self
 
     def new_nodes(self, symbols, database):
@@ -1477,14 +1627,16 @@ class GraphCytoscape(object):
             symbols (`list` of `str`): List of strings with gene/contig/pfam/go/kegg symbols.
             database (str): String with database.
         """
-        symbols = [ symbol for symbol in symbols if symbol.strip() ]
-        for symbol in symbols:
-            symbol = symbol.replace(" ", "")
-            symbol = symbol.replace("'", "")
-            symbol = symbol.replace('"', '')
+        from NetExplorer.models.dataset_classifier import DATASET_CLASSIFIER
+        symbols = [
+            symbol.replace(" ", "").replace("'", "").replace('"', '')
+            for symbol in symbols if symbol.strip()
+        ]
+        for symbol, symbol_database in zip(symbols, DATASET_CLASSIFIER.classify_many(symbols)):
             node_objects = []
             try:
                 gene_search = GeneSearch(symbol, database)
+                gene_search.sterm_database = symbol_database
                 if database == "Human":
                     node_objects = gene_search.get_human_genes()
                 elif database == "Smesgene":
@@ -1497,7 +1649,69 @@ class GraphCytoscape(object):
             except exceptions.NodeNotFound:
                 logging.info("Node not found: {} - {}".format(symbol, database))
                 continue
-    
+
+    def expand(self, seeds=None):
+        """
+        Adds the neighbours of `seeds` to the graph. Neighbours, their degree
+        and their human homologs are fetched with one query per database,
+        instead of calling `get_neighbours_shallow()` on every seed. Seeds
+        are marked as important.
+
+        Args:
+            seeds (`list` of :obj:`Node`, optional): Nodes to expand. Defaults
+                to all the nodes in the graph. Only :obj:`PlanarianContig`
+                seeds have interactions.
+
+        Returns:
+            GraphCytoscape: The graph itself, with neighbours and interactions merged in.
+        """
+        if seeds is None:
+            seeds = list(self.nodes)
+        contigs = defaultdict(dict)
+        for seed in seeds:
+            self._nodes[self.node_key(seed)] = seed
+            if isinstance(seed, PlanarianContig):
+                seed.important = True
+                contigs[seed.database][seed.symbol] = seed
+
+        for database, seed_nodes in contigs.items():
+            results = run_query(
+                neoquery.NEIGHBOURS_QUERY_SHALLOW_BULK, database, database,
+                symbols=list(seed_nodes)
+            )
+            results = results.data()
+            for row in results:
+                source = seed_nodes[row['source']]
+                target = self._nodes.get((database, row['target']))
+                if target is None:
+                    target = PlanarianContig(
+                        symbol   = row['target'],    database = database,
+                        homolog  = Homology(human=HumanNode(row['human'], "Human", query=False)),
+                        degree   = row['tdegree'],   query = False
+                    )
+                    target.homolog.prednode = target
+                    self._nodes[(database, target.symbol)] = target
+                edge_key = (database,) + tuple(sorted((source.symbol, target.symbol)))
+                if edge_key in self._edges:
+                    continue
+                interaction = PredInteraction(
+                    source_symbol = source.symbol,
+                    target        = target,
+                    database      = database,
+                    query         = False,
+                    parameters    = {
+                        'path_length': int(row['path_length']),
+                        'int_prob': round(float(row['int_prob']), 3)
+                    }
+                )
+                source.neighbours.append(interaction)
+                self._edges[edge_key] = interaction
+            for seed in seed_nodes.values():
+                if not seed.neighbours:
+                    seed.neighbours = None
+                    seed.degree     = 0
+        return self
+
     @classmethod
     def get_homologs_bulk(cls, symbols, database):
         """
@@ -1513,10 +1727,12 @@ class GraphCytoscape(object):
                 Key is planarian contig symbol, value is human gene symbol.
         """
         if database != "Smesgene":
-            query = neoquery.GET_HOMOLOGS_BULK % (database, symbols)
+            results = run_query(neoquery.GET_HOMOLOGS_BULK, database, symbols=list(symbols))
         else:
-            query = neoquery.GET_HOMOLOGS_BULK_FROM_GENE % (PlanarianGene.preferred_database, symbols)
-        results = GRAPH.run(query)
+            results = run_query(
+                neoquery.GET_HOMOLOGS_BULK_FROM_GENE, PlanarianGene.preferred_database,
+                symbols=list(symbols)
+            )
         results = results.data()
         homologs = {}
         if results:
@@ -1543,10 +1759,9 @@ class GraphCytoscape(object):
 
         """
         if database != "Smesgene":
-            query = neoquery.GET_GENES_BULK % (database, symbols)
+            results = run_query(neoquery.GET_GENES_BULK, database, symbols=list(symbols))
         else:
-            query = neoquery.GET_GENES_BULK_FROM_GENES % (symbols)
-        results = GRAPH.run(query)
+            results = run_query(neoquery.GET_GENES_BULK_FROM_GENES, symbols=list(symbols))
         results = results.data()
         genes = {}
         if results:
@@ -1570,6 +1785,8 @@ class GraphCytoscape(object):
 class ExperimentList(object):
     """
     Maps a list of experiment objects with all its available samples in the DB.
+    Experiments come from the cached catalog (see experiment_catalog), and
+    the private ones the user has no access to are left out.
 
     Attributes:
         experiments (`set` of `oldExperiment`): Set of oldExperiment instances.
@@ -1584,16 +1801,27 @@ class ExperimentList(object):
 
     """
     def __init__(self, user):
+        from NetExplorer.models.experiment_catalog import get_experiment_catalog
         self.experiments = set()
         self.samples     = {}
         self.datasets    = {}
-        query   = neoquery.ALL_EXPERIMENTS_QUERY
-        # Add all the samples for each experiment
-        results = GRAPH.run(query)
-        results = results.data()
-        added_experiments = set()
+        access_to = None
+        for entry in get_experiment_catalog():
+            if entry['private']:
+                if access_to is None:
+                    access_to = self.get_access(user)
+                if entry['identifier'] not in access_to:
+                    continue
+            self.experiments.add(oldExperiment( entry['identifier'], url=entry['url'], reference=entry['reference'] ))
+            self.samples[ entry['identifier'] ]  = list(entry['samples'])
+            self.datasets[ entry['identifier'] ] = list(entry['datasets'])
 
-        # Check if user is authenticated to get private experiments
+    @staticmethod
+    def get_access(user):
+        """
+        Returns:
+            `set` of `str`: Identifiers of the private experiments user can see.
+        """
         access_to = set()
         if user.is_authenticated:
             try:
@@ -1608,28 +1836,7 @@ class ExperimentList(object):
                 access_to.update([row[1] for row in rows])
             except Exception:
                 pass
-
-        if results:
-            for row in results:
-                if row['identifier'] not in self.samples:
-                    self.samples[ row['identifier'] ] = set()
-                self.samples[ row['identifier'] ].update(row['samples'])
-                if row['identifier'] not in added_experiments:
-                    if row['private'] == 1:
-                        if row['identifier'] not in access_to:
-                            continue
-                    self.experiments.add(oldExperiment( row['identifier'], url=row['url'], reference=row['reference'] ))
-                    added_experiments.add(row['identifier'])
-                if row['identifier'] not in self.datasets:
-                    self.datasets[ row['identifier'] ] = set()
-                for item in row['datasets']:
-                    item = [ it for it in item if it != "PlanarianContig" ]
-                    self.datasets[ row['identifier'] ].update(item)
-            for exp in self.samples:
-                self.samples[exp] = sorted(self.samples[exp])
-            # Sort datasets alphabetically
-            for exp in self.datasets:
-                self.datasets[exp] = sorted(list(self.datasets[exp]))
+        return access_to
 
     def get_samples(self, experiment):
         """ 
@@ -1692,6 +1899,36 @@ class Pathway(GraphCytoscape):
         super(Pathway, self).__init__()
         self.add_graph(graph)
 
+    @classmethod
+    def from_symbols(cls, database, symbols, int_probs, path_lengths):
+        """
+        Builds a Pathway from the symbols of its nodes and the properties of
+        its interactions, without querying the database.
+
+        Args:
+            database (str): Dataset of the nodes.
+            symbols (`list` of `str`): Node symbols, in path order.
+            int_probs (`list` of `float`): int_prob of each interaction.
+            path_lengths (`list` of `int`): path_length of each interaction.
+
+        Returns:
+            Pathway: Pathway with PlanarianContig nodes and PredInteraction edges.
+        """
+        nodes_in_path = [ PlanarianContig(symbol, database, query=False) for symbol in symbols ]
+        relationships = [
+            PredInteraction(
+                database      = database,
+                source_symbol = symbols[idx],
+                target        = nodes_in_path[idx + 1],
+                parameters    = { 'int_prob': int_probs[idx], 'path_length': path_lengths[idx] }
+            )
+            for idx in range(len(int_probs))
+        ]
+        path_graph_obj = GraphCytoscape()
+        path_graph_obj.add_elements(nodes_in_path)
+        path_graph_obj.add_elements(relationships)
+        return cls(graph=path_graph_obj)
+
     @property
     def score(self):
         """
@@ -1709,7 +1946,10 @@ class Pathway(GraphCytoscape):
 # ------------------------------------------------------------------------------
 class KeggPathway(GraphCytoscape):
     """
-    Class for KeggPathways. Encapsulates a GraphCytoscape object in `graphelements`. Will query Kegg on creation.
+    Class for KeggPathways. Encapsulates a GraphCytoscape object in `graphelements`.
+    The genes of the pathway come from KEGG_STORE, which only asks KEGG when
+    they are not stored or expired, and the graph of each pathway and dataset
+    is built once per worker.
 
     Attributes:
         symbol (str): Symbol for Kegg Pathway.
@@ -1725,34 +1965,41 @@ class KeggPathway(GraphCytoscape):
     """
     def __init__(self, symbol, database):
         super(KeggPathway, self).__init__()
-        self.symbol = symbol
+        self.symbol = KEGG_STORE.normalize(symbol)
         self.database = database
-        self.kegg_url = "http://togows.dbcls.jp/entry/pathway/%s/genes.json" % symbol
+        self.kegg_url = KEGG_STORE.conf['URL'] % self.symbol
         self.add_graph(self.get_graph_from_kegg())
 
     def get_graph_from_kegg(self):
         """
-        Connects to KEGG and extracts the elements of the pathway.
+        Gets the genes of the pathway and builds (or reads from the cache)
+        their graph in `database`.
 
         Returns:
             :obj:`GraphCytoscape`: GraphCytoscape object that results from 
                 looking at the genes and interactions in the Pathway that appear in the 
-                neo4j database. If Kegg can't be reached or the pathway does not have 
-                any equivalent in PlanNET, the :obj:`GraphCytoscape` will be empty.
-
-        """
-        r = requests.get(self.kegg_url)
-        if r.status_code == 200:
-            if r.json():
-                gene_list = [gene.split(";")[0] for gene in r.json()[0].values()]
-                graphelements = GraphCytoscape()
-                graphelements.new_nodes(gene_list, self.database)
-                graphelements.get_connections()
-                return graphelements
-            else:
-                return GraphCytoscape()
-        else:
+                neo4j database. If the genes are not stored and Kegg can't be reached
+                or the pathway does not have any equivalent in PlanNET, the
+                :obj:`GraphCytoscape` will be empty. It is a copy of the
+                cached graph, so it can be modified.
+
+        """
+        graphelements = KEGG_STORE.get_graph(self.symbol, self.database, self.build_graph)
+        if graphelements is None:
             return GraphCytoscape()
+        return graphelements
+
+    def build_graph(self, gene_list):
+        """
+        Returns:
+            :obj:`GraphCytoscape`: Nodes of `database` for the genes in
+                gene_list, and the interactions between them.
+        """
+        graphelements = GraphCytoscape()
+        if gene_list:
+            graphelements.new_nodes(gene_list, self.database)
+            graphelements.get_connections()
+        return graphelements
                 
 # ------------------------------------------------------------------------------
 class GeneOntology(object):
@@ -1812,9 +2059,9 @@ class GeneOntology(object):
         Raises:
             NodeNotFound: If GO does not exist in database.
         """
-        query   = neoquery.GO_QUERY % self.accession
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            ("Go", self.accession, "GO"), neoquery.GO_QUERY, accession=self.accession
+        )
         if results:
             self.domain = results[0]['domain']
             self.name   = results[0]['name']
@@ -1828,9 +2075,7 @@ class GeneOntology(object):
         Raises:
             NodeNotFound: If GO does not exist in database.
         """
-        query   = neoquery.GO_HUMAN_NODE_QUERY % self.accession
-        results = GRAPH.run(query)
-
+        results = run_query(neoquery.GO_HUMAN_NODE_QUERY, accession=self.accession)
         results = results.data()
         if results:
             self.domain = results[0]['domain']
@@ -1850,8 +2095,7 @@ class GeneOntology(object):
         Returns:
             list: List of :obj:`PlanarianContig` objects.
         """
-        query = neoquery.GO_TO_CONTIG % (database, self.accession)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.GO_TO_CONTIG, database, accession=self.accession)
         results = results.data()
         contigs = []
         if results:
@@ -1907,22 +2151,11 @@ class GeneSearch(object):
         """
         Guesses to which database `sterm` belongs to. Compares the symbol in 
         `sterm` to the valid patterns for each NodeType. Saves result in `sterm_database`.
+        Does nothing if `sterm_database` is already set (e.g. by `DatasetClassifier.classify_many`).
         """
-        datasets = Dataset.objects.all()
-        for dataset in datasets:
-            if dataset.is_symbol_valid(self.sterm):
-                self.sterm_database = dataset.name
+        from NetExplorer.models.dataset_classifier import DATASET_CLASSIFIER
         if self.sterm_database is None:
-            # Not valid for any database.
-            # Check Smesgene, PFAM, GO, Human in that order.
-            if PlanarianGene.is_symbol_valid(self.sterm):
-                self.sterm_database = "Smesgene"
-            elif Domain.is_symbol_valid(self.sterm):
-                self.sterm_database = "PFAM"
-            elif GeneOntology.is_symbol_valid(self.sterm):
-                self.sterm_database = "GO"
-            else:
-                self.sterm_database = "Human"
+            self.sterm_database = DATASET_CLASSIFIER.classify(self.sterm)
         return self
     
     def get_planarian_contigs(self):
@@ -1949,12 +2182,13 @@ class GeneSearch(object):
         elif self.sterm_database == "Human" :
             if "*" in self.sterm:
                 source_nodes = WildCard(self.sterm, self.sterm_database).get_human_genes()
+                source_nodes.extend(WildCard(self.sterm, "Smesgene").get_planarian_genes())
             else:
                 source_nodes = self._get_human_or_pfam()
-            try:
-                source_nodes.extend(PlanarianGene.from_gene_name(self.sterm))
-            except exceptions.NodeNotFound:
-                pass
+                try:
+                    source_nodes.extend(PlanarianGene.from_gene_name(self.sterm))
+                except exceptions.NodeNotFound:
+                    pass
 
         else:
             # We already have the planarian contig by identifier,
@@ -1965,11 +2199,12 @@ class GeneSearch(object):
         for snode in source_nodes:
             planarian_contigs.extend(snode.get_planarian_contigs(self.database))
 
-        for pcontig in planarian_contigs:
-            if not pcontig.homolog:
-                pcontig.get_homolog()
-            if not pcontig.name:
-                pcontig.get_gene_name()
+        # Same fields as get_homolog() and get_gene_name(): gene and name are
+        # filled together, so a contig without a gene is hydrated even if it
+        # already has a name.
+        PlanarianContig.hydrate_bulk(
+            [ pcontig for pcontig in planarian_contigs if not pcontig.homolog or pcontig.gene is None ]
+        )
         return planarian_contigs
 
     def get_planarian_genes(self):
@@ -1992,10 +2227,13 @@ class GeneSearch(object):
             for hnode in human_nodes:
                 planarian_genes.extend(hnode.get_planarian_genes(PlanarianGene.preferred_database))
             
-            try:
-                planarian_genes.extend(PlanarianGene.from_gene_name(self.sterm))
-            except exceptions.NodeNotFound:
-                pass
+            if "*" in self.sterm:
+                planarian_genes.extend(WildCard(self.sterm, "Smesgene").get_planarian_genes())
+            else:
+                try:
+                    planarian_genes.extend(PlanarianGene.from_gene_name(self.sterm))
+                except exceptions.NodeNotFound:
+                    pass
             
         elif self.sterm_database == "PFAM":
             planarian_nodes = Domain(self.sterm).get_planarian_contigs(PlanarianGene.preferred_database)
@@ -2067,10 +2305,10 @@ class GeneSearch(object):
             all_results.append(PlanarianContig(self.sterm, self.sterm_database))
         else:
             # Get from ALL databases.
-            datasets = Dataset.objects.all()
-            for dataset in datasets:
+            from NetExplorer.models.dataset_classifier import DATASET_CLASSIFIER
+            for dataset in DATASET_CLASSIFIER.get_names():
                 try:
-                    self.database = dataset.name
+                    self.database = dataset
                     contigs = self.get_planarian_contigs()
                     if contigs:
                         all_results.extend(contigs)
@@ -2182,8 +2420,7 @@ class PlanarianGene(Node):
         Raises:
             NodeNotFound when planarian gene does not exist.
         """
-        query = neoquery.SMESGENE_NAME_QUERY % (name.upper())
-        results = GRAPH.run(query)
+        results = run_query(neoquery.SMESGENE_NAME_QUERY, name=name.upper())
         results = results.data()
         planarian_genes = []
         if results:
@@ -2212,9 +2449,9 @@ class PlanarianGene(Node):
         Raises:
             NodeNotFound: If gene is not in database.
         """
-        query = neoquery.SMESGENE_QUERY % (self.symbol)
-        results = GRAPH.run(query)
-        results = results.data()
+        results = cached_query(
+            ("Smesgene", self.symbol, "SMESGENE"), neoquery.SMESGENE_QUERY, symbol=self.symbol
+        )
         if results:
             self.name = results[0]['name']
             self.sequence = results[0]['sequence']
@@ -2251,19 +2488,28 @@ class PlanarianGene(Node):
             return None
 
 
-    def get_best_transcript(self):
+    def get_best_transcript(self, contigs=None):
         """
         Retrieves the longest transcript of preferred_database.
 
+        Args:
+            contigs (`list` of :obj:`PlanarianContig`, optional): Contigs of all
+                databases already returned by `get_planarian_contigs()`. If 
+                given, the transcript is taken from them instead of querying again.
+
         Returns:
             :obj:`PlanarianContig`: PlanarianContig from preferred database annotated 
                 as being transcribed from this gene.
         """
         best = None
-        try:
-            best = self.get_planarian_contigs(PlanarianGene.preferred_database)
-        except Exception:
-            pass
+        if contigs is not None:
+            # Sorted by database and by length (descending) within each database
+            best = [ contig for contig in contigs if contig.database == PlanarianGene.preferred_database ]
+        else:
+            try:
+                best = self.get_planarian_contigs(PlanarianGene.preferred_database)
+            except Exception:
+                pass
         if best:
             best = best[0]
         return best
@@ -2283,10 +2529,9 @@ class PlanarianGene(Node):
                 gene.
         """
         if database is None:
-            query = neoquery.SMESGENE_GET_ALL_CONTIGS_QUERY % (self.symbol)
+            results = run_query(neoquery.SMESGENE_GET_ALL_CONTIGS_QUERY, symbol=self.symbol)
         else:
-            query = neoquery.SMESGENE_GET_CONTIGS_QUERY % (database, self.symbol)
-        results = GRAPH.run(query)
+            results = run_query(neoquery.SMESGENE_GET_CONTIGS_QUERY, database, symbol=self.symbol)
         results = results.data()
         prednodes = []
         if results:
@@ -2309,8 +2554,7 @@ class PlanarianGene(Node):
         """
         
 
-        query = neoquery.GET_MOTIFS % (self.symbol, element_type)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.GET_MOTIFS, symbol=self.symbol, cre_type=element_type)
         results = results.data()
 
         if results:
@@ -2440,8 +2684,7 @@ class TfMotif(Node):
 
     @classmethod
     def get_all_from_database(cls):
-        query = neoquery.ALL_MOTIFS_QUERY
-        results = GRAPH.run(query)
+        results = run_query(neoquery.ALL_MOTIFS_QUERY)
         results = results.data()
         all_motifs = []
         if results:
@@ -2465,8 +2708,7 @@ class TfMotif(Node):
         return all_motifs
 
     def __query_node(self):
-        query = neoquery.MOTIF_QUERY % (self.symbol)
-        results = GRAPH.run(query)
+        results = run_query(neoquery.MOTIF_QUERY, symbol=self.symbol)
         results = results.data()
         if results:
             self.symbol = results[0]['symbol']
@@ -2480,11 +2722,9 @@ class TfMotif(Node):
 
     def get_planarian_genes(self, cre_type="any"):
         if cre_type == "any":
-            query = neoquery.GET_GENES_FROMTF_QUERY % (self.symbol)
+            results = run_query(neoquery.GET_GENES_FROMTF_QUERY, symbol=self.symbol)
         else:
-            query = neoquery.GET_GENES_FROMTF_TYPE_QUERY % (self.symbol, cre_type)
-
-        results = GRAPH.run(query)
+            results = run_query(neoquery.GET_GENES_FROMTF_TYPE_QUERY, symbol=self.symbol, cre_type=cre_type)
         results = results.data()
         genes = []
         if results:
@@ -1,9 +1,13 @@
 
 # QUERIES
 # ------------------------------------------------------------------------------
+# Values are always sent to Neo4j as $parameters, so the query text is the same
+# for every symbol and the execution plan can be reused. The only %s slots left
+# are node labels, which Cypher can't take as parameters: they are filled by
+# `run_query` from the GRAPH_LABELS whitelist.
 PREDNODE_QUERY = """
     MATCH (n:%s)-[r:HOMOLOG_OF]-(m:Human)
-    WHERE  n.symbol = "%s"
+    WHERE  n.symbol = $symbol
     RETURN n.symbol AS symbol,
         n.sequence AS sequence,
         n.orf AS orf,
@@ -20,7 +24,7 @@ PREDNODE_QUERY = """
 
 PREDNODE_NOHOMOLOG_QUERY = """
     MATCH (n:%s)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN n.symbol   AS symbol,
            n.sequence AS sequence,
            n.orf      AS orf,
@@ -29,11 +33,12 @@ PREDNODE_NOHOMOLOG_QUERY = """
 
 # ------------------------------------------------------------------------------
 GET_CONNECTIONS_QUERY = """
-    MATCH (n)-[r:INTERACT_WITH]-(m)
-    WHERE n.symbol IN %s
-    AND   m.symbol IN %s
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)
+    WHERE n.symbol = symbol
+    AND   m.symbol IN $symbols
+    AND   n.symbol < m.symbol
     RETURN n.symbol      AS nsymbol,
-           labels(n)     AS database,
            r.path_length AS path_length,
            r.int_prob    AS int_prob,
            r.dom_int_sc  AS dom_int_sc,
@@ -45,7 +50,7 @@ GET_CONNECTIONS_QUERY = """
 
 GET_GENE = """
     MATCH (n:Smesgene)-[r:HAS_TRANSCRIPT]->(m:%s)
-    WHERE m.symbol = '%s'
+    WHERE m.symbol = $symbol
     RETURN n.symbol as genesymbol,
            n.name as name
 """
@@ -53,21 +58,21 @@ GET_GENE = """
 # ------------------------------------------------------------------------------
 GO_QUERY = """
     MATCH (n:Go)
-    WHERE n.accession = "%s"
+    WHERE n.accession = $accession
     RETURN n.domain as domain, n.name as name
 """
 
 # ------------------------------------------------------------------------------
 GO_HUMAN_NODE_QUERY = """
     MATCH (n:Go)-[:HAS_GO]-(m:Human)
-    WHERE n.accession = "%s"
+    WHERE n.accession = $accession
     RETURN n.domain as domain, n.name as name, m.symbol as symbol
 """
 
 # ------------------------------------------------------------------------------
 GO_HUMAN_GET_GO_QUERY = """
     MATCH (n:Go)-[:HAS_GO]-(m:Human)
-    WHERE m.symbol = "%s"
+    WHERE m.symbol = $symbol
     RETURN n.accession as accession, n.domain as domain, n.name as name ORDER BY n.domain
 """
 
@@ -75,21 +80,28 @@ GO_HUMAN_GET_GO_QUERY = """
 # ------------------------------------------------------------------------------
 DOMAIN_TO_CONTIG = """
     MATCH (n:%s)-[:HAS_DOMAIN]->(m:Pfam)
-    WHERE m.accession = "%s"
+    WHERE m.accession = $accession
     RETURN n.symbol as symbol
 """
 
 # ------------------------------------------------------------------------------
 DOMAIN_TO_CONTIG_FUZZY = """
     MATCH (n:%s)-[:HAS_DOMAIN]->(m:Pfam)
-    WHERE m.accession =~ "%s"
+    WHERE m.accession =~ $regex
     RETURN n.symbol as symbol
 """
 
+# ------------------------------------------------------------------------------
+DOMAIN_TO_CONTIG_ACCESSIONS = """
+    MATCH (n:%s)-[:HAS_DOMAIN]->(m:Pfam)
+    WHERE m.accession IN $accessions
+    RETURN DISTINCT n.symbol as symbol
+"""
+
 # ------------------------------------------------------------------------------
 EXPERIMENT_QUERY = """
     MATCH (n:Experiment)
-    WHERE n.id = "%s"
+    WHERE n.id = $experiment
     RETURN
         n.id as identifier,
         n.maxexp as maxexp,
@@ -108,30 +120,31 @@ ALL_EXPERIMENTS_QUERY = """
 # ------------------------------------------------------------------------------
 EXPRESSION_QUERY = """
     MATCH (n:%s)-[r:HAS_EXPRESSION]-(m:Experiment)
-    WHERE n.symbol = "%s"
-    AND m.id = "%s"
-    RETURN r.%s as exp
+    WHERE n.symbol = $symbol
+    AND m.id = $experiment
+    RETURN r[$sample] as exp
 """
 
 # ------------------------------------------------------------------------------
+# One row per node, with the expression of each sample in $samples (same order).
 EXPRESSION_QUERY_GRAPH = """
-    MATCH (n)-[r:HAS_EXPRESSION]-(m:Experiment)
-    WHERE n.symbol IN %s
-    AND m.id ="%s"
-    RETURN n.symbol AS symbol, labels(n) AS database, r.%s AS exp
+    MATCH (n:%s)-[r:HAS_EXPRESSION]-(m:Experiment)
+    WHERE n.symbol IN $symbols
+    AND m.id = $experiment
+    RETURN n.symbol AS symbol, [sample IN $samples | r[sample]] AS exp
 """
 
 # ------------------------------------------------------------------------------
 HUMANNODE_QUERY = """
     MATCH (n:%s)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN n.symbol AS symbol
 """
 
 # ------------------------------------------------------------------------------
 PREDINTERACTION_QUERY = """
     MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)
-    WHERE n.symbol = '%s' AND m.symbol = '%s'
+    WHERE n.symbol = $source AND m.symbol = $target
     RETURN r.int_prob     AS int_prob,
            r.path_length  AS path_length,
            r.cellcom_nto  AS cellcom_nto,
@@ -144,8 +157,12 @@ PREDINTERACTION_QUERY = """
 # ------------------------------------------------------------------------------
 NEIGHBOURS_QUERY = """
     MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)-[s:HOMOLOG_OF]-(l:Human)
-    WHERE  n.symbol = '%s'
+    WHERE  n.symbol = $symbol
+    OPTIONAL MATCH (g:Smesgene)-[:HAS_TRANSCRIPT]->(m)
+    WITH   m, l, r, s, head(collect(g)) AS g
     RETURN m.symbol         AS target,
+           g.symbol         AS gene,
+           g.name           AS name,
            l.symbol         AS human,
            r.int_prob       AS int_prob,
            r.path_length    AS path_length,
@@ -163,11 +180,30 @@ NEIGHBOURS_QUERY = """
 """
 
 # ------------------------------------------------------------------------------
+# The degree is read from the `degree` property stored by the compute_degree
+# management command (counted on the fly for nodes without it). It is the
+# number of interactions of the neighbour, as the old *0..1 expansion counted
+# (its zero-length path replaced the relationship to the seed, which
+# relationship uniqueness kept out of the expansion).
 NEIGHBOURS_QUERY_SHALLOW = """
-    MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)-[s:HOMOLOG_OF]-(l:Human), (m)-[t:INTERACT_WITH*0..1]-(other)
-    WHERE  n.symbol = '%s'
+    MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)-[s:HOMOLOG_OF]-(l:Human)
+    WHERE  n.symbol = $symbol
     RETURN m.symbol         AS target,
-           count(t)         AS tdegree,
+           coalesce(m.degree, size((m)-[:INTERACT_WITH]-())) AS tdegree,
+           l.symbol         AS human,
+           r.int_prob       AS int_prob,
+           r.path_length    AS path_length
+"""
+
+# ------------------------------------------------------------------------------
+# Same as NEIGHBOURS_QUERY_SHALLOW for a list of seed nodes.
+NEIGHBOURS_QUERY_SHALLOW_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)-[r:INTERACT_WITH]-(m:%s)-[s:HOMOLOG_OF]-(l:Human)
+    WHERE  n.symbol = symbol
+    RETURN n.symbol         AS source,
+           m.symbol         AS target,
+           coalesce(m.degree, size((m)-[:INTERACT_WITH]-())) AS tdegree,
            l.symbol         AS human,
            r.int_prob       AS int_prob,
            r.path_length    AS path_length
@@ -176,31 +212,36 @@ NEIGHBOURS_QUERY_SHALLOW = """
 # ------------------------------------------------------------------------------
 SYMBOL_WILDCARD = """
     MATCH (n:%s)
-    WHERE n.symbol =~ "%s"
+    WHERE n.symbol =~ $regex
     RETURN n.symbol AS symbol
 """
 
 # ------------------------------------------------------------------------------
 NAME_WILDCARD = """
     MATCH (n:%s)
-    WHERE n.name =~ "%s"
-    RETURN n.symbol AS symbol
+    WHERE n.name =~ $regex
+    RETURN n.symbol AS symbol,
            n.name AS name
 """
 
 # ------------------------------------------------------------------------------
-PATH_QUERY = """
-MATCH p=( (n:%s)-[r:INTERACT_WITH*%s]-(m:%s) )
-WHERE n.symbol = '%s' AND m.symbol = '%s'
-RETURN extract(nod IN nodes(p) | nod.symbol)                       AS symbols,
-       extract(rel IN relationships(p) | toInt(rel.path_length))   AS path_length,
-       extract(rel IN relationships(p) | toFloat(rel.int_prob))    AS int_prob
+# Every interaction of a dataset, to build its in-memory interactome (path_engine).
+ALL_INTERACTIONS_QUERY = """
+    MATCH (n:%s)-[r:INTERACT_WITH]->(m:%s)
+    RETURN n.symbol                 AS source,
+           m.symbol                 AS target,
+           toFloat(r.int_prob)      AS int_prob,
+           toInt(r.path_length)     AS path_length,
+           toFloat(r.cellcom_nto)   AS cellcom_nto,
+           toFloat(r.molfun_nto)    AS molfun_nto,
+           toFloat(r.bioproc_nto)   AS bioproc_nto,
+           toFloat(r.dom_int_sc)    AS dom_int_sc
 """
 
 # ------------------------------------------------------------------------------
 DOMAIN_QUERY = """
     MATCH (n:%s)-[r]->(dom:Pfam)
-    WHERE n.symbol = '%s'
+    WHERE n.symbol = $symbol
     RETURN dom.accession   AS accession,
            dom.description AS description,
            dom.identifier  AS identifier,
@@ -215,7 +256,7 @@ DOMAIN_QUERY = """
 # ------------------------------------------------------------------------------
 DOMAIN_IDENTIFIER_QUERY = """
     MATCH (dom:Pfam)
-    WHERE toUpper(dom.identifier) = '%s'
+    WHERE toUpper(dom.identifier) = $identifier
     RETURN dom.accession   AS accession,
            dom.description AS description,
            dom.identifier  AS identifier,
@@ -224,14 +265,14 @@ DOMAIN_IDENTIFIER_QUERY = """
 # ------------------------------------------------------------------------------
 OFFSYMBOL_QUERY = """
     MATCH (n:OFF_SYMBOL)<-[r]-(m:%s)
-    WHERE n.symbol = '%s'
+    WHERE n.symbol = $symbol
     RETURN m.symbol AS symbol
 """
 
 # ------------------------------------------------------------------------------
 HOMOLOGS_QUERY = """
     MATCH (n:Human)-[r:HOMOLOG_OF]-(m:%s)
-    WHERE  n.symbol = "%s"
+    WHERE  n.symbol = $symbol
     RETURN n.symbol  AS human,
         m.symbol     AS homolog,
         r.blast_cov  AS blast_cov,
@@ -248,7 +289,7 @@ HOMOLOGS_QUERY = """
 # ------------------------------------------------------------------------------
 HOMOLOGS_QUERY_ALL = """
     MATCH (n:Human)-[r:HOMOLOG_OF]-(m)
-    WHERE  n.symbol = "%s"
+    WHERE  n.symbol = $symbol
     RETURN n.symbol  AS human,
         m.symbol     AS homolog,
         r.blast_cov  AS blast_cov,
@@ -264,7 +305,7 @@ HOMOLOGS_QUERY_ALL = """
 # ------------------------------------------------------------------------------
 SUMMARY_QUERY = """
     MATCH (n:Human)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN n.summary as summary,
            n.summary_source as summary_source
 """
@@ -272,7 +313,7 @@ SUMMARY_QUERY = """
 # ------------------------------------------------------------------------------
 GET_GENES_QUERY = """
     MATCH (n:Smesgene)-[r:HAS_TRANSCRIPT]->(m:%s)
-    WHERE m.symbol = "%s"
+    WHERE m.symbol = $symbol
     RETURN n.symbol as symbol,
            n.name as name,
            n.start as start,
@@ -284,7 +325,7 @@ GET_GENES_QUERY = """
 # ------------------------------------------------------------------------------
 GET_GENES_FROMHUMAN_QUERY = """
     MATCH (n:Human)<-[r:HOMOLOG_OF]-(m:%s)<-[s:HAS_TRANSCRIPT]-(l:Smesgene)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN l.symbol     AS symbol,
            l.name       AS name,
            l.start      AS start,
@@ -304,7 +345,7 @@ GET_GENES_FROMHUMAN_QUERY = """
 # ------------------------------------------------------------------------------
 GET_GENES_FROMDOMAIN_QUERY = """
     MATCH (n:Pfam)<-[r:HAS_DOMAIN]-(m:%s)<-[s:HAS_TRANSCRIPT]-(l:Smesgene)
-    WHERE n.accession = "%s"
+    WHERE n.accession = $accession
     RETURN l.symbol     AS symbol,
            l.name       AS name,
            l.start      AS start,
@@ -315,7 +356,7 @@ GET_GENES_FROMDOMAIN_QUERY = """
 
 SMESGENE_QUERY = """
     MATCH (n:Smesgene)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN n.symbol as symbol,
            n.name as name,
            n.start as start,
@@ -328,7 +369,7 @@ SMESGENE_QUERY = """
 
 SMESGENE_NAME_QUERY = """
     MATCH (n:Smesgene)
-    WHERE n.name = "%s"
+    WHERE n.name = $name
     RETURN n.symbol as symbol,
            n.name as name,
            n.start as start,
@@ -340,7 +381,7 @@ SMESGENE_NAME_QUERY = """
 
 SMESGENE_GET_CONTIGS_QUERY = """
     MATCH (n:Smesgene)-[r:HAS_TRANSCRIPT]->(m:%s)
-    WHERE  n.symbol = "%s"
+    WHERE  n.symbol = $symbol
     RETURN m.symbol as symbol,
            m.length as length
     ORDER BY m.length DESC
@@ -348,7 +389,7 @@ SMESGENE_GET_CONTIGS_QUERY = """
 
 SMESGENE_GET_ALL_CONTIGS_QUERY = """
     MATCH (n:Smesgene)-[r:HAS_TRANSCRIPT]->(m)
-    WHERE  n.symbol = "%s"
+    WHERE  n.symbol = $symbol
     RETURN labels(m) as database,
            m.symbol as symbol,
            m.length as length
@@ -357,7 +398,7 @@ SMESGENE_GET_ALL_CONTIGS_QUERY = """
 
 GO_TO_CONTIG = """
     MATCH (go:Go)<-[r:HAS_GO]-(h:Human)<-[hom:HOMOLOG_OF]-(c:%s)
-    WHERE go.accession = "%s"
+    WHERE go.accession = $accession
     RETURN c.symbol AS symbol,
            h.symbol AS human,
            hom.blast_cov  AS blast_cov,
@@ -371,47 +412,98 @@ GO_TO_CONTIG = """
 
 AUTOCOMPLETE_CONTIG = """
     MATCH (n:%s)
-    WHERE n.symbol STARTS WITH "%s"
+    WHERE n.symbol STARTS WITH $prefix
     RETURN n.symbol as symbol ORDER BY n.symbol
 """
 
 AUTOCOMPLETE_ACCESSION = """
     MATCH (n:%s)
-    WHERE n.accession STARTS WITH "%s"
+    WHERE n.accession STARTS WITH $prefix
     RETURN n.accession AS symbol ORDER BY n.accession
 """
 
+# Every symbol/accession of a label, used to build the autocomplete index.
+AUTOCOMPLETE_ALL_SYMBOLS = """
+    MATCH (n:%s)
+    RETURN n.symbol AS symbol
+"""
+
+AUTOCOMPLETE_ALL_ACCESSIONS = """
+    MATCH (n:%s)
+    RETURN n.accession AS symbol
+"""
+
+# Every value of a property of a label, used to build the n-gram index.
+NGRAM_ALL_VALUES = """
+    MATCH (n:%s)
+    WHERE n[$property] IS NOT NULL
+    RETURN n[$property] AS value, n.symbol AS symbol
+"""
+
 GET_HOMOLOGS_BULK = """
+    UNWIND $symbols AS symbol
     MATCH (n:%s)-[r:HOMOLOG_OF]->(m:Human)
-    WHERE n.symbol IN %s
+    WHERE n.symbol = symbol
     RETURN n.symbol AS planarian, m.symbol AS human
 """
 
 GET_GENES_BULK = """
+    UNWIND $symbols AS symbol
     MATCH (n:%s)<-[r:HAS_TRANSCRIPT]->(m:Smesgene)
-    WHERE n.symbol IN %s
+    WHERE n.symbol = symbol
     RETURN n.symbol AS contig, m.symbol AS gene, m.name as name
 """
 
 GET_GENES_BULK_FROM_GENES = """
+    UNWIND $symbols AS symbol
     MATCH (n:Smesgene)
-    WHERE n.symbol IN %s
+    WHERE n.symbol = symbol
     RETURN n.symbol AS contig, n.symbol AS gene, n.name as name
 """
 
 GET_HOMOLOGS_BULK_FROM_GENE = """
+    UNWIND $symbols AS symbol
     MATCH (n:Smesgene)-[r:HAS_TRANSCRIPT]->(t:%s)-[hom:HOMOLOG_OF]->(h:Human)
-    WHERE n.symbol IN %s
+    WHERE n.symbol = symbol
     WITH n, h, t
     ORDER BY t.length DESC
     WITH n, collect(h) as humans
     RETURN n.symbol AS planarian, humans[0].symbol AS human
 """
 
+# Node properties, homology and gene of a list of contigs. One row per contig.
+HYDRATE_CONTIGS_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)
+    WHERE n.symbol = symbol
+    OPTIONAL MATCH (n)-[r:HOMOLOG_OF]-(m:Human)
+    WITH n, head(collect({
+        human: m.symbol, blast_cov: r.blast_cov, blast_eval: r.blast_eval,
+        nog_brh: r.nog_brh, pfam_sc: r.pfam_sc, nog_eval: r.nog_eval,
+        blast_brh: r.blast_brh, pfam_brh: r.pfam_brh
+    })) AS hom
+    OPTIONAL MATCH (g:Smesgene)-[:HAS_TRANSCRIPT]->(n)
+    WITH n, hom, head(collect(g)) AS g
+    RETURN n.symbol       AS symbol,
+           n.sequence     AS sequence,
+           n.orf          AS orf,
+           n.length       AS length,
+           hom.human      AS human,
+           hom.blast_cov  AS blast_cov,
+           hom.blast_eval AS blast_eval,
+           hom.nog_brh    AS nog_brh,
+           hom.pfam_sc    AS pfam_sc,
+           hom.nog_eval   AS nog_eval,
+           hom.blast_brh  AS blast_brh,
+           hom.pfam_brh   AS pfam_brh,
+           g.symbol       AS gene,
+           g.name         AS name
+"""
+
 
 MOTIF_QUERY  = """
     MATCH (n:Tf_motif)
-    WHERE n.symbol = "%s"
+    WHERE n.symbol = $symbol
     RETURN n.symbol as symbol,
            n.short_name as name,
            n.url as url,
@@ -423,8 +515,8 @@ MOTIF_QUERY  = """
 
 GET_MOTIFS = """
     MATCH (g:Smesgene)-[r:HAS_CRE]->(cre:Cre)-[tr:HAS_MOTIF]->(motif:Tf_motif)
-    WHERE g.symbol = "%s"
-    AND cre.cre_type = "%s"
+    WHERE g.symbol = $symbol
+    AND cre.cre_type = $cre_type
     RETURN 
            motif.symbol as motif_symbol,
            motif.short_name as motif_name,
@@ -453,7 +545,7 @@ ALL_MOTIFS_QUERY = """
 
 GET_GENES_FROMTF_QUERY = """
     MATCH (g:Smesgene)-[r:HAS_CRE]->(cre:Cre)-[tr:HAS_MOTIF]->(motif:Tf_motif)
-    WHERE motif.symbol = "%s"
+    WHERE motif.symbol = $symbol
     RETURN DISTINCT
         g.symbol as symbol,
         g.name as name
@@ -462,9 +554,132 @@ GET_GENES_FROMTF_QUERY = """
 
 GET_GENES_FROMTF_TYPE_QUERY = """
     MATCH (g:Smesgene)-[r:HAS_CRE]->(cre:Cre)-[tr:HAS_MOTIF]->(motif:Tf_motif)
-    WHERE motif.symbol = "%s"
-    AND cre.cre_type = "%s"
+    WHERE motif.symbol = $symbol
+    AND cre.cre_type = $cre_type
     RETURN DISTINCT
         g.symbol as symbol,
         g.name as name
-"""
\ No newline at end of file
+"""
+
+# ------------------------------------------------------------------------------
+# Stores the number of interactions of every node of a dataset in `degree`.
+SET_DEGREE_QUERY = """
+    MATCH (n:%s)
+    SET   n.degree = size((n)-[:INTERACT_WITH]-())
+    RETURN count(n) AS nodes
+"""
+
+# ------------------------------------------------------------------------------
+STALE_DEGREE_QUERY = """
+    MATCH (n:%s)
+    WITH  n, size((n)-[:INTERACT_WITH]-()) AS degree
+    WHERE n.degree IS NULL OR n.degree <> degree
+    RETURN count(n)                  AS stale,
+           collect(n.symbol)[..10]   AS examples
+"""
+
+# ------------------------------------------------------------------------------
+# ID conversion. One query per hop for a batch of symbols, see IDConverter.
+EXISTING_SYMBOLS_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)
+    WHERE n.symbol = symbol
+    RETURN n.symbol AS source, n.symbol AS target
+"""
+
+CONTIGS_BULK_FROM_GENES = """
+    UNWIND $symbols AS symbol
+    MATCH (n:Smesgene)-[:HAS_TRANSCRIPT]->(m:%s)
+    WHERE n.symbol = symbol
+    RETURN n.symbol AS source, m.symbol AS target
+    ORDER BY m.length DESC
+"""
+
+CONTIGS_BULK_FROM_HUMANS = """
+    UNWIND $symbols AS symbol
+    MATCH (n:Human)<-[:HOMOLOG_OF]-(m:%s)
+    WHERE n.symbol = symbol
+    RETURN n.symbol AS source, m.symbol AS target
+"""
+
+GENES_BULK_FROM_HUMANS = """
+    UNWIND $symbols AS symbol
+    MATCH (n:Human)<-[:HOMOLOG_OF]-(m:%s)<-[:HAS_TRANSCRIPT]-(l:Smesgene)
+    WHERE n.symbol = symbol
+    RETURN DISTINCT n.symbol AS source, l.symbol AS target
+"""
+
+GENES_BULK_FROM_NAMES = """
+    UNWIND $symbols AS symbol
+    MATCH (n:Smesgene)
+    WHERE n.name = symbol
+    RETURN symbol AS source, n.symbol AS target
+"""
+
+# Pfam domains by (upper case) identifier, e.g. 'PKINASE', as Domain(identifier=...).
+CONTIGS_BULK_FROM_DOMAIN_IDENTIFIERS = """
+    MATCH (dom:Pfam)
+    WHERE toUpper(dom.identifier) IN $symbols
+    MATCH (dom)<-[:HAS_DOMAIN]-(n:%s)
+    RETURN DISTINCT toUpper(dom.identifier) AS source, n.symbol AS target
+"""
+
+GENES_BULK_FROM_DOMAIN_IDENTIFIERS = """
+    MATCH (dom:Pfam)
+    WHERE toUpper(dom.identifier) IN $symbols
+    MATCH (dom)<-[:HAS_DOMAIN]-(:%s)<-[:HAS_TRANSCRIPT]-(l:Smesgene)
+    RETURN DISTINCT toUpper(dom.identifier) AS source, l.symbol AS target
+"""
+
+# ------------------------------------------------------------------------------
+# Downloads. One row per contig of a batch, see DownloadHandler.
+DOWNLOAD_DOMAINS_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)
+    WHERE n.symbol = symbol
+    OPTIONAL MATCH (g:Smesgene)-[:HAS_TRANSCRIPT]->(n)
+    WITH n, head(collect(g.symbol)) AS gene
+    OPTIONAL MATCH (n)-[r]->(dom:Pfam)
+    RETURN n.symbol AS symbol,
+           gene,
+           collect(CASE WHEN dom IS NULL THEN NULL ELSE {
+               accession: dom.accession, description: dom.description,
+               s_start: r.s_start, s_end: r.s_end
+           } END) AS domains
+"""
+
+DOWNLOAD_GO_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)
+    WHERE n.symbol = symbol
+    OPTIONAL MATCH (g:Smesgene)-[:HAS_TRANSCRIPT]->(n)
+    WITH n, head(collect(g.symbol)) AS gene
+    OPTIONAL MATCH (n)-[:HOMOLOG_OF]-(h:Human)
+    WITH n, gene, head(collect(h)) AS h
+    OPTIONAL MATCH (go:Go)-[:HAS_GO]-(h)
+    WITH n, gene, go
+    ORDER BY go.domain
+    RETURN n.symbol AS symbol,
+           gene,
+           collect(CASE WHEN go IS NULL THEN NULL ELSE {
+               accession: go.accession, domain: go.domain, name: go.name
+           } END) AS gos
+"""
+
+DOWNLOAD_INTERACTIONS_BULK = """
+    UNWIND $symbols AS symbol
+    MATCH (n:%s)
+    WHERE n.symbol = symbol
+    OPTIONAL MATCH (g:Smesgene)-[:HAS_TRANSCRIPT]->(n)
+    WITH n, head(collect(g.symbol)) AS gene
+    OPTIONAL MATCH (n)-[r:INTERACT_WITH]-(m:%s)
+    WHERE (m)-[:HOMOLOG_OF]-(:Human)
+    OPTIONAL MATCH (mg:Smesgene)-[:HAS_TRANSCRIPT]->(m)
+    WITH n, gene, m, r, head(collect(mg.symbol)) AS target_gene
+    ORDER BY r.int_prob DESC
+    RETURN n.symbol AS symbol,
+           gene,
+           collect(CASE WHEN m IS NULL THEN NULL ELSE {
+               target: m.symbol, gene: target_gene, int_prob: r.int_prob
+           } END) AS interactions
+"""
@@ -0,0 +1,178 @@
+"""
+Indexes required by the Cypher templates in neo4j_queries, and an audit of
+the plans of those templates.
+
+`INDEXES` is the single list of (label, property) pairs that PlanNET needs.
+The `neo4j_schema` management command creates the missing ones, with
+--cypher writes them to share/neo4j_indexes.cypher (for cypher-shell), and with
+--audit runs EXPLAIN on every template and reports the plans that scan a
+whole label (NodeByLabelScan) or the whole graph (AllNodesScan).
+"""
+import re
+
+from .common import *
+from django.conf import settings
+from NetExplorer.models import neo4j_queries as neoquery
+
+
+INDEXES = sorted(
+    [ (label, "symbol") for label in ALL_DATABASES ] + [
+        ("Human",      "symbol"),
+        ("Smesgene",   "symbol"),
+        ("Smesgene",   "name"),
+        ("Experiment", "id"),
+        ("Tf_motif",   "symbol"),
+        ("OFF_SYMBOL", "symbol"),
+        ("Pfam",       "accession"),
+        ("Go",         "accession"),
+    ]
+)
+
+# Script with the INDEXES, written by `neo4j_schema --cypher`.
+INDEXES_CYPHER = os.path.join(os.path.dirname(settings.BASE_DIR), 'share', 'neo4j_indexes.cypher')
+
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+
+# Templates that read a whole label on purpose (dumps, maintenance) or
+# filter with something no index can answer (regular expressions, toUpper).
+# Their scans are reported, but they don't fail the audit.
+EXPECTED_SCANS = set([
+    "ALL_EXPERIMENTS_QUERY",
+    "ALL_INTERACTIONS_QUERY",
+    "ALL_MOTIFS_QUERY",
+    "AUTOCOMPLETE_ALL_ACCESSIONS",
+    "AUTOCOMPLETE_ALL_SYMBOLS",
+    "DOMAIN_IDENTIFIER_QUERY",
+    "DOMAIN_TO_CONTIG_FUZZY",
+    "NAME_WILDCARD",
+    "NGRAM_ALL_VALUES",
+    "SET_DEGREE_QUERY",
+    "STALE_DEGREE_QUERY",
+    "SYMBOL_WILDCARD",
+])
+
+# Labels used to plan the templates whose slots are not (only) datasets.
+# None is replaced by the dataset being audited.
+AUDIT_LABELS = {
+    "HUMANNODE_QUERY":             ("Human",),
+    "AUTOCOMPLETE_ACCESSION":      ("Pfam",),
+    "AUTOCOMPLETE_ALL_ACCESSIONS": ("Pfam",),
+}
+
+
+# ------------------------------------------------------------------------------
+def index_statement(label, prop):
+    """
+    Args:
+        label (str): Neo4j label.
+        prop (str): Node property.
+
+    Returns:
+        str: Cypher statement creating the index.
+    """
+    return "CREATE INDEX ON :%s(%s)" % (label, prop)
+
+
+def cypher_script():
+    """
+    Returns:
+        str: Statements creating all the INDEXES, one per line.
+    """
+    return "".join(index_statement(label, prop) + "\n" for label, prop in INDEXES)
+
+
+def existing_indexes():
+    """
+    Returns:
+        `set` of `tuple`: (label, property) of the node indexes in Neo4j.
+    """
+    indexes = set()
+    for row in GRAPH.run("CALL db.indexes()").data():
+        if 'description' in row:
+            # Neo4j 3.x: "INDEX ON :Label(property)"
+            match = re.search(r":(\w+)\((\w+)\)", row['description'])
+            if match:
+                indexes.add(match.groups())
+        elif row.get('labelsOrTypes') and row.get('properties'):
+            indexes.add((row['labelsOrTypes'][0], row['properties'][0]))
+    return indexes
+
+
+def missing_indexes():
+    """
+    Returns:
+        `list` of `tuple`: (label, property) of the INDEXES not in Neo4j.
+    """
+    existing = existing_indexes()
+    return [ index for index in INDEXES if index not in existing ]
+
+
+def apply_indexes():
+    """
+    Creates the INDEXES that don't exist yet. Running it again does nothing.
+
+    Returns:
+        `list` of `tuple`: (label, property) of the created indexes.
+    """
+    created = missing_indexes()
+    for label, prop in created:
+        GRAPH.run(index_statement(label, prop))
+        logging.info("Neo4j index created on :%s(%s)" % (label, prop))
+    return created
+
+
+# ------------------------------------------------------------------------------
+def query_templates():
+    """
+    Returns:
+        `dict`: Name and Cypher template of every query in neo4j_queries.
+    """
+    return dict(
+        (name, value) for name, value in vars(neoquery).items()
+        if name.isupper() and isinstance(value, str) and "MATCH" in value
+    )
+
+
+def explain_template(name, template, dataset):
+    """
+    Plans a template with its label slots filled and every parameter set
+    to null. The query is not run.
+
+    Args:
+        name (str): Name of the template in neo4j_queries.
+        template (str): Cypher template.
+        dataset (str): Dataset label used for the dataset slots.
+
+    Returns:
+        `list` of `str`: Operators of the plan.
+
+    Raises:
+        IncorrectDatabase: If dataset is not a Neo4j label used by PlanNET.
+    """
+    labels = AUDIT_LABELS.get(name, (None,) * template.count("%s"))
+    labels = [ dataset if label is None else label for label in labels ]
+    params = dict((param, None) for param in re.findall(r"\$(\w+)", template))
+    return GRAPH.explain(format_query(template, *labels), **params)
+
+
+def audit_queries(dataset):
+    """
+    Looks for label and full graph scans in the plans of all the templates.
+
+    Args:
+        dataset (str): Dataset label used for the dataset slots.
+
+    Returns:
+        `list` of `tuple`: (name, scan operators, expected) for each template
+            whose plan has a scan. `expected` is True for the templates in
+            EXPECTED_SCANS.
+    """
+    report = []
+    for name, template in sorted(query_templates().items()):
+        scans = [
+            operator for operator in explain_template(name, template, dataset)
+            if operator in SCAN_OPERATORS
+        ]
+        if scans:
+            report.append((name, scans, name in EXPECTED_SCANS))
+    return report
@@ -0,0 +1,242 @@
+from .common import *
+from django.conf import settings
+
+
+# Properties indexed for wildcard searches: (label, property).
+NGRAM_FIELDS = [
+    ("Human",    "symbol"),
+    ("Smesgene", "name"),
+    ("Pfam",     "accession"),
+]
+
+
+def wildcard_regex(pattern):
+    """
+    Args:
+        pattern (str): Wildcard pattern, `*` matches anything and every other
+            character is literal.
+
+    Returns:
+        str: Regular expression equivalent to pattern, without anchors. It is
+            also valid in Neo4j, where `=~` matches the whole value.
+    """
+    return "".join(".*" if part == "*" else re.escape(part) for part in re.split(r"(\*)", pattern))
+
+
+# ------------------------------------------------------------------------------
+class TrigramIndex(object):
+    """
+    Inverted index from trigrams to the values that contain them. Values are
+    padded with a start and an end mark, so short prefixes and suffixes of a
+    pattern also give trigrams.
+
+    A wildcard pattern (`*` matches anything, every other character is
+    literal) is resolved by intersecting the values of all the trigrams of its
+    literal fragments, and only those candidates are checked with the regular
+    expression equivalent to the pattern.
+
+    Attributes:
+        values (`list` of `str`): Indexed values.
+        results (`list` of `str`): Symbol returned for each value (same positions).
+        postings (`dict` of `str`: `list` of `int`): Positions of the values
+            containing each trigram.
+
+    Args:
+        pairs (iterable of `tuple`): (value, symbol) tuples. For symbols both
+            are the same, for names the symbol is the node with that name.
+    """
+    start_mark = "\x02"
+    end_mark   = "\x03"
+
+    def __init__(self, pairs):
+        pairs = sorted(set((value, result) for value, result in pairs if value))
+        self.values   = [ value for value, result in pairs ]
+        self.results  = [ result for value, result in pairs ]
+        self.postings = defaultdict(list)
+        for idx, value in enumerate(self.values):
+            for trigram in set(self.trigrams(self.start_mark + value + self.end_mark)):
+                self.postings[trigram].append(idx)
+
+    @staticmethod
+    def trigrams(text):
+        """
+        Returns:
+            `list` of `str`: Substrings of length 3 of text.
+        """
+        return [ text[idx:idx + 3] for idx in range(len(text) - 2) ]
+
+    def pattern_trigrams(self, pattern):
+        """
+        Args:
+            pattern (str): Wildcard pattern.
+
+        Returns:
+            `set` of `str`: Trigrams that any value matching pattern must contain.
+        """
+        fragments = pattern.split("*")
+        fragments[0]  = self.start_mark + fragments[0]
+        fragments[-1] = fragments[-1] + self.end_mark
+        trigrams = set()
+        for fragment in fragments:
+            trigrams.update(self.trigrams(fragment))
+        return trigrams
+
+    @staticmethod
+    def pattern_regex(pattern):
+        """
+        Returns:
+            regex: Compiled regular expression matching the whole pattern.
+        """
+        return re.compile(wildcard_regex(pattern) + r"\Z")
+
+    def search(self, pattern):
+        """
+        Args:
+            pattern (str): Wildcard pattern, e.g.: 'BRCA*'.
+
+        Returns:
+            `list` of `tuple`: (value, symbol) of the matching values, sorted by value.
+        """
+        trigrams = self.pattern_trigrams(pattern)
+        if trigrams:
+            postings = sorted((self.postings.get(trigram, []) for trigram in trigrams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            candidates = sorted(candidates)
+        else:
+            candidates = range(len(self.values))
+        regex = self.pattern_regex(pattern)
+        return [
+            (self.values[idx], self.results[idx])
+            for idx in candidates if regex.match(self.values[idx])
+        ]
+
+    def to_pairs(self):
+        """
+        Returns:
+            `list` of `list`: [value, symbol] pairs.
+        """
+        return [ [ value, result ] for value, result in zip(self.values, self.results) ]
+
+    def __len__(self):
+        return len(self.values)
+
+
+# ------------------------------------------------------------------------------
+class NgramIndexStore(object):
+    """
+    Wildcard search service. Holds one :obj:`TrigramIndex` per (label, property)
+    in NGRAM_FIELDS, loaded from the file written by the `build_ngram_index`
+    management command.
+
+    The file is read on first use and again whenever its modification time
+    changes. Fields that are not in the file return None, and the caller falls
+    back to the regular expression queries in Neo4j.
+
+    Attributes:
+        path (str): Path of the index file.
+        indexes (`dict` of `str`: :obj:`TrigramIndex`): Index of each
+            'Label.property' field.
+
+    Args:
+        path (str, optional): Path of the index file. Defaults to ngram.json
+            inside the PLANNET_INDEX_DIR setting.
+    """
+    filename = "ngram.json"
+
+    def __init__(self, path=None):
+        self._path   = path
+        self.indexes = {}
+        self._mtime  = None
+        self._lock   = threading.Lock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = os.path.join(settings.PLANNET_INDEX_DIR, self.filename)
+        return self._path
+
+    @staticmethod
+    def field(label, prop):
+        """
+        Returns:
+            str: Key of the index of a label property, 'Label.property'.
+        """
+        return "%s.%s" % (label, prop)
+
+    def _reload_if_changed(self):
+        """
+        Loads the index file if it changed since the last load.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path) as fh:
+                content = json.load(fh)
+            self.indexes = dict(
+                (field, TrigramIndex(pairs)) for field, pairs in content.items()
+            )
+            self._mtime = mtime
+            logging.info("N-gram index loaded from %s" % self.path)
+
+    def search(self, label, prop, pattern):
+        """
+        Returns the values of a label property matching a wildcard pattern.
+
+        Args:
+            label (str): Neo4j label.
+            prop (str): Node property.
+            pattern (str): Wildcard pattern, `*` matches anything.
+
+        Returns:
+            Union([`list` of `tuple`, None]): (value, symbol) of each match,
+                None if the property is not indexed.
+        """
+        self._reload_if_changed()
+        index = self.indexes.get(self.field(label, prop))
+        if index is None:
+            return None
+        return index.search(pattern)
+
+    @classmethod
+    def build(cls):
+        """
+        Reads the values of NGRAM_FIELDS from Neo4j.
+
+        Returns:
+            `dict` of `str`: :obj:`TrigramIndex`: Index of each field.
+        """
+        indexes = {}
+        for label, prop in NGRAM_FIELDS:
+            results = run_query(neoquery.NGRAM_ALL_VALUES, label, property=prop)
+            indexes[cls.field(label, prop)] = TrigramIndex(
+                (row['value'], row['symbol'] or row['value']) for row in results.data()
+            )
+        return indexes
+
+    def save(self, indexes):
+        """
+        Writes the indexes to the index file, replacing it atomically.
+
+        Args:
+            indexes (`dict` of `str`: :obj:`TrigramIndex`): Index of each field.
+        """
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        content = dict((field, index.to_pairs()) for field, index in indexes.items())
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as fh:
+            json.dump(content, fh)
+        os.replace(fh.name, self.path)
+
+
+NGRAM_INDEX = NgramIndexStore()
@@ -0,0 +1,154 @@
+"""
+In-process cache for node lookups.
+
+The interactome only changes between releases, so the rows returned by the
+queries that build a node (PREDNODE_QUERY, HUMANNODE_QUERY, SMESGENE_QUERY...)
+can be kept in memory and reused. Keys are tuples starting with the label and
+the symbol of the node, values are the list of rows returned by Neo4j.
+
+Settings example::
+
+    NODE_CACHE = {
+        'MAX_SIZE': 20000,  # Entries per worker process. 0 disables the cache.
+        'TTL': 86400,       # Seconds.
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+DEFAULT_NODE_CACHE_SETTINGS = {
+    'MAX_SIZE': 20000,
+    'TTL': 86400,
+}
+
+
+# ------------------------------------------------------------------------------
+class NodeCache(object):
+    """
+    Thread-safe LRU cache with a time to live.
+
+    Attributes:
+        max_size (int): Maximum number of entries. 0 disables the cache.
+        ttl (float): Seconds an entry is valid. None means no expiration.
+        hits (int): Number of lookups found in the cache.
+        misses (int): Number of lookups not found (or expired).
+        evictions (int): Number of entries removed because the cache was full.
+
+    Args:
+        max_size (int, optional): Maximum number of entries. Defaults to 20000.
+        ttl (float, optional): Seconds an entry is valid. Defaults to 86400.
+    """
+    def __init__(self, max_size=20000, ttl=86400):
+        self.max_size  = max_size
+        self.ttl       = ttl
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._entries  = OrderedDict()
+        self._lock     = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Returns:
+            NodeCache: Cache configured with the NODE_CACHE Django setting.
+        """
+        conf = dict(DEFAULT_NODE_CACHE_SETTINGS)
+        conf.update(getattr(settings, 'NODE_CACHE', {}))
+        return cls(max_size=conf['MAX_SIZE'], ttl=conf['TTL'])
+
+    def get(self, key):
+        """
+        Args:
+            key (tuple): Cache key, (label, symbol, ...).
+
+        Returns:
+            Cached value, or None if the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries if needed.
+
+        Args:
+            key (tuple): Cache key, (label, symbol, ...).
+            value: Value to store. Should not be modified afterwards.
+        """
+        if not self.max_size:
+            return
+        expires = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, label=None, symbol=None):
+        """
+        Removes the entries of a label, of a symbol or of both. Without
+        arguments it empties the cache.
+
+        Args:
+            label (str, optional): Neo4j label.
+            symbol (str, optional): Node symbol.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self._lock:
+            if label is None and symbol is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            to_remove = [
+                key for key in self._entries
+                if (label is None or key[0] == label) and (symbol is None or key[1] == symbol)
+            ]
+            for key in to_remove:
+                del self._entries[key]
+            return len(to_remove)
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits      = 0
+            self.misses    = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Size, hits, misses, evictions and hit ratio of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
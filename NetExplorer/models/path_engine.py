@@ -0,0 +1,543 @@
+from .common import *
+import numpy as np
+import heapq
+from django.conf import settings
+from NetExplorer.models.node_cache import NodeCache
+
+
+# Path enumerations kept by each interactome, see `InteractomeCSR.cached_paths()`.
+PATH_CACHE_SIZE = 256
+
+
+def path_order(path):
+    """
+    Sort key of the paths returned by `InteractomeCSR.iter_paths()`: descending
+    score (mean int_prob of the edges), ties broken by node symbols.
+
+    Args:
+        path (tuple): (symbols, int_probs, path_lengths) tuple.
+
+    Returns:
+        tuple: Sort key.
+    """
+    symbols, int_probs, path_lengths = path
+    return (-sum(int_probs) / len(int_probs), tuple(symbols))
+
+# Edge scores stored besides int_prob and path_length, as returned by
+# GET_CONNECTIONS_QUERY.
+SCORE_FIELDS = ('cellcom_nto', 'molfun_nto', 'bioproc_nto', 'dom_int_sc')
+
+
+# ------------------------------------------------------------------------------
+class InteractomeCSR(object):
+    """
+    INTERACT_WITH edges of a dataset in compressed sparse row (CSR) form.
+    Neighbours of node `i` are ``indices[indptr[i]:indptr[i+1]]`` and the
+    properties of each of those edges are in `int_prob` and `path_length`, at
+    the same positions. Interactions are undirected, so every edge is stored
+    in both directions.
+
+    Attributes:
+        database (str): Dataset (Neo4j label).
+        symbols (`numpy.ndarray` of `str`): Symbol of each node.
+        indptr (`numpy.ndarray` of `int`): Start of the neighbours of each node.
+        indices (`numpy.ndarray` of `int`): Neighbour node indices.
+        int_prob (`numpy.ndarray` of `float`): Interaction probability of each edge.
+        path_length (`numpy.ndarray` of `int`): Path length property of each edge.
+        scores (`numpy.ndarray` of `float`): One row per edge, one column per
+            field in SCORE_FIELDS (NaN if missing). None for files written
+            before the scores were stored.
+        node_index (`dict` of `str`: `int`): Node index of each symbol.
+    """
+    def __init__(self, database, symbols, indptr, indices, int_prob, path_length, scores=None):
+        self.database    = database
+        self.symbols     = symbols
+        self.indptr      = indptr
+        self.indices     = indices
+        self.int_prob    = int_prob
+        self.path_length = path_length
+        self.scores      = scores
+        self.path_cache  = NodeCache(max_size=PATH_CACHE_SIZE, ttl=None)
+        self.node_index  = dict((symbol, idx) for idx, symbol in enumerate(symbols.tolist()))
+
+    @classmethod
+    def from_edges(cls, database, edges):
+        """
+        Builds the CSR arrays from a list of edges.
+
+        Args:
+            database (str): Dataset (Neo4j label).
+            edges (iterable of `tuple`): (source, target, int_prob, path_length)
+                or (source, target, int_prob, path_length, scores) tuples,
+                scores being a tuple with a value (or None) for each field in
+                SCORE_FIELDS.
+
+        Returns:
+            InteractomeCSR: Interactome of the dataset.
+        """
+        node_index = {}
+        sources, targets, probs, lengths, scores = [], [], [], [], []
+        for edge in edges:
+            source, target, int_prob, path_length = edge[:4]
+            sidx = node_index.setdefault(source, len(node_index))
+            tidx = node_index.setdefault(target, len(node_index))
+            sources.extend((sidx, tidx))
+            targets.extend((tidx, sidx))
+            probs.extend((int_prob, int_prob))
+            lengths.extend((path_length, path_length))
+            if len(edge) > 4:
+                edge_scores = [ np.nan if value is None else value for value in edge[4] ]
+                scores.extend((edge_scores, edge_scores))
+        sources = np.array(sources, dtype=np.int32)
+        targets = np.array(targets, dtype=np.int32)
+        # Sort by source, then by target so the neighbours come out in a stable order
+        order   = np.lexsort((targets, sources))
+        counts  = np.bincount(sources, minlength=len(node_index))
+        indptr  = np.zeros(len(node_index) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        symbols = sorted(node_index, key=node_index.get)
+        if scores and len(scores) == len(sources):
+            scores = np.array(scores, dtype=np.float64).reshape(-1, len(SCORE_FIELDS))[order]
+        else:
+            scores = None
+        return cls(
+            database    = database,
+            symbols     = np.array(symbols, dtype=str),
+            indptr      = indptr,
+            indices     = targets[order],
+            int_prob    = np.array(probs, dtype=np.float64)[order],
+            path_length = np.array(lengths, dtype=np.int32)[order],
+            scores      = scores
+        )
+
+    @classmethod
+    def from_graph(cls, database):
+        """
+        Reads all the interactions of a dataset from Neo4j.
+
+        Args:
+            database (str): Dataset (Neo4j label).
+
+        Returns:
+            InteractomeCSR: Interactome of the dataset.
+        """
+        results = run_query(neoquery.ALL_INTERACTIONS_QUERY, database, database)
+        return cls.from_edges(
+            database,
+            (
+                (
+                    row['source'], row['target'], row['int_prob'], row['path_length'],
+                    tuple(row[field] for field in SCORE_FIELDS)
+                )
+                for row in results.data()
+            )
+        )
+
+    @classmethod
+    def load(cls, database, path):
+        """
+        Loads an interactome saved with `save()`.
+
+        Args:
+            database (str): Dataset (Neo4j label).
+            path (str): Path of the .npz file.
+
+        Returns:
+            InteractomeCSR: Interactome of the dataset.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(
+                database    = database,
+                symbols     = arrays['symbols'],
+                indptr      = arrays['indptr'],
+                indices     = arrays['indices'],
+                int_prob    = arrays['int_prob'],
+                path_length = arrays['path_length'],
+                scores      = arrays['scores'] if 'scores' in arrays.files else None
+            )
+
+    def save(self, path):
+        """
+        Saves the arrays to a compressed .npz file.
+
+        Args:
+            path (str): Path of the .npz file.
+        """
+        arrays = dict(
+            symbols     = self.symbols,
+            indptr      = self.indptr,
+            indices     = self.indices,
+            int_prob    = self.int_prob,
+            path_length = self.path_length
+        )
+        if self.scores is not None:
+            arrays['scores'] = self.scores
+        np.savez_compressed(path, **arrays)
+
+    def distances(self, start, max_depth):
+        """
+        Breadth-first search from a node, truncated at max_depth.
+
+        Args:
+            start (int): Node index.
+            max_depth (int): Maximum distance to explore.
+
+        Returns:
+            `numpy.ndarray` of `int`: Distance from start to every node.
+                Nodes further than max_depth get max_depth + 1.
+        """
+        dist = np.full(len(self.symbols), max_depth + 1, dtype=np.int32)
+        dist[start] = 0
+        frontier = np.array([start], dtype=np.int32)
+        for depth in range(1, max_depth + 1):
+            if not frontier.size:
+                break
+            neighbours = np.concatenate([
+                self.indices[self.indptr[node]:self.indptr[node + 1]] for node in frontier
+            ])
+            neighbours = np.unique(neighbours)
+            neighbours = neighbours[dist[neighbours] > depth]
+            dist[neighbours] = depth
+            frontier = neighbours
+        return dist
+
+    def iter_paths(self, source, target, plen, max_paths=None):
+        """
+        Enumerates the simple paths of exactly `plen` interactions between two
+        nodes. A BFS from both ends keeps only the nodes that can be in such a
+        path, and the depth-first enumeration from source only follows
+        neighbours that can still reach target in the remaining steps.
+
+        Args:
+            source (str): Source symbol.
+            target (str): Target symbol.
+            plen (int): Number of interactions in the paths.
+            max_paths (int, optional): Stop after this many paths.
+
+        Yields:
+            `tuple`: (node symbols, int_prob of each edge, path_length of each edge).
+        """
+        sidx = self.node_index.get(source)
+        tidx = self.node_index.get(target)
+        if sidx is None or tidx is None or plen < 1 or sidx == tidx:
+            return
+        dist_t = self.distances(tidx, plen)
+        if dist_t[sidx] > plen:
+            return
+        dist_s    = self.distances(sidx, plen)
+        candidate = (dist_s + dist_t) <= plen
+
+        found   = 0
+        path    = [ sidx ]
+        edges   = []
+        stack   = [ self._next_steps(sidx, plen, tidx, dist_t, candidate) ]
+        while stack:
+            try:
+                node, edge = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                path.pop()
+                if edges:
+                    edges.pop()
+                continue
+            if node in path:
+                continue
+            path.append(node)
+            edges.append(edge)
+            remaining = plen - len(edges)
+            if remaining == 0:
+                yield (
+                    self.symbols[path].tolist(),
+                    self.int_prob[edges].tolist(),
+                    self.path_length[edges].tolist()
+                )
+                found += 1
+                if max_paths is not None and found >= max_paths:
+                    return
+                path.pop()
+                edges.pop()
+            else:
+                stack.append(self._next_steps(node, remaining, tidx, dist_t, candidate))
+
+    def best_paths(self, source, target, plen, max_paths=None):
+        """
+        Enumerates all the paths of `iter_paths()`, keeping only the best
+        max_paths of them (see `path_order`) in a bounded heap.
+
+        Args:
+            source (str): Source symbol.
+            target (str): Target symbol.
+            plen (int): Number of interactions in the paths.
+            max_paths (int, optional): Number of paths kept. Defaults to all.
+
+        Returns:
+            `tuple`: Best paths, sorted (`list` of (node symbols, int_prob of
+                each edge, path_length of each edge) tuples), and the total
+                number of paths found.
+        """
+        total = [ 0 ]
+        def counted(paths):
+            for path in paths:
+                total[0] += 1
+                yield path
+        paths = counted(self.iter_paths(source, target, plen))
+        if max_paths is None:
+            best = sorted(paths, key=path_order)
+        else:
+            best = heapq.nsmallest(max_paths, paths, key=path_order)
+        return best, total[0]
+
+    def cached_paths(self, source, target, plen, max_paths=None):
+        """
+        Same as `best_paths()`, but the result is kept in `path_cache`, so
+        the other pages of a search don't enumerate the paths again. The cache
+        goes away with the interactome when a new .npz file is loaded.
+
+        Returns:
+            `tuple`: See `best_paths()`.
+        """
+        key    = (source, target, plen, max_paths)
+        result = self.path_cache.get(key)
+        if result is None:
+            result = self.best_paths(source, target, plen, max_paths)
+            self.path_cache.set(key, result)
+        return result
+
+    def _next_steps(self, node, remaining, tidx, dist_t, candidate):
+        """
+        Returns an iterator of (neighbour, edge position) tuples for the
+        neighbours of node that can reach target in remaining - 1 steps.
+        Target itself is only accepted as the last step.
+        """
+        start, end = self.indptr[node], self.indptr[node + 1]
+        neighbours = self.indices[start:end]
+        keep = candidate[neighbours] & (dist_t[neighbours] <= remaining - 1)
+        if remaining > 1:
+            keep &= neighbours != tidx
+        positions = np.nonzero(keep)[0] + start
+        return iter(zip(self.indices[positions].tolist(), positions.tolist()))
+
+    def induced_edges(self, symbols):
+        """
+        Returns the interactions between a set of nodes (induced subgraph).
+        Each undirected interaction is returned once.
+
+        Args:
+            symbols (iterable of `str`): Node symbols.
+
+        Yields:
+            `dict`: Rows like the ones of GET_CONNECTIONS_QUERY: 'nsymbol',
+                'msymbol', 'int_prob', 'path_length' and the SCORE_FIELDS
+                (None if missing or not stored).
+        """
+        nodes = np.array(
+            sorted(set(self.node_index[symbol] for symbol in symbols if symbol in self.node_index)),
+            dtype=np.int64
+        )
+        member = np.zeros(len(self.symbols), dtype=bool)
+        member[nodes] = True
+        for node in nodes.tolist():
+            start, end = self.indptr[node], self.indptr[node + 1]
+            neighbours = self.indices[start:end]
+            positions  = np.nonzero(member[neighbours] & (neighbours > node))[0] + start
+            for pos in positions.tolist():
+                row = {
+                    'nsymbol': str(self.symbols[node]),
+                    'msymbol': str(self.symbols[self.indices[pos]]),
+                    'int_prob': float(self.int_prob[pos]),
+                    'path_length': int(self.path_length[pos]),
+                }
+                for col, field in enumerate(SCORE_FIELDS):
+                    value = None if self.scores is None else self.scores[pos, col]
+                    row[field] = None if value is None or np.isnan(value) else float(value)
+                yield row
+
+    def pathways(self, source, target, plen, max_paths=None):
+        """
+        Same as `best_paths()`, returning :obj:`Pathway` objects like
+        `PlanarianContig.path_to_node()`.
+
+        Args:
+            source (str): Source symbol.
+            target (str): Target symbol.
+            plen (int): Number of interactions in the paths.
+            max_paths (int, optional): Only the best max_paths paths.
+
+        Returns:
+            `list` of :obj:`Pathway`: Pathways found, best first.
+        """
+        paths, total = self.best_paths(source, target, plen, max_paths)
+        return [
+            Pathway.from_symbols(self.database, symbols, int_probs, path_lengths)
+            for symbols, int_probs, path_lengths in paths
+        ]
+
+
+# ------------------------------------------------------------------------------
+class PathResults(object):
+    """
+    Score-ordered paths found by the Pathway Finder, usable as the object list
+    of a Django Paginator. Paths are kept as lightweight (score, nodes, edges)
+    tuples, and only the slice requested by the paginator is turned into
+    :obj:`Pathway` objects and serialized. The slice is chosen with a heap
+    (top-k), so the whole list is never sorted.
+
+    Paths of different datasets can be mixed: each one keeps its dataset.
+    They are ordered by descending score, ties broken by node symbols and
+    dataset, so a page always holds the same paths across requests.
+
+    Only the best paths may be kept (see `InteractomeCSR.best_paths()` and
+    `truncate()`): `total` counts all the paths found, `len()` the kept ones.
+
+    Attributes:
+        paths (`list` of `tuple`): (score, nodes, edges, database) tuples.
+            nodes is a tuple of symbols, edges a tuple of (int_prob,
+            path_length) tuples.
+        total (int): Number of paths found, kept or not.
+    """
+    def __init__(self):
+        self.paths = []
+        self.total = 0
+
+    def extend(self, database, paths, total=None):
+        """
+        Adds paths from `InteractomeCSR.iter_paths()` or `best_paths()`.
+
+        Args:
+            database (str): Dataset of the paths.
+            paths (iterable of `tuple`): (symbols, int_probs, path_lengths) tuples.
+            total (int, optional): Number of paths found, if only the best
+                ones are given. Defaults to the number of paths given.
+        """
+        added = 0
+        for symbols, int_probs, path_lengths in paths:
+            score = sum(int_probs) / len(int_probs)
+            self.paths.append((score, tuple(symbols), tuple(zip(int_probs, path_lengths)), database))
+            added += 1
+        self.total += added if total is None else total
+        return self
+
+    def truncate(self, k):
+        """
+        Keeps only the best k paths. `total` is not changed.
+        """
+        self.paths = self.top(k)
+        return self
+
+    @property
+    def truncated(self):
+        """
+        bool: True if some of the paths found are not kept.
+        """
+        return self.total > len(self.paths)
+
+    @staticmethod
+    def _sort_key(path):
+        return (-path[0], path[1], path[3])
+
+    def top(self, k):
+        """
+        Args:
+            k (int): Number of paths.
+
+        Returns:
+            `list` of `tuple`: Best k (score, nodes, edges, database) tuples, in order.
+        """
+        return heapq.nsmallest(k, self.paths, key=self._sort_key)
+
+    def materialize(self, path):
+        """
+        Args:
+            path (tuple): (score, nodes, edges, database) tuple.
+
+        Returns:
+            `tuple`: JSON string of the :obj:`Pathway` for cytoscape.js and 
+                score rounded to 2 decimals.
+        """
+        score, nodes, edges, database = path
+        pathway = Pathway.from_symbols(
+            database, nodes,
+            [ int_prob for int_prob, path_length in edges ],
+            [ path_length for int_prob, path_length in edges ]
+        )
+        return (pathway.to_json(), round(score, 2))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.paths))
+            return [ self.materialize(path) for path in self.top(stop)[start:stop:step] ]
+        if key < 0:
+            key += len(self.paths)
+        if not 0 <= key < len(self.paths):
+            raise IndexError("Path index out of range")
+        return self.materialize(self.top(key + 1)[key])
+
+
+# ------------------------------------------------------------------------------
+class InteractomeStore(object):
+    """
+    Interactomes loaded by this worker, one per dataset. Each dataset is read
+    from PLANNET_INDEX_DIR/interactome_<database>.npz (see the
+    `build_interactome` command) if present, from Neo4j otherwise, the first
+    time a path is searched. A newer .npz file is picked up automatically.
+    """
+    def __init__(self):
+        self._interactomes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path(database):
+        """
+        Returns:
+            str: Path of the .npz file of database.
+        """
+        return os.path.join(settings.PLANNET_INDEX_DIR, "interactome_%s.npz" % graph_label(database))
+
+    def get_available(self, database):
+        """
+        Like `get()`, but only if the interactome is already in memory or
+        has a .npz file. It never reads the whole dataset from Neo4j.
+
+        Args:
+            database (str): Dataset (Neo4j label).
+
+        Returns:
+            Union([InteractomeCSR, None]): Interactome of the dataset, if available.
+        """
+        if database in self._interactomes or os.path.exists(self.path(database)):
+            return self.get(database)
+        return None
+
+    def get(self, database):
+        """
+        Args:
+            database (str): Dataset (Neo4j label).
+
+        Returns:
+            InteractomeCSR: Interactome of the dataset.
+        """
+        path = self.path(database)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        loaded = self._interactomes.get(database)
+        if loaded is not None and loaded[0] == mtime:
+            return loaded[1]
+        with self._lock:
+            loaded = self._interactomes.get(database)
+            if loaded is None or loaded[0] != mtime:
+                if mtime is not None:
+                    interactome = InteractomeCSR.load(database, path)
+                else:
+                    interactome = InteractomeCSR.from_graph(database)
+                logging.info("Interactome of %s loaded (%s nodes)" % (database, len(interactome.symbols)))
+                loaded = (mtime, interactome)
+                self._interactomes[database] = loaded
+        return loaded[1]
+
+
+INTERACTOMES = InteractomeStore()
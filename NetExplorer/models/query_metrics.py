@@ -0,0 +1,226 @@
+"""
+Per-template statistics of the Cypher queries sent through `run_query`.
+
+For every template of neo4j_queries (identified by its name) the number of
+calls, the rows returned and the latency of the last calls are kept, plus the
+number of Neo4j round-trips of each HTTP request (recorded by
+`NetExplorer.middleware.QueryMetricsMiddleware`). Queries slower than the
+NEO4J_SLOW_QUERY_MS setting are logged with their parameters.
+
+Statistics are kept per worker process; the `metrics` view reports the ones
+of the worker that serves it.
+
+Settings example::
+
+    NEO4J_SLOW_QUERY_MS = 500   # None disables the slow query log.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+LATENCY_SAMPLES = 1024
+
+# Items of each list parameter shown in the slow query log.
+LOGGED_PARAM_ITEMS = 10
+
+
+def percentile(values, perc):
+    """
+    Args:
+        values (`list` of `float`): Sorted values.
+        perc (float): Percentile, from 0 to 100.
+
+    Returns:
+        float: Value at the percentile (nearest rank), None if values is empty.
+    """
+    if not values:
+        return None
+    rank = int(round(perc / 100.0 * (len(values) - 1)))
+    return values[rank]
+
+
+def summarize_params(params, max_items=LOGGED_PARAM_ITEMS):
+    """
+    Shortens the query parameters for the log: lists (e.g. the thousands of
+    symbols of a bulk query) keep their first max_items items and their length.
+
+    Args:
+        params (dict): Query parameters.
+        max_items (int, optional): Items kept of each list.
+
+    Returns:
+        dict: Parameters to log.
+    """
+    if not params:
+        return params
+    summary = {}
+    for name, value in params.items():
+        if isinstance(value, (list, tuple, set, frozenset)) and len(value) > max_items:
+            value = "%r... (%s items)" % (list(value)[:max_items], len(value))
+        summary[name] = value
+    return summary
+
+
+# ------------------------------------------------------------------------------
+class Histogram(object):
+    """
+    Count, total and latest values of a measure.
+
+    Attributes:
+        count (int): Number of recorded values.
+        total (float): Sum of the recorded values.
+        samples (deque): Last LATENCY_SAMPLES values, used for the percentiles.
+    """
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self):
+        self.count   = 0
+        self.total   = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def summary(self):
+        """
+        Returns:
+            dict: count, mean, p50, p95, p99 and max of the values.
+        """
+        values = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else None,
+        }
+
+
+# ------------------------------------------------------------------------------
+class QueryMetrics(object):
+    """
+    Thread-safe store of query statistics.
+
+    Attributes:
+        slow_query_ms (float): Queries slower than this are logged. None
+            disables the log.
+        latencies (`dict` of `str`: :obj:`Histogram`): Latency (ms) per template.
+        rows (`dict` of `str`: int): Rows returned per template.
+        roundtrips (:obj:`Histogram`): Neo4j queries per HTTP request.
+
+    Args:
+        slow_query_ms (float, optional): Threshold of the slow query log.
+            Defaults to the NEO4J_SLOW_QUERY_MS setting.
+    """
+    def __init__(self, slow_query_ms=None):
+        self._slow_query_ms = slow_query_ms
+        self._names         = None
+        self._lock          = threading.Lock()
+        self.started        = time.time()
+        self.latencies      = {}
+        self.rows           = {}
+        self.roundtrips     = Histogram()
+
+    @property
+    def slow_query_ms(self):
+        if self._slow_query_ms is None:
+            return getattr(settings, 'NEO4J_SLOW_QUERY_MS', None)
+        return self._slow_query_ms
+
+    def template_name(self, template):
+        """
+        Args:
+            template (str): Cypher template, before filling its label slots.
+
+        Returns:
+            str: Name of the template in neo4j_queries, 'OTHER' if it is not there.
+        """
+        if self._names is None:
+            from NetExplorer.models import neo4j_queries
+            self._names = dict(
+                (value, name) for name, value in vars(neo4j_queries).items()
+                if name.isupper() and isinstance(value, str)
+            )
+        return self._names.get(template, 'OTHER')
+
+    def record(self, template, seconds, rows, params=None):
+        """
+        Records one query.
+
+        Args:
+            template (str): Cypher template of the query.
+            seconds (float): Time spent in Neo4j, including the round-trip.
+            rows (int): Number of rows returned.
+            params (dict, optional): Query parameters, only used (shortened,
+                see `summarize_params`) in the slow query log.
+        """
+        name = self.template_name(template)
+        ms   = seconds * 1000
+        with self._lock:
+            if name not in self.latencies:
+                self.latencies[name] = Histogram()
+                self.rows[name]      = 0
+            self.latencies[name].add(ms)
+            self.rows[name] += rows
+        threshold = self.slow_query_ms
+        if threshold is not None and ms > threshold:
+            logging.warning(
+                "Slow Neo4j query %s: %.0f ms, %s rows, params: %r" % (name, ms, rows, summarize_params(params))
+            )
+
+    def record_request(self, queries):
+        """
+        Args:
+            queries (int): Number of Neo4j queries done by one HTTP request.
+        """
+        with self._lock:
+            self.roundtrips.add(queries)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Statistics of this process::
+
+                {
+                    'pid': int,
+                    'uptime': float,
+                    'queries': {
+                        'TEMPLATE_NAME': {
+                            'count': int, 'rows': int,
+                            'mean': ms, 'p50': ms, 'p95': ms, 'p99': ms, 'max': ms
+                        }
+                    },
+                    'requests': {'count': int, 'mean': queries, 'p50': queries, ...}
+                }
+        """
+        with self._lock:
+            queries = {}
+            for name, histogram in self.latencies.items():
+                queries[name] = histogram.summary()
+                queries[name]['rows'] = self.rows[name]
+            requests = self.roundtrips.summary()
+        return {
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started,
+            'queries': queries,
+            'requests': requests,
+        }
+
+    def reset(self):
+        """Forgets all the statistics."""
+        with self._lock:
+            self.started    = time.time()
+            self.latencies  = {}
+            self.rows       = {}
+            self.roundtrips = Histogram()
+
+
+QUERY_METRICS = QueryMetrics()
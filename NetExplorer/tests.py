@@ -1,3 +1,576 @@
-from django.test import TestCase
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from unittest import mock
+from goatools.go_enrichment import GOEnrichmentStudy
+from goatools.obo_parser import GODag
+import json
+import os
+import random
+import re
+import tempfile
 
-# Create your tests here.
+from NetExplorer.middleware import QueryMetricsMiddleware
+from NetExplorer.models import common
+from NetExplorer.models.common import QueryCounter
+from NetExplorer.models.autocomplete_index import AutocompleteIndex, PrefixIndex
+from NetExplorer.models.cytoscape_json import iter_graph_json
+from NetExplorer.models.go_enrichment_engine import GOEnrichmentEngine, PopulationTable
+from NetExplorer.models.kegg_store import KeggStore
+from NetExplorer.models.ngram_index import NgramIndexStore, TrigramIndex
+from NetExplorer.models.node_cache import NodeCache
+from NetExplorer.models import neo4j_schema
+from NetExplorer.models.neo4j_models import GraphCytoscape, Homology, HumanNode, PlanarianContig, PredInteraction, WildCard
+from NetExplorer.models.path_engine import InteractomeCSR, PathResults, path_order
+from NetExplorer.models.query_metrics import QueryMetrics, summarize_params
+from NetExplorer.views.http_api.plannet import autocomplete
+
+
+# HELPERS
+# ------------------------------------------------------------------------------
+class FakeCursor(list):
+    """
+    Rows returned by FakeGraph, with the `data` method of py2neo cursors.
+    """
+    def data(self):
+        return list(self)
+
+
+class FakeGraph(object):
+    """
+    Stand-in for GRAPH that answers every query with the same rows and
+    records the queries it receives.
+    """
+    def __init__(self, rows):
+        self.rows    = rows
+        self.queries = []
+
+    def run(self, query, **params):
+        self.queries.append((query, params))
+        return FakeCursor(self.rows)
+
+
+# ------------------------------------------------------------------------------
+class GetNeighboursTest(SimpleTestCase):
+    """
+    PlanarianContig.get_neighbours and get_graphelements must need a single
+    Neo4j round-trip, whatever the degree of the node.
+    """
+    def neighbour_row(self, idx):
+        return {
+            'target': "dd_Smed_v6_%s_0_1" % idx, 'gene': "SMESG%09d.1" % idx, 'name': None,
+            'human': "HUMAN%s" % idx, 'int_prob': idx / 1000.0, 'path_length': 2,
+            'cellcom_nto': 0.1, 'molfun_nto': 0.2, 'bioproc_nto': 0.3, 'dom_int_sc': 0.4,
+            'blast_cov': 90, 'blast_eval': 1e-10, 'nog_brh': 1, 'pfam_sc': 0.5,
+            'nog_eval': 1e-5, 'blast_brh': 1, 'pfam_brh': 1,
+        }
+
+    def test_hub_node_single_query(self):
+        graph = FakeGraph([ self.neighbour_row(idx) for idx in range(500) ])
+        with mock.patch.object(common, 'GRAPH', graph):
+            node = PlanarianContig("dd_Smed_v6_99999_0_1", "Dresden", query=False)
+            with QueryCounter("test") as counter:
+                node.get_neighbours()
+                nodes, edges = node.get_graphelements()
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(len(graph.queries), 1)
+        self.assertEqual(len(nodes), 501)
+        self.assertEqual(len(edges), 500)
+        self.assertEqual(node.degree, 500)
+        self.assertEqual(edges[0].target.symbol, "dd_Smed_v6_499_0_1")
+
+
+    def test_hydrate_bulk(self):
+        row = dict(self.neighbour_row(1), symbol="dd_Smed_v6_1_0_1", sequence="ACGT", orf="ACG",
+                   length=4, name="smed-wnt-1")
+        graph = FakeGraph([ row ])
+        named = PlanarianContig("dd_Smed_v6_1_0_1", "Dresden", query=False, name="old name")
+        with mock.patch.object(common, 'GRAPH', graph):
+            PlanarianContig.hydrate_bulk([ named ])
+        self.assertEqual(len(graph.queries), 1)
+        self.assertEqual((named.gene, named.name), ("SMESG000000001.1", "smed-wnt-1"))
+        self.assertEqual(named.homolog.human.symbol, "HUMAN1")
+        self.assertEqual(named.sequence, "ACGT")
+
+
+# ------------------------------------------------------------------------------
+class InteractomeCSRTest(SimpleTestCase):
+    """
+    InteractomeCSR.iter_paths must find the same paths as walking the graph
+    by hand.
+    """
+    EDGES = [
+        ("A", "B", 0.9, 1), ("B", "C", 0.8, 2), ("C", "D", 0.7, 1),
+        ("A", "E", 0.6, 3), ("E", "D", 0.5, 1), ("B", "E", 0.4, 2),
+        ("D", "F", 0.3, 1),
+    ]
+
+    def brute_force_paths(self, source, target, plen):
+        neighbours = {}
+        for nsymbol, msymbol, int_prob, path_length in self.EDGES:
+            neighbours.setdefault(nsymbol, []).append((msymbol, int_prob, path_length))
+            neighbours.setdefault(msymbol, []).append((nsymbol, int_prob, path_length))
+        paths = []
+        def walk(path, int_probs, path_lengths):
+            if len(int_probs) == plen:
+                if path[-1] == target:
+                    paths.append((path, int_probs, path_lengths))
+                return
+            for symbol, int_prob, path_length in neighbours[path[-1]]:
+                if symbol not in path:
+                    walk(path + [symbol], int_probs + [int_prob], path_lengths + [path_length])
+        walk([source], [], [])
+        return sorted(paths)
+
+    def test_paths_match_brute_force(self):
+        interactome = InteractomeCSR.from_edges("Dresden", self.EDGES)
+        for plen in range(1, 6):
+            for source in "ABCDEF":
+                for target in "ABCDEF":
+                    if source == target:
+                        continue
+                    self.assertEqual(
+                        sorted(interactome.iter_paths(source, target, plen)),
+                        self.brute_force_paths(source, target, plen),
+                        "%s -> %s (%s)" % (source, target, plen)
+                    )
+
+    def test_unknown_nodes_and_max_paths(self):
+        interactome = InteractomeCSR.from_edges("Dresden", self.EDGES)
+        self.assertEqual(list(interactome.iter_paths("A", "Z", 2)), [])
+        self.assertEqual(list(interactome.iter_paths("A", "A", 2)), [])
+        self.assertEqual(len(list(interactome.iter_paths("A", "D", 3, max_paths=1))), 1)
+
+    def test_save_and_load(self):
+        interactome = InteractomeCSR.from_edges("Dresden", self.EDGES)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "interactome.npz")
+            interactome.save(path)
+            loaded = InteractomeCSR.load("Dresden", path)
+        self.assertEqual(
+            sorted(loaded.iter_paths("A", "D", 3)),
+            sorted(interactome.iter_paths("A", "D", 3))
+        )
+
+    def test_best_paths(self):
+        interactome = InteractomeCSR.from_edges("Dresden", self.EDGES)
+        every = sorted(self.brute_force_paths("A", "D", 4), key=path_order)
+        for max_paths in (None, 1, 2, len(every) + 1):
+            best, total = interactome.best_paths("A", "D", 4, max_paths)
+            self.assertEqual(total, len(every))
+            self.assertEqual(best, every[:max_paths])
+        results = PathResults()
+        for database in ("Dresden", "Smest"):
+            best, total = interactome.cached_paths("A", "D", 3, 1)
+            results.extend(database, best, total)
+        results.truncate(1)
+        self.assertEqual((len(results), results.total, results.truncated), (1, 4, True))
+        self.assertEqual(results.top(1)[0][1], ("A", "B", "C", "D"))
+
+    def test_path_results_order(self):
+        interactome = InteractomeCSR.from_edges("Dresden", self.EDGES)
+        results = PathResults().extend("Dresden", interactome.iter_paths("A", "D", 3))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            [ (round(score, 2), nodes) for score, nodes, edges, database in results.top(2) ],
+            [ (0.8, ("A", "B", "C", "D")), (0.6, ("A", "B", "E", "D")) ]
+        )
+
+
+# ------------------------------------------------------------------------------
+class CytoscapeJsonTest(SimpleTestCase):
+    """
+    GraphCytoscape.to_json must write the same string as json.dumps of the
+    to_jsondict() of its elements, as it did before the streaming serializer.
+    """
+    class Element(object):
+        """Element without a writer of its own."""
+        database = "Dresden"
+        symbol   = "other"
+
+        def to_jsondict(self):
+            return {'data': {'id': self.symbol, 'score': 0.5, 'tags': ["a", "\u00e9"]}}
+
+    def build_graph(self):
+        human = HumanNode("BRCA1", "Human", query=False)
+        hub   = PlanarianContig(
+            "dd_Smed_v6_1_0_1", "Dresden", query=False, degree=3, important=True,
+            homolog=Homology(human, blast_cov=90)
+        )
+        plain = PlanarianContig("dd_Smed_v6_2_0_1", "Dresden", query=False)
+        quote = PlanarianContig('dd_Smed_v6_"3"_0_1', "Dresden", query=False, degree=0)
+        graph = GraphCytoscape()
+        for node in (hub, plain, quote, human):
+            graph.add_node(node)
+        graph.add_interaction(PredInteraction(
+            hub.symbol, plain, "Dresden", {'int_prob': 0.67, 'path_length': 1}, query=False
+        ))
+        graph.add_interaction(PredInteraction(
+            quote.symbol, hub, "Dresden", {'int_prob': 1e-20, 'path_length': 2}, query=False
+        ))
+        graph.add_interaction(PredInteraction(plain.symbol, quote, "Dresden", query=False))
+        return graph
+
+    def test_same_json_as_jsondict(self):
+        graph = self.build_graph()
+        expected = json.dumps({
+            'nodes': [ node.to_jsondict() for node in graph.nodes ],
+            'edges': [ edge.to_jsondict() for edge in graph.edges ]
+        })
+        self.assertEqual(graph.to_json(), expected)
+        self.assertEqual("".join(iter_graph_json(graph.nodes, graph.edges, chunk_size=1)), expected)
+
+    def test_other_elements(self):
+        element = self.Element()
+        self.assertEqual(
+            "".join(iter_graph_json([ element ], [])),
+            json.dumps({'nodes': [ element.to_jsondict() ], 'edges': []})
+        )
+
+
+# ------------------------------------------------------------------------------
+class NodeCacheTest(SimpleTestCase):
+    """
+    NodeCache keeps the most recently used entries, expires them after the
+    TTL and can be invalidated by label or symbol.
+    """
+    def test_lru_eviction(self):
+        cache = NodeCache(max_size=2, ttl=None)
+        cache.set(("Dresden", "a"), 1)
+        cache.set(("Dresden", "b"), 2)
+        self.assertEqual(cache.get(("Dresden", "a")), 1)
+        cache.set(("Dresden", "c"), 3)
+        self.assertIsNone(cache.get(("Dresden", "b")))
+        self.assertEqual(cache.get(("Dresden", "a")), 1)
+        self.assertEqual(cache.get(("Dresden", "c")), 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl(self):
+        cache = NodeCache(max_size=10, ttl=60)
+        with mock.patch('NetExplorer.models.node_cache.time.time', return_value=1000):
+            cache.set(("Human", "BRCA1"), ["row"])
+        with mock.patch('NetExplorer.models.node_cache.time.time', return_value=1059):
+            self.assertEqual(cache.get(("Human", "BRCA1")), ["row"])
+        with mock.patch('NetExplorer.models.node_cache.time.time', return_value=1061):
+            self.assertIsNone(cache.get(("Human", "BRCA1")))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = NodeCache(max_size=0)
+        cache.set(("Human", "BRCA1"), ["row"])
+        self.assertIsNone(cache.get(("Human", "BRCA1")))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_invalidate(self):
+        cache = NodeCache(max_size=10, ttl=None)
+        cache.set(("Dresden", "a", "PREDNODE"), 1)
+        cache.set(("Dresden", "a", "GET_GENE"), 2)
+        cache.set(("Dresden", "b", "PREDNODE"), 3)
+        cache.set(("Human", "a", "HUMANNODE"), 4)
+        self.assertEqual(cache.invalidate(label="Dresden", symbol="a"), 2)
+        self.assertEqual(cache.invalidate(symbol="a"), 1)
+        self.assertEqual(cache.invalidate(label="Dresden"), 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_cached_query(self):
+        graph = FakeGraph([ {'symbol': "BRCA1"} ])
+        with mock.patch.object(common, 'GRAPH', graph), \
+                mock.patch.object(common, 'NODE_CACHE', NodeCache(max_size=10)):
+            first  = common.cached_query(("Human", "BRCA1", "HUMANNODE"), "MATCH (n:%s) RETURN n", "Human")
+            second = common.cached_query(("Human", "BRCA1", "HUMANNODE"), "MATCH (n:%s) RETURN n", "Human")
+        self.assertEqual(first, [ {'symbol': "BRCA1"} ])
+        self.assertEqual(second, first)
+        self.assertEqual(len(graph.queries), 1)
+
+
+# ------------------------------------------------------------------------------
+class PrefixIndexTest(SimpleTestCase):
+    """
+    PrefixIndex.search must return what a scan of all the keys sorted by
+    (len, key) returns.
+    """
+    PAIRS = [
+        ("BRCA1", "BRCA1"), ("BRCA2", "BRCA2"), ("BRC", "BRC"), ("BRCA10", "BRCA10"),
+        ("BRAF", "BRAF"), ("ABL1", "ABL1"), ("", "EMPTY"),
+        ("WNT SIGNALING", "Wnt signaling"), ("WNT SIGNALING PATHWAY", "Wnt signaling"),
+        ("WNT", "Wnt"),
+    ]
+
+    def scan(self, prefix, limit=None):
+        matches = []
+        for key, value in sorted(self.PAIRS, key=lambda pair: (len(pair[0]), pair)):
+            if key and key.startswith(prefix) and value not in matches:
+                matches.append(value)
+        return matches[:limit] if limit is not None else matches
+
+    def test_search_matches_scan(self):
+        index = PrefixIndex(self.PAIRS)
+        for prefix in ("", "B", "BR", "BRC", "BRCA", "BRCA1", "BRCA11", "A", "WNT", "WNT S", "Z"):
+            for limit in (None, 1, 2, 100):
+                self.assertEqual(index.search(prefix, limit), self.scan(prefix, limit), (prefix, limit))
+
+    def test_to_pairs(self):
+        index = PrefixIndex(self.PAIRS)
+        self.assertEqual(len(index), len(self.PAIRS) - 1)
+        self.assertEqual(PrefixIndex(index.to_pairs()).to_pairs(), index.to_pairs())
+
+    def test_autocomplete_index_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            autocomplete = AutocompleteIndex(os.path.join(directory, "autocomplete.json"))
+            self.assertIsNone(autocomplete.search("Human", "BR"))
+            autocomplete.save({'Human': PrefixIndex(self.PAIRS)})
+            self.assertEqual(autocomplete.search("Human", "BRCA", 2), ["BRCA1", "BRCA2"])
+            self.assertIsNone(autocomplete.search("Dresden", "BR"))
+
+
+    def test_autocomplete_limit(self):
+        index = mock.Mock()
+        index.search.return_value = [ "BRCA1" ]
+        with mock.patch.object(autocomplete, 'AUTOCOMPLETE_INDEX', index), \
+                self.settings(AUTOCOMPLETE_LIMIT=100):
+            for limit, expected in (("5", 5), ("-3", 1), ("0", 1), ("100000", 100), ("abc", 100), (None, 100)):
+                params = {'s_string': "BR", 'database': "Human"}
+                if limit is not None:
+                    params['limit'] = limit
+                response = autocomplete.autocomplete(RequestFactory().get("/autocomplete", params))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(index.search.call_args[0], ("Human", "BR", expected), limit)
+
+
+# ------------------------------------------------------------------------------
+class TrigramIndexTest(SimpleTestCase):
+    """
+    TrigramIndex.search must return what fnmatch-like matching of every
+    value returns.
+    """
+    PAIRS = [
+        ("BRCA1", "BRCA1"), ("BRCA2", "BRCA2"), ("ABRCA", "ABRCA"), ("BR", "BR"),
+        ("B", "B"), ("WNT1", "WNT1"), ("WNT10A", "WNT10A"), ("A.B", "A.B"),
+        ("smed-wnt-1", "SMESG000000001.1"), ("smed-wnt-11", "SMESG000000002.1"),
+        ("smed-wnt-11", "SMESG000000003.1"), ("", "EMPTY"),
+    ]
+
+    def scan(self, pattern):
+        regex = re.compile("".join(
+            ".*" if char == "*" else re.escape(char) for char in pattern
+        ) + r"\Z", re.DOTALL)
+        return sorted(set(
+            (value, symbol) for value, symbol in self.PAIRS if value and regex.match(value)
+        ))
+
+    def test_search_matches_scan(self):
+        index = TrigramIndex(self.PAIRS)
+        patterns = (
+            "BRCA*", "*BRCA*", "*1", "B*", "*", "**", "BR", "B", "*A", "W*1*",
+            "A.B", "A*B", "smed-wnt-1*", "*wnt*1", "BRCA1*", "XYZ*", "*CA1",
+        )
+        for pattern in patterns:
+            self.assertEqual(index.search(pattern), self.scan(pattern), pattern)
+
+    def test_to_pairs(self):
+        index = TrigramIndex(self.PAIRS)
+        self.assertEqual(len(index), len(self.PAIRS) - 1)
+        self.assertEqual(TrigramIndex(index.to_pairs()).to_pairs(), index.to_pairs())
+
+    def test_ngram_index_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = NgramIndexStore(os.path.join(directory, "ngram.json"))
+            self.assertIsNone(store.search("Human", "symbol", "BRCA*"))
+            store.save({store.field("Human", "symbol"): TrigramIndex(self.PAIRS)})
+            self.assertEqual(
+                store.search("Human", "symbol", "BRCA*"),
+                [ ("BRCA1", "BRCA1"), ("BRCA2", "BRCA2") ]
+            )
+            self.assertIsNone(store.search("Smesgene", "name", "*"))
+
+    def test_neo4j_fallback(self):
+        graph = FakeGraph([ { 'symbol': "A.B1" } ])
+        with tempfile.TemporaryDirectory() as directory:
+            store = NgramIndexStore(os.path.join(directory, "ngram.json"))
+            with mock.patch('NetExplorer.models.ngram_index.NGRAM_INDEX', store), \
+                    mock.patch.object(common, 'GRAPH', graph):
+                nodes = WildCard("a.b*", "Human").get_human_genes()
+        self.assertEqual([ node.symbol for node in nodes ], [ "A.B1" ])
+        regex = graph.queries[0][1]['regex']
+        self.assertEqual(regex, r"A\.B.*")
+        self.assertTrue(re.fullmatch(regex, "A.B1"))
+        self.assertFalse(re.fullmatch(regex, "AXB1"))
+
+
+# ------------------------------------------------------------------------------
+class GOEnrichmentEngineTest(SimpleTestCase):
+    """
+    GOEnrichmentEngine must give the p-values, adjusted p-values and
+    significant records of goatools' GOEnrichmentStudy, as configured in
+    GeneOntologyEnrichment before the engine was written.
+    """
+    NAMESPACES = ("biological_process", "cellular_component", "molecular_function")
+    NUM_TERMS  = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super(GOEnrichmentEngineTest, cls).setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        obo_path = os.path.join(cls.directory.name, "go.obo")
+        with open(obo_path, "w") as fh:
+            fh.write(cls.obo())
+        cls.dag = GODag(obo_path, prt=None)
+        rng = random.Random(1)
+        cls.population   = list(range(1, 301))
+        cls.associations = {}
+        for gene_id in cls.population:
+            terms = set(cls.term(rng.randrange(cls.NUM_TERMS)) for _ in range(rng.randrange(4)))
+            if gene_id <= 40:
+                # Enriched in the study
+                terms.update((cls.term(3 + gene_id % 4), cls.term(10 + gene_id % 2)))
+            elif gene_id > 200:
+                # Purified in the study
+                terms.add(cls.term(20))
+            if terms:
+                cls.associations[gene_id] = terms
+        cls.study = list(range(1, 61)) + [ 1000 ]
+        cls.engine = GOEnrichmentEngine()
+        cls.engine._dag   = cls.dag
+        cls.engine._table = PopulationTable.from_associations(cls.population, cls.associations, cls.dag, {})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super(GOEnrichmentEngineTest, cls).tearDownClass()
+
+    @staticmethod
+    def term(idx):
+        return "GO:%07d" % idx
+
+    @classmethod
+    def obo(cls):
+        lines = [ "format-version: 1.2", "" ]
+        for idx in range(cls.NUM_TERMS):
+            lines += [
+                "[Term]", "id: %s" % cls.term(idx), "name: term %s" % idx,
+                "namespace: %s" % cls.NAMESPACES[idx % 3]
+            ]
+            if idx >= 3:
+                lines.append("is_a: %s ! term %s" % (cls.term(idx % 3), idx % 3))
+            lines.append("")
+        return "\n".join(lines)
+
+    def goatools_results(self):
+        study = GOEnrichmentStudy(
+            self.population, self.associations, self.dag,
+            propagate_counts=False, alpha=0.05, methods=['fdr_bh'], log=None
+        )
+        return study.run_study(self.study, prt=None)
+
+    def test_pvalues(self):
+        table = self.engine.table
+        study_counts, pvalues, adjusted = self.engine.test(table.study_rows(self.study))
+        columns = dict((term, col) for col, term in enumerate(table.term_ids.tolist()))
+        results = self.goatools_results()
+        self.assertEqual(len(results), len(columns))
+        for record in results:
+            col = columns[record.GO]
+            self.assertEqual(study_counts[col], record.study_count, record.GO)
+            self.assertAlmostEqual(pvalues[col], record.p_uncorrected, delta=1e-10, msg=record.GO)
+            self.assertAlmostEqual(adjusted[col], record.p_fdr_bh, delta=1e-10, msg=record.GO)
+
+    def test_significant_records(self):
+        expected = [ record for record in self.goatools_results() if record.p_fdr_bh <= 0.05 ]
+        study    = self.engine.run_study(self.study)
+        self.assertTrue(any(record.enrichment == 'p' for record in expected))
+        self.assertEqual(
+            [ (record.GO, record.enrichment, record.NS) for record in study.records ],
+            [ (record.GO, record.enrichment, record.NS) for record in expected ]
+        )
+        for record, goatools_record in zip(study.records, expected):
+            self.assertEqual(record.ratio_in_study, goatools_record.ratio_in_study)
+            self.assertEqual(record.ratio_in_pop, goatools_record.ratio_in_pop)
+            self.assertEqual(record.study_items, set(goatools_record.study_items))
+            self.assertEqual(record.pop_items, set(goatools_record.pop_items))
+        self.assertEqual(study.study_n, 60)
+
+
+# ------------------------------------------------------------------------------
+class QueryMetricsTest(SimpleTestCase):
+    """
+    The queries run while a StreamingHttpResponse is sent are counted, and
+    the slow query log doesn't dump whole lists of parameters.
+    """
+    def test_streaming_response(self):
+        graph = FakeGraph([])
+        def stream():
+            for idx in range(3):
+                common.run_query("MATCH (n) RETURN n")
+                yield "chunk%s" % idx
+        def view(request):
+            common.run_query("MATCH (n) RETURN n")
+            return StreamingHttpResponse(stream())
+        metrics = QueryMetrics()
+        with mock.patch.object(common, 'GRAPH', graph), \
+                mock.patch('NetExplorer.middleware.QUERY_METRICS', metrics):
+            response = QueryMetricsMiddleware(view)(RequestFactory().get("/stream"))
+            self.assertEqual(response['X-Neo4j-Queries'], "1")
+            self.assertEqual(metrics.roundtrips.count, 0)
+            self.assertEqual(b"".join(response.streaming_content), b"chunk0chunk1chunk2")
+        self.assertEqual(len(graph.queries), 4)
+        self.assertEqual(list(metrics.roundtrips.samples), [ 4 ])
+
+    def test_summarize_params(self):
+        symbols = [ "symbol%s" % idx for idx in range(5000) ]
+        summary = summarize_params({'symbols': symbols, 'symbol': "BRCA1", 'pair': ["a", "b"]})
+        self.assertEqual(summary['symbol'], "BRCA1")
+        self.assertEqual(summary['pair'], ["a", "b"])
+        self.assertTrue(summary['symbols'].endswith("... (5000 items)"))
+        self.assertLess(len(summary['symbols']), 200)
+
+
+# ------------------------------------------------------------------------------
+class Neo4jSchemaTest(SimpleTestCase):
+    """
+    share/neo4j_indexes.cypher must be the one written from INDEXES
+    (python manage.py neo4j_schema --cypher).
+    """
+    def test_cypher_file_matches_indexes(self):
+        with open(neo4j_schema.INDEXES_CYPHER) as fh:
+            self.assertEqual(fh.read(), neo4j_schema.cypher_script())
+
+
+# ------------------------------------------------------------------------------
+class KeggStoreTest(SimpleTestCase):
+    """
+    KEGG pathway identifiers are accepted in any case, and stored and sent
+    to KEGG in lower case.
+    """
+    def test_identifier_case(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = KeggStore(directory, conf={'TTL': None, 'OFFLINE': True, 'GRAPHS': 10})
+            store.save("hsa04310", [ "WNT1", "FZD1" ])
+            for symbol in ("hsa04310", "HSA04310", " Hsa04310 "):
+                self.assertEqual(store.get(symbol)['genes'], [ "WNT1", "FZD1" ], symbol)
+            self.assertIsNone(store.get("hsa0431"))
+            self.assertIsNone(store.get("../hsa04310"))
+
+    def test_graphs_are_copied(self):
+        def build(genes):
+            graph = GraphCytoscape()
+            nodes = [ PlanarianContig("dd_Smed_v6_%s_0_1" % gene, "Dresden", query=False) for gene in genes ]
+            for node in nodes:
+                graph.add_node(node)
+            graph.add_interaction(PredInteraction(
+                nodes[0].symbol, nodes[1], "Dresden", {'int_prob': 0.5, 'path_length': 1}, query=False
+            ))
+            return graph
+        with tempfile.TemporaryDirectory() as directory:
+            store = KeggStore(directory, conf={'TTL': None, 'OFFLINE': True, 'GRAPHS': 10})
+            store.save("hsa04310", [ "1", "2" ])
+            first = store.get_graph("hsa04310", "Dresden", build)
+            for node in first.nodes:
+                node.important = True
+            for edge in first.edges:
+                edge.parameters['int_prob'] = 1.0
+            second = store.get_graph("hsa04310", "Dresden", build)
+        self.assertEqual(len(store.graphs), 1)
+        self.assertFalse(any(node.important for node in second.nodes))
+        self.assertEqual([ edge.parameters['int_prob'] for edge in second.edges ], [ 0.5 ])
+        edge = list(second.edges)[0]
+        self.assertTrue(any(edge.target is node for node in second.nodes))
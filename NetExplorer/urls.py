@@ -43,5 +43,7 @@ urlpatterns = [
     url(r'^get_goea', views.get_goea, name="get_goea"),
     url(r'^filter_network', views.filter_network, name="filter_network"),
     url(r'^tf_tools', views.tf_tools, name="tf_tools"),
+    url(r'^metrics$', views.metrics, name="metrics"),
+    url(r'^convert_ids$', views.convert_ids, name="convert_ids"),
 
 ]
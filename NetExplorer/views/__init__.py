@@ -25,6 +25,8 @@ from .http_api.plannet.show_connections import *
 from .http_api.plannet.get_fasta import *
 from .http_api.plannet.get_card import *
 from .http_api.plannet.autocomplete import *
+from .http_api.plannet.metrics import *
+from .http_api.plannet.convert_ids import *
 
 # GENERAL PLANEXP HTTP API
 from .http_api.planexp.general.experiment_summary import *
@@ -1,7 +1,7 @@
 from django.shortcuts   import render
 from django.shortcuts   import render_to_response
 from django.template.loader import render_to_string
-from django.http        import HttpResponse
+from django.http        import HttpResponse, StreamingHttpResponse
 from django.template    import RequestContext
 from NetExplorer.models import *
 from django.db.models import Func, F
@@ -19,6 +19,7 @@ from django.db.models import Sum
 from django.db.models import FloatField
 from django.db.models.functions import Cast
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 import tempfile
 import textwrap
 import json
@@ -41,6 +42,11 @@ import random
 BLAST_DB_DIR    = "/home/sergio/code/PlanNET/blast/"
 MAX_NUMSEQ      = 50
 MAX_CHAR_LENGTH = 25000
+# Delimiter and content type of the downloadable ID conversion files.
+CONVERSION_FORMATS = {
+    'csv': (",", "text/csv"),
+    'tsv': ("\t", "text/tab-separated-values"),
+}
 #register = template.Library()
 
 
@@ -61,25 +67,34 @@ def symbol_is_empty(symbol):
 def get_shortest_paths(startnodes, endnodes, plen):
     """
     This function gets all the possible shortest paths between the specified nodes.
-    Returns a json string with all the nodes and edges, the length of the paths and
-    the total number of paths
+    Paths are not serialized here: the returned PathResults only builds the
+    graphs of the paths that are actually shown (see Paginator), and the
+    paths of each pair of nodes are only enumerated once per worker (see
+    `InteractomeCSR.cached_paths`). Only the best PATH_FINDER_MAX_PATHS
+    paths are kept, but all of them are counted.
+
+    Returns:
+        `tuple`: :obj:`PathResults` with the best paths, and the number of
+            paths found.
     """
-    graphelements = list()
-    numpath = 0
+    paths = None
     for snode in startnodes:
         for enode in endnodes:
-            paths = snode.path_to_node(enode, plen)
-            if paths is None:
-                # Return no-path that matches the query_node
+            if not isinstance(snode, PlanarianContig) or not isinstance(enode, PlanarianContig):
                 continue
-            else:
-                for path in paths:
-                    graphelements.append( GraphCytoscape() )
-                    graphelements[numpath].add_elements(path.nodes)
-                    graphelements[numpath].add_elements(path.edges)
-                    graphelements[numpath] = (graphelements[numpath].to_json, round(path.score, 2))
-                    numpath += 1
-    return graphelements, numpath
+            if snode.database != enode.database:
+                continue
+            if paths is None:
+                paths = PathResults()
+            interactome = INTERACTOMES.get(snode.database)
+            best, total = interactome.cached_paths(
+                snode.symbol, enode.symbol, int(plen), settings.PATH_FINDER_MAX_PATHS
+            )
+            paths.extend(snode.database, best, total)
+    if paths is None:
+        return [], 0
+    paths.truncate(settings.PATH_FINDER_MAX_PATHS)
+    return paths, paths.total
 
 
 def disambiguate_gene(gene_name, dataset):
@@ -141,3 +156,19 @@ def condition_sort(x):
                 except ValueError:
                     section_index = str(0)
                 return (0, section_index + x.name, 0)
+
+
+# ------------------------------------------------------------------------------
+def conversion_file_response(id_converter, to_database, by_database, fformat):
+    """
+    Returns:
+        StreamingHttpResponse: Conversion results as a CSV or TSV attachment,
+            written while the identifiers are converted.
+    """
+    delimiter, content_type = CONVERSION_FORMATS[fformat]
+    response = StreamingHttpResponse(
+        id_converter.iter_delimited(to_database, by_database, delimiter),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = 'attachment; filename=id_conversion.%s' % fformat
+    return response
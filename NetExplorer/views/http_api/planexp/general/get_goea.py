@@ -4,6 +4,7 @@ from ....helpers.common import *
 def get_goea(request):
     """
     Performs Gene Ontology Enrichment Analysis for a given comparison of conditions.
+    Results are cached, see :obj:`GOEAComparison`.
     
     Accepts:
         * **GET**
@@ -15,42 +16,21 @@ def get_goea(request):
     """
     response = dict()
 
-    exp_name = request.GET['experiment']
-    c1_name = request.GET['condition1']
-    c2_name = request.GET['condition2']
-    condition_focus = request.GET['condition_focus']
-    dataset_name = request.GET['dataset']
-    experiment = Experiment.objects.get(name=exp_name)
-    dataset = Dataset.objects.get(name=dataset_name)
-    condition1 = Condition.objects.get(name=c1_name, experiment=experiment)
-    condition2 = Condition.objects.get(name=c2_name, experiment=experiment)
-    expression = ExpressionRelative.objects.filter(
-        experiment=experiment, dataset=dataset, 
-        condition1=condition1, condition2=condition2)
-    if not expression.exists():
-        # In case condition1 and condition2 are reversed in Database
-        expression = ExpressionRelative.objects.filter(
-            experiment=experiment, dataset=dataset, 
-            condition1=condition2, condition2=condition1)
-    
-    if expression:
-        if condition_focus == expression[0].condition1.name:
-            # Must get Positive fold changes
-            gene_set = list(expression.filter(fold_change__gte=0).values_list('gene_symbol', flat=True))
-        else:
-            # Must get Negative fold changes
-            gene_set = list(expression.filter(fold_change__lte=0).values_list('gene_symbol', flat=True))
-        # Get homologous proteins
-        gene_human_set = GraphCytoscape.get_homologs_bulk(gene_set, dataset_name).values()
-        go_analysis = GeneOntologyEnrichment()
-        go_analysis.get_enriched_gos(gene_human_set)
-        go_stats = go_analysis.get_stats(gene_set)
-        print(go_stats)
-        plots = go_analysis.get_plots()
-        go_list = go_analysis.get_go_list()
-
+    comparison = GOEAComparison(
+        experiment=request.GET['experiment'],
+        dataset=request.GET['dataset'],
+        condition1=request.GET['condition1'],
+        condition2=request.GET['condition2'],
+        condition_focus=request.GET['condition_focus']
+    )
+    try:
+        result = comparison.get()
+    except exceptions.EnrichmentFailed as err:
+        logging.error("PlanExp get_goea error: {}".format(err))
+        result = None
+    if result:
         try:
-            html_to_return = render_to_string('NetExplorer/goea_plots.html', { 'plots': plots, 'golist': go_list, 'stats': go_stats })
+            html_to_return = render_to_string('NetExplorer/goea_plots.html', { 'plots': result['plots'], 'golist': result['golist'], 'stats': result['stats'] })
         except Exception as err:
             logging.error("PlanExp get_goea error: {}".format(err))
         
@@ -1,4 +1,5 @@
 from ...helpers.common import *
+from django.conf import settings
 
 def autocomplete(request):
     """
@@ -10,6 +11,8 @@ def autocomplete(request):
     Args:
         s_string (str): Partial search term.
         database (str): Database in which to search for s_string.
+        limit (int, optional): Maximum number of results, from 1 to
+            AUTOCOMPLETE_LIMIT. Defaults to AUTOCOMPLETE_LIMIT.
 
     Response:
         * JSON `str`: List of gene symbols in `database` matching `s_string`
@@ -30,9 +33,24 @@ def autocomplete(request):
         s_string = "dd_Smed_v6" + s_string
  
     s_string = re.sub("[\'\"]", "", s_string)
+    try:
+        limit = int(request.GET.get('limit', settings.AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = settings.AUTOCOMPLETE_LIMIT
+    limit = min(max(limit, 1), settings.AUTOCOMPLETE_LIMIT)
     if 'database' in request.GET:
-        # Querying NEO4j
         database = request.GET['database']
+        if database == "Human":
+            s_string = s_string.upper()
+        # In-memory index first, (len, symbol) order
+        if database == "ReactomeName":
+            results = AUTOCOMPLETE_INDEX.search(database, s_string.upper(), limit)
+        else:
+            results = AUTOCOMPLETE_INDEX.search(database, s_string, limit)
+
+        if results is not None:
+            # Found in the index
+            return HttpResponse(json.dumps(results), content_type="application/json")
 
         if database.startswith("Reactome"):
             # Searching for reactome pathways
@@ -42,18 +60,19 @@ def autocomplete(request):
             elif database == "ReactomeName":
                 reactome = Reactome.objects.filter(search_name__startswith=s_string.upper())
                 results = sorted(list(set(reactome.values_list("name", flat=True))))
+            results = results[:limit]
         else:
-            # Searching for contigs
+            # Database not indexed: querying NEO4J
             if database == "Pfam" or database == "Go":
-                query = neoquery.AUTOCOMPLETE_ACCESSION % (database, s_string)
-            elif database == "Human":
-                s_string = s_string.upper()
-                query = neoquery.AUTOCOMPLETE_CONTIG % (database, s_string)
+                query = neoquery.AUTOCOMPLETE_ACCESSION
             else:
-                query = neoquery.AUTOCOMPLETE_CONTIG % (database, s_string)
-            results = GRAPH.run(query)
-            results = results.data()
+                query = neoquery.AUTOCOMPLETE_CONTIG
+            try:
+                results = run_query(query, database, prefix=s_string)
+                results = results.data()
+            except exceptions.IncorrectDatabase:
+                results = []
             results = [ val['symbol'] for val in results ]
-            results = sorted(results, key=lambda x: (len(x),x))
+            results = sorted(results, key=lambda x: (len(x),x))[:limit]
     
     return HttpResponse(json.dumps(results), content_type="application/json")
\ No newline at end of file
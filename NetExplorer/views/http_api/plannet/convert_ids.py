@@ -0,0 +1,55 @@
+from ...helpers.common import *
+
+
+@csrf_exempt
+def convert_ids(request):
+    """
+    Converts identifiers of any database to another database through their
+    planarian genes or their human homologs. Results are streamed while the
+    identifiers are converted.
+
+    Accepts:
+        * **GET**
+        * **POST**
+
+    Args:
+        identifiers (str): Identifiers separated by commas, spaces or newlines.
+        to (str): Database of the results: 'Gene', 'Human' or a transcriptome.
+        by (str, optional): Intermediate database, 'Gene' or 'Human'. Defaults to 'Gene'.
+        format (str, optional): 'json', 'csv' or 'tsv'. Defaults to 'json'.
+
+    Response:
+        * **JSON** `str`: Results of :obj:`IDConverter.iter_json`.
+        * **CSV/TSV** file: Input symbol, input database, intermediate symbols
+          and target symbols (separated by ';') of each identifier.
+
+    Example:
+
+        .. code-block:: bash
+
+            curl -X POST \\
+                 --data "identifiers=dd_Smed_v6_702_0_1,SMESG000067473.1&to=Smest&by=Gene" \\
+                 "https://compgen.bio.ub.edu/PlanNET/convert_ids"
+
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    identifiers = params.get("identifiers", "")
+    to_database = params.get("to")
+    by_database = params.get("by", "Gene")
+    fformat = params.get("format", "json")
+    allowed = [ db.name for db in Dataset.get_allowed_datasets(request.user) ] + [ "Gene", "Human" ]
+
+    identifiers = [ identifier for identifier in re.split(r"[\s,]+", identifiers) if identifier ]
+    if not identifiers or to_database not in allowed or by_database not in ("Gene", "Human") \
+            or fformat not in ("json", "csv", "tsv"):
+        return HttpResponse(
+            json.dumps({ 'error': "Invalid query", 'databases': allowed }),
+            content_type="application/json", status=400
+        )
+
+    id_converter = IDConverter(identifiers)
+    if fformat in CONVERSION_FORMATS:
+        return conversion_file_response(id_converter, to_database, by_database, fformat)
+    return StreamingHttpResponse(
+        id_converter.iter_json(to_database, by_database), content_type="application/json"
+    )
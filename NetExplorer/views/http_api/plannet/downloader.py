@@ -14,9 +14,10 @@ def downloader(request):
         database (`str`): Database for which we want data.
         data (`str`): What to download. 
             Can be ['contig', 'orf', 'homology', 'pfam', 'go', 'interactions'].
+        gzip (`str`, optional): If present, the file is compressed with gzip.
 
     Response:
-        * **HttpResponse**: Response with a file.
+        * **StreamingHttpResponse**: Response with a file, sent while it is written.
     
     Example:
 
@@ -32,7 +33,7 @@ def downloader(request):
         return render(request, 'NetExplorer/downloads.html', { 'databases': databases })
     if 'database' not in request.POST or not request.POST['database']:
         return render(request, 'NetExplorer/downloads.html', { 'databases': databases, 'error': 'database' })
-    if 'data' not in request.POST or not request.POST['data']:
+    if 'data' not in request.POST or request.POST['data'] not in downloaders.DownloadHandler.data_queries:
         return render(request, 'NetExplorer/downloads.html', { 'databases': databases, 'error': 'data' })
 
     identifiers = request.POST['identifiers']
@@ -40,8 +41,10 @@ def downloader(request):
     identifiers = [ symbol.replace(" ", "") for symbol in identifiers ]
     identifiers = [ re.sub("[\'\"]", "", symbol) for symbol in identifiers ]
     database = request.POST['database']
+    if database not in [ db.name for db in databases ]:
+        return render(request, 'NetExplorer/downloads.html', { 'databases': databases, 'error': 'database' })
     data = request.POST['data']
     dhandler = downloaders.DownloadHandler()
     the_file = dhandler.download_data(identifiers, database, data)
-    response = the_file.to_response()
+    response = the_file.to_response(compress=bool(request.POST.get('gzip')))
     return response
\ No newline at end of file
@@ -47,8 +47,10 @@ def get_card(request, symbol=None, database=None):
         if database == "Human":
             template = "NetExplorer/human_card.html"
             card_node = HumanNode(symbol, database)
-            homologs = card_node.get_homologs()
-            card_node.get_summary()
+            homologs = run_branches("get_card %s" % symbol, [
+                ("homologs", card_node.get_homologs),
+                ("summary",  card_node.get_summary),
+            ])['homologs']
             all_databases = Dataset.get_allowed_datasets(request.user)
             sorted_homologs = list()
             for db in all_databases:
@@ -59,20 +61,23 @@ def get_card(request, symbol=None, database=None):
         elif database == "Smesgene":
             template = "NetExplorer/smesgene_card.html"
             card_node = PlanarianGene(symbol, database)
-            contigs = card_node.get_planarian_contigs()
-            best_contig = card_node.get_best_transcript()
+            contigs = run_branches("get_card %s" % symbol, [
+                ("contigs",         card_node.get_planarian_contigs),
+                ("promoter_motifs", lambda: card_node.get_tf_motifs("promoter")),
+                ("enhancer_motifs", lambda: card_node.get_tf_motifs("enhancer")),
+            ])['contigs']
+            best_contig = card_node.get_best_transcript(contigs)
             graph = GraphCytoscape()
-            card_node.get_tf_motifs("promoter")
-            card_node.get_tf_motifs("enhancer")
             has_logo_proximal = gene_has_logo("promoter", card_node.symbol)
             has_logo_enhancer = gene_has_logo("enhancer", card_node.symbol)
            
             if best_contig:
+                # The other branches read the homolog, so it is fetched first.
                 best_contig.get_homolog()
-                best_contig.get_neighbours()
-                best_contig.get_geneontology()
-                if best_contig.homolog:
-                    best_contig.homolog.human.get_summary()
+                run_branches("get_card %s" % best_contig, [
+                    ("homolog",    lambda: get_homolog_details(best_contig)),
+                    ("neighbours", best_contig.get_neighbours),
+                ])
                 nodes, edges = best_contig.get_graphelements()
                 graph.add_elements(nodes)
                 graph.add_elements(edges)
@@ -82,9 +87,11 @@ def get_card(request, symbol=None, database=None):
             gsearch = GeneSearch(symbol, database)
             card_node = gsearch.get_planarian_contigs()[0]
             card_node.get_summary()
-            card_node.get_neighbours()
-            card_node.get_domains()
-            card_node.get_geneontology()
+            run_branches("get_card %s" % card_node, [
+                ("neighbours",      card_node.get_neighbours),
+                ("domains",         card_node.get_domains),
+                ("gene_ontologies", card_node.get_geneontology),
+            ])
             nodes, edges = card_node.get_graphelements()
             graph = GraphCytoscape()
             graph.add_elements(nodes)
@@ -121,6 +128,16 @@ def get_card(request, symbol=None, database=None):
     return render(request, template, response)
 
 
+def get_homolog_details(contig):
+    """
+    Fills the gene ontologies of contig and the summary of its human homolog.
+    The homolog must have been fetched already (`get_homolog()`).
+    """
+    contig.get_geneontology()
+    if contig.homolog:
+        contig.homolog.human.get_summary()
+
+
 def gene_has_logo(re_type, symbol):
     print('Images/{}-images/{}-promoter.png'.format(re_type, symbol))
     return finders.find('Images/{}-images/{}-{}.png'.format(re_type, symbol, re_type))
\ No newline at end of file
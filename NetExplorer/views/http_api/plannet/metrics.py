@@ -0,0 +1,31 @@
+from ...helpers.common import *
+
+
+def metrics(request):
+    """
+    View that serves the Neo4j query statistics of the worker process that
+    handles the request. Only answers to the addresses in METRICS_ALLOWED_IPS.
+
+    Accepts:
+        * **GET**
+
+    Response:
+        * **GET**:
+           * **str**: JSON with QUERY_METRICS.snapshot() and NODE_CACHE.stats()
+             under the 'neo4j' and 'node_cache' keys.
+
+    Example:
+
+        .. code-block:: bash
+
+            curl "http://127.0.0.1/PlanNET/metrics"
+
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return render(request, 'NetExplorer/404.html', status=404)
+    response = {
+        'neo4j': QUERY_METRICS.snapshot(),
+        'node_cache': NODE_CACHE.stats(),
+    }
+    return HttpResponse(json.dumps(response), content_type="application/json")
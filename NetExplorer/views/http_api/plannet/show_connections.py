@@ -24,6 +24,6 @@ def show_connections(request):
         for symbol, database in zip(nodes_including, databases):
             graphelements.add_node( PlanarianContig(symbol, database, query=False) )
         graphelements.get_connections()
-        return HttpResponse(graphelements, content_type="application/json")
+        return StreamingHttpResponse(graphelements.iter_json(), content_type="application/json")
     else:
         return render(request, 'NetExplorer/404.html')
\ No newline at end of file
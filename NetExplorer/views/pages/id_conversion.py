@@ -1,23 +1,31 @@
 from ..helpers.common import *
 
 def id_conversion(request):
+    """
+    ID conversion tool. Results are shown in a table, or downloaded as a
+    CSV/TSV file if the form is sent with `format` = 'csv' or 'tsv'.
+    """
     if not request.POST:
         return render(request, 'NetExplorer/id_conversion.html',{'databases':  Dataset.get_allowed_datasets(request.user)})
     else:
         query_identifiers = request.POST.get("query-identifiers")
         to_database = request.POST.get("database-to")
         by_database = request.POST.get("database-by")
+        allowed = [ db.name for db in Dataset.get_allowed_datasets(request.user) ] + [ "Gene", "Human" ]
 
-        if not query_identifiers or not to_database or not by_database:
+        if not query_identifiers or to_database not in allowed or by_database not in ("Gene", "Human"):
             return render(request, 'NetExplorer/id_conversion.html',{'databases':  Dataset.get_allowed_datasets(request.user), 'error_msg': "Invalid query"})
         else:
             query_identifiers = re.split(r"\n|,|\s+", query_identifiers)
             query_identifiers = [ query_identifier for query_identifier in query_identifiers if query_identifier ]
             id_converter = IDConverter(query_identifiers)
+            if request.POST.get("format") in CONVERSION_FORMATS:
+                return conversion_file_response(id_converter, to_database, by_database, request.POST["format"])
             results = id_converter.convert(to_database, by_database)
             results = {
                 'databases': Dataset.get_allowed_datasets(request.user),
                 'results': results
             }
 
-            return render(request, 'NetExplorer/id_conversion.html', results)
\ No newline at end of file
+            return render(request, 'NetExplorer/id_conversion.html', results)
+
@@ -90,24 +90,17 @@ def net_explorer(request):
         if request.GET['type'] == "node":
             graphobject = GraphCytoscape()
             graphobject.new_nodes(symbols, database)
-            # Clone the list of nodes to search for interactions
-            nodes_to_search = list(graphobject.nodes)
-            for node in nodes_to_search:
-                node.get_neighbours_shallow()
-                node.important = True
-                nodes, edges = node.get_graphelements()
-                graphobject.add_elements(nodes)
-                graphobject.add_elements(edges)
+            # Neighbours of all the new nodes in one query
+            graphobject.expand()
             if graphobject.is_empty():
                 return HttpResponse(status=404)
             else:
-                json_data = graphobject.to_json()
-                return HttpResponse(json_data, content_type="application/json")
+                return StreamingHttpResponse(graphobject.iter_json(), content_type="application/json")
         # ADDING A PATHWAY USING KEGG CODES
         else:
             kegg = KeggPathway(symbol=symbols[0], database=database)
             if not kegg.is_empty():
-                return HttpResponse(kegg, content_type="application/json")
+                return StreamingHttpResponse(kegg.iter_json(), content_type="application/json")
             else:
                 return HttpResponse(status=404)
     elif request.method == "POST":
@@ -25,6 +25,8 @@ def path_finder(request):
         * **plen** (`int`): Path length of searched pathways.
         * **databases** (`list` of `Dataset`): List of allowed Datasets for user.
         * **numpath** (`int`): Number of results.
+        * **numshown** (`int`): Number of results shown, only the best
+            PATH_FINDER_MAX_PATHS if numpath is larger.
         * **noresults** (bool): True if no results. False otherwise.
         * **graphs_for_page** (`list` of `tuple`): Pathway results for a given page. 
             First element of tuple is :obj:`GraphCytoscape`, second is score (`float`).
@@ -67,10 +69,10 @@ def path_finder(request):
         response["databases"] = Dataset.get_allowed_datasets(request.user)
 
         if graphelements:
-            # We have graphelements to display (there are paths)
-            graphelements = sorted(graphelements, key=lambda k: k[1], reverse=True)
-            #response["pathways"] = graphelements
+            # We have graphelements to display (there are paths).
+            # Already sorted by score, only the requested page is built.
             response["numpath"]  = numpath
+            response["numshown"] = len(graphelements)
             paginator = Paginator(graphelements, 10) # Show 25 contacts per page
             page = request.GET.get('page')
             try:
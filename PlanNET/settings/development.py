@@ -24,6 +24,77 @@ DATABASES = {
 }
 
 
+# NEO4J
+# BACKEND is 'http' (py2neo REST) or 'bolt' (pooled connections, needs the
+# neo4j driver: pip install neo4j, and a URI like bolt://127.0.0.1:7687).
+# Bolt requires USER unless NO_AUTH is True.
+NEO4J = {
+    'BACKEND': 'http',
+    'URI': 'http://127.0.0.1:7474/db/data/',
+    'USER': os.environ.get('NEO4J_USER', ''),
+    'PASSWORD': os.environ.get('NEO4J_PASSWORD', ''),
+    'NO_AUTH': False,
+    'MAX_POOL_SIZE': 10,                  # Connections per worker process.
+    'MAX_CONNECTION_LIFETIME': 3600,      # Seconds before a connection is recycled.
+    'CONNECTION_ACQUISITION_TIMEOUT': 60, # Seconds to wait for a free connection.
+}
+
+# Rows of node lookups (contigs, genes, human genes, domains, GO) kept in memory
+# by each worker. MAX_SIZE = 0 disables it.
+NODE_CACHE = {
+    'MAX_SIZE': 20000,                    # Entries per worker process.
+    'TTL': 86400,                         # Seconds.
+}
+
+# Files built by the management commands (autocomplete index...).
+PLANNET_INDEX_DIR = os.path.join(os.path.dirname(BASE_DIR), 'share', 'indexes')
+
+# Maximum number of suggestions returned by /autocomplete.
+AUTOCOMPLETE_LIMIT = 100
+
+# Maximum number of paths returned by the Pathway Finder for each pair of nodes.
+PATH_FINDER_MAX_PATHS = 5000
+
+# Neo4j queries slower than this (ms) are logged with their parameters. None disables it.
+NEO4J_SLOW_QUERY_MS = 500
+
+# Version of the data loaded in Neo4j. Change it after loading new experiments
+# (or run build_experiment_catalog) so the cached experiment catalog is rebuilt.
+PLANNET_DATA_VERSION = "1"
+
+# Shared by all the worker processes. 'default' holds the experiment catalog
+# and the dataset classifier version; 'goea' the PlanExp GO enrichment results
+# (one entry per comparison and condition, never expired, so it must not be culled).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.path.dirname(BASE_DIR), 'share', 'cache'),
+    },
+    'goea': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.path.dirname(BASE_DIR), 'share', 'goea_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+}
+
+# KEGG pathway gene lists, stored in PLANNET_INDEX_DIR/kegg (see the kegg_store command).
+KEGG = {
+    'URL': 'http://togows.dbcls.jp/entry/pathway/%s/genes.json',
+    'TIMEOUT': 10,                        # Seconds to wait for KEGG.
+    'TTL': 2592000,                       # Seconds before a gene list is fetched again.
+    'OFFLINE': False,                     # Only use the stored gene lists.
+    'GRAPHS': 200,                        # Pathway graphs kept in memory per worker process.
+}
+
+# Threads per worker process running the independent queries of the gene
+# cards. Keep it below NEO4J['MAX_POOL_SIZE']. 0 runs them one after the other.
+QUERY_WORKERS = 4
+
+# Addresses allowed to read /metrics (Neo4j query statistics).
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
 # DJANGO LOG
 logging.basicConfig(
     level = logging.INFO,
@@ -110,6 +181,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'NetExplorer.middleware.QueryMetricsMiddleware',
     # Uncomment the next line for simple clickjacking protection:
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -14,3 +14,25 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "PlanNET.settings")
 
 application = get_wsgi_application()
+
+
+def init_worker(*args, **kwargs):
+    """
+    Runs in each worker after forking: drops the Neo4j connections of the
+    master process and loads the autocomplete index, so the first request
+    of the worker doesn't wait for it.
+    """
+    from NetExplorer.models.graph_backends import init_worker as init_graph
+    from NetExplorer.models.autocomplete_index import AUTOCOMPLETE_INDEX
+    init_graph()
+    AUTOCOMPLETE_INDEX.load()
+
+
+# Each uWSGI worker opens its own Neo4j connection pool after forking.
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    postfork = None
+
+if postfork is not None:
+    postfork(init_worker)
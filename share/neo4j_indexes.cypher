@@ -1,14 +1,20 @@
-CREATE INDEX ON :Dresden(symbol)
-CREATE INDEX ON :Consolidated(symbol)
-CREATE INDEX ON :Graveley(symbol)
-CREATE INDEX ON :Smest(symbol)
-CREATE INDEX ON :Illuminaplus(symbol)
-CREATE INDEX ON :Smed454(symbol)
-CREATE INDEX ON :Smedgd(symbol)
 CREATE INDEX ON :Adamidi(symbol)
 CREATE INDEX ON :Blythe(symbol)
-CREATE INDEX ON :Pearson(symbol)
+CREATE INDEX ON :Consolidated(symbol)
 CREATE INDEX ON :Cthulhu(symbol)
+CREATE INDEX ON :Dresden(symbol)
+CREATE INDEX ON :Experiment(id)
 CREATE INDEX ON :Gbrna(symbol)
-CREATE INDEX ON :Pfam(accession)
 CREATE INDEX ON :Go(accession)
+CREATE INDEX ON :Graveley(symbol)
+CREATE INDEX ON :Human(symbol)
+CREATE INDEX ON :Illuminaplus(symbol)
+CREATE INDEX ON :OFF_SYMBOL(symbol)
+CREATE INDEX ON :Pearson(symbol)
+CREATE INDEX ON :Pfam(accession)
+CREATE INDEX ON :Smed454(symbol)
+CREATE INDEX ON :Smedgd(symbol)
+CREATE INDEX ON :Smesgene(name)
+CREATE INDEX ON :Smesgene(symbol)
+CREATE INDEX ON :Smest(symbol)
+CREATE INDEX ON :Tf_motif(symbol)
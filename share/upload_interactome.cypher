@@ -32,6 +32,9 @@ CREATE (n)-[r:INTERACT_WITH {
     int_prob:    row.int_prob
 }]->(m)
 
+# STORE DEGREES (same as: python manage.py compute_degree Smest)
+MATCH (n:Smest)
+SET n.degree = size((n)-[:INTERACT_WITH]-())
 
 # UPLOADING DOMAINS
 USING PERIODIC COMMIT 10000